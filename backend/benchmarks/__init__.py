@@ -0,0 +1,7 @@
+"""
+Load-testing harness for the chore_tracker API.
+
+    python -m benchmarks.run --scale 1 --requests 2000             # in-process, throwaway test database
+    python -m benchmarks.generate --scale 5                        # seed the configured database ...
+    python -m benchmarks.run --target http://localhost:8000 --no-seed --concurrency 8   # ... and load a live server
+"""
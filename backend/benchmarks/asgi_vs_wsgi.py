@@ -0,0 +1,74 @@
+"""
+Concurrency per worker process of the read endpoints under WSGI (sync DRF views, one thread per in-flight
+request) and ASGI (async views, ASYNC_READ_VIEWS=1). Both servers must run against the same database:
+
+    python -m benchmarks.generate --scale 5
+    gunicorn config.wsgi -w 1 --threads 8 -b 127.0.0.1:8001
+    ASYNC_READ_VIEWS=1 uvicorn config.asgi:application --workers 1 --port 8002
+    python -m benchmarks.asgi_vs_wsgi --wsgi http://127.0.0.1:8001 --asgi http://127.0.0.1:8002
+
+For every concurrency level the read mix is replayed against each server; the JSON report has throughput
+and p50/p95/p99 per server and level. The async ORM still runs queries in one thread per process, so the gap
+shows with a networked database (Postgres) where requests spend most of their time waiting; on SQLite
+the extra thread hop makes ASGI slightly slower.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from benchmarks.run import (READ_MIX, HttpTransport, get_commit, get_tokens, percentile, run_load, setup_django)
+
+
+def measure(url, dataset, tokens, n_requests, concurrency, seed):
+    transport = HttpTransport(url)
+    run_load(transport, dataset, tokens, min(n_requests, 100), concurrency, seed=seed + 1, mix=READ_MIX)
+    started = time.perf_counter()
+    results = run_load(transport, dataset, tokens, n_requests, concurrency, seed=seed, mix=READ_MIX)
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for route_samples in results.values() for sample in route_samples]
+    latencies = sorted(latency * 1000 for latency, _ in samples)
+    return {
+        "throughput": round(len(samples) / elapsed, 2),
+        "errors": sum(1 for _, status in samples if status >= 400),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare read throughput per worker under WSGI and ASGI")
+    parser.add_argument("--wsgi", required=True, help="URL of the WSGI server")
+    parser.add_argument("--asgi", required=True, help="URL of the ASGI server (with ASYNC_READ_VIEWS=1)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per server and concurrency level")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated dataset to use")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from benchmarks.generate import load_dataset
+
+    dataset = load_dataset(args.seed)
+    if not dataset.members:
+        parser.error("No generated data found, run `python -m benchmarks.generate` first")
+    tokens = get_tokens(dataset)
+
+    levels = []
+    for concurrency in args.concurrency:
+        levels.append({
+            "concurrency": concurrency,
+            "wsgi": measure(args.wsgi, dataset, tokens, args.requests, concurrency, args.seed),
+            "asgi": measure(args.asgi, dataset, tokens, args.requests, concurrency, args.seed),
+        })
+
+    output = json.dumps({"commit": get_commit(), "requests": args.requests, "levels": levels}, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
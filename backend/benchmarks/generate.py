@@ -0,0 +1,144 @@
+"""
+Synthetic tenant generator: users, groups, recurring events and costs, sized by a scale factor.
+All generated usernames start with PREFIX so a dataset can be found again (load_dataset) or removed (clear).
+"""
+import argparse
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, time, timedelta
+
+PREFIX = "bench_"
+PASSWORD = "benchmark"
+
+# per unit of scale
+GROUPS = 10
+MEMBERS_PER_GROUP = 8
+EVENTS_PER_GROUP = 20
+COSTS_PER_GROUP = 200
+
+REPEAT_MIX = ["Daily", "Weekly", "Weekly", "Monthly", None, None]
+CATEGORIES = ["Food", "Rent", "Utilities", "Groceries", "Other"]
+
+
+@dataclass
+class Dataset:
+    """ Ids the load driver needs to build requests: {group_id: [member ids]} and {group_id: [event ids]} """
+    seed: int = 0
+    members: dict = field(default_factory=dict)
+    events: dict = field(default_factory=dict)
+
+    @property
+    def group_ids(self):
+        return list(self.members)
+
+
+def generate(scale=1, seed=0, today=None):
+    """ Creates scale * GROUPS groups with their members, events and costs, and returns the Dataset """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+
+    from chore_tracker.ledger import record_costs
+    from chore_tracker.models import Group, Event, Cost
+    from chore_tracker.utils import update_recurring_events
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    today = today or date.today()
+    n_groups = max(1, int(GROUPS * scale))
+    password = make_password(PASSWORD)  # hashing is slow, every user shares one hash
+
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=f"{PREFIX}{seed}_{i}", email=f"{PREFIX}{seed}_{i}@example.com", name=f"User {i}",
+                 password=password)
+            for i in range(n_groups * MEMBERS_PER_GROUP)
+        ])
+        groups = Group.objects.bulk_create([
+            Group(name=f"Group {i}", status="active", timezone="UTC", creator=users[i * MEMBERS_PER_GROUP])
+            for i in range(n_groups)
+        ])
+
+        # each group gets its own members plus one member of the next group, so users belong to 1-2 groups
+        GroupMembership = Group.members.through
+        members = {}
+        for i, group in enumerate(groups):
+            group_users = users[i * MEMBERS_PER_GROUP:(i + 1) * MEMBERS_PER_GROUP]
+            if n_groups > 1:
+                group_users = group_users + [users[((i + 1) % n_groups) * MEMBERS_PER_GROUP + 1]]
+            members[group.id] = [user.id for user in group_users]
+        GroupMembership.objects.bulk_create([
+            GroupMembership(group_id=group_id, user_id=user_id)
+            for group_id, user_ids in members.items() for user_id in user_ids
+        ])
+
+        events = Event.objects.bulk_create([
+            Event(name=f"Chore {j}", first_date=today - timedelta(days=rng.randrange(60)),
+                  repeat_every=rng.choice(REPEAT_MIX), group=group)
+            for group in groups for j in range(EVENTS_PER_GROUP)
+        ])
+        EventMembership = Event.members.through
+        EventMembership.objects.bulk_create([
+            EventMembership(event_id=event.id, user_id=user_id)
+            for event in events for user_id in rng.sample(members[event.group_id], 2)
+        ])
+
+        costs = []
+        for group in groups:
+            for _ in range(COSTS_PER_GROUP):
+                payer, borrower = rng.sample(members[group.id], 2)
+                costs.append(Cost(
+                    name="Expense", category=rng.choice(CATEGORIES), amount=round(rng.uniform(1, 200), 2),
+                    date=today - timedelta(days=rng.randrange(120)), time=time(12, 0),
+                    group=group, payer_id=payer, borrower_id=borrower, transaction_id=uuid.uuid4(),
+                ))
+        record_costs(Cost.objects.bulk_create(costs))
+
+    for group in groups:
+        update_recurring_events(group)
+
+    return load_dataset(seed)
+
+
+def load_dataset(seed=None):
+    """ Rebuilds the Dataset of previously generated groups from the database """
+    from chore_tracker.models import Group, Event
+
+    prefix = PREFIX if seed is None else f"{PREFIX}{seed}_"
+    dataset = Dataset(seed=seed or 0)
+    for group_id, user_id in (Group.members.through.objects.filter(group__creator__username__startswith=prefix)
+                              .order_by('group_id', 'user_id').values_list('group_id', 'user_id')):
+        dataset.members.setdefault(group_id, []).append(user_id)
+    for group_id, event_id in (Event.objects.filter(group_id__in=dataset.members)
+                               .order_by('group_id', 'id').values_list('group_id', 'id')):
+        dataset.events.setdefault(group_id, []).append(event_id)
+    return dataset
+
+
+def clear():
+    """ Deletes every generated user; groups, events and costs cascade """
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.filter(username__startswith=PREFIX).delete()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the configured database with synthetic tenants")
+    parser.add_argument("--scale", type=float, default=1, help=f"{GROUPS} groups per unit of scale")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clear", action="store_true", help="Delete previously generated data first")
+    args = parser.parse_args(argv)
+
+    from benchmarks.run import setup_django
+    setup_django()
+    if args.clear:
+        clear()
+    dataset = generate(scale=args.scale, seed=args.seed)
+    print(f"Generated {len(dataset.members)} groups, "
+          f"{sum(len(ids) for ids in dataset.members.values())} memberships, "
+          f"{sum(len(ids) for ids in dataset.events.values())} events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Load driver: replays a weighted mix of dashboard loads, event toggles and cost creation and prints
+throughput and latency percentiles per route as JSON, so results can be diffed across commits.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date
+from pathlib import Path
+
+from benchmarks.generate import PREFIX, MEMBERS_PER_GROUP
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# (route, weight)
+MIX = [
+    ("get-current-user", 70),
+    ("event/complete", 20),
+    ("cost/create", 10),
+]
+# Read endpoints only, served by async views under ASYNC_READ_VIEWS
+READ_MIX = [
+    ("get-current-user", 40),
+    ("group/view", 20),
+    ("event/view", 20),
+    ("get-users", 10),
+    ("user/exists", 10),
+]
+
+
+def setup_django():
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+
+
+def percentile(sorted_values, pct):
+    """ Nearest-rank percentile of an already sorted list """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def build_request(route, dataset, rng):
+    """ Returns (user_id, method, path, payload) for one request of `route` against a random group """
+    group_id = rng.choice(dataset.group_ids)
+    members = dataset.members[group_id]
+    user_id = rng.choice(members)
+
+    if route == "get-current-user":
+        return user_id, "GET", "/api/get-current-user/", None
+    if route == "group/view":
+        return user_id, "GET", f"/api/group/view/?group_id={group_id}", None
+    if route == "event/view":
+        return user_id, "GET", f"/api/event/view/{rng.choice(dataset.events[group_id])}/", None
+    if route == "get-users":
+        return user_id, "GET", f"/api/get-users/?search={PREFIX}{dataset.seed}_{rng.randrange(10)}", None
+    if route == "user/exists":
+        n_users = len(dataset.members) * MEMBERS_PER_GROUP
+        return user_id, "GET", f"/api/user/exists/?username={PREFIX}{dataset.seed}_{rng.randrange(n_users)}", None
+    if route == "event/complete":
+        return user_id, "POST", "/api/event/complete/", {"eventId": rng.choice(dataset.events[group_id])}
+    if route == "cost/create":
+        borrowers = rng.sample([member for member in members if member != user_id], 2)
+        return user_id, "POST", "/api/cost/create/", {
+            "group_id": group_id, "name": "Groceries", "category": "Food", "date": date.today().isoformat(),
+            "time": "18:00:00", "amount": f"{rng.uniform(5, 150):.2f}", "payer": user_id, "borrower": borrowers,
+        }
+    raise ValueError(f"Unknown route {route}")
+
+
+class ClientTransport:
+    """ In-process requests through Django's test client; runs against whatever database is configured """
+
+    def __init__(self):
+        from django.test import Client
+        self.client = Client()
+
+    def send(self, method, path, payload, token):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        if method == "GET":
+            response = self.client.get(path, **headers)
+        else:
+            response = self.client.post(path, json.dumps(payload), content_type="application/json", **headers)
+        return response.status_code
+
+
+class HttpTransport:
+    """ Requests over HTTP against a running server, e.g. `python manage.py runserver` or gunicorn """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def send(self, method, path, payload, token):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers={
+            "Authorization": f"Bearer {token}", "Content-Type": "application/json",
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def run_load(transport, dataset, tokens, n_requests, concurrency=1, seed=0, mix=MIX):
+    """ Sends n_requests split over `concurrency` threads and returns {route: [(latency, status)]} """
+    routes, weights = zip(*mix)
+    results = {route: [] for route in routes}
+    lock = threading.Lock()
+
+    def worker(index, count):
+        rng = random.Random(seed * 1000 + index)
+        for _ in range(count):
+            route = rng.choices(routes, weights)[0]
+            user_id, method, path, payload = build_request(route, dataset, rng)
+            start = time.perf_counter()
+            status = transport.send(method, path, payload, tokens[user_id])
+            elapsed = time.perf_counter() - start
+            with lock:
+                results[route].append((elapsed, status))
+
+    threads = [threading.Thread(target=worker, args=(i, n_requests // concurrency + (i < n_requests % concurrency)))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(results, elapsed):
+    """ Per-route count, errors, throughput and p50/p95/p99/mean latencies in milliseconds """
+    report = {}
+    for route, samples in results.items():
+        latencies = sorted(latency * 1000 for latency, _ in samples)
+        report[route] = {
+            "count": len(samples),
+            "errors": sum(1 for _, status in samples if status >= 400),
+            "throughput": round(len(samples) / elapsed, 2) if elapsed else None,
+            "p50_ms": round(percentile(latencies, 50), 3) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95), 3) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99), 3) if latencies else None,
+            "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else None,
+        }
+    return report
+
+
+def get_tokens(dataset):
+    """ Access tokens of every generated user, so requests authenticate without a login round trip """
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    users = get_user_model().objects.in_bulk({user_id for ids in dataset.members.values() for user_id in ids})
+    return {user_id: str(RefreshToken.for_user(user).access_token) for user_id, user in users.items()}
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a dashboard/toggle/cost request mix and report latencies")
+    parser.add_argument("--target", default="client",
+                        help="'client' for in-process requests on a throwaway test database, or a server URL")
+    parser.add_argument("--scale", type=float, default=1, help="Scale factor passed to the data generator")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1, help="Client threads (URL targets only)")
+    parser.add_argument("--warmup", type=int, default=50, help="Requests sent before measuring")
+    parser.add_argument("--mix", choices=("default", "read"), default="default",
+                        help="'read' replays only the read endpoints")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-seed", action="store_true",
+                        help="Reuse data from `python -m benchmarks.generate` instead of generating it")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from benchmarks.generate import generate, load_dataset
+
+    in_process = args.target == "client"
+    if in_process:
+        if args.concurrency != 1:
+            parser.error("--concurrency is only supported against a server URL")
+        setup_test_environment()
+        test_db = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        transport = ClientTransport()
+    else:
+        transport = HttpTransport(args.target)
+
+    try:
+        started = time.perf_counter()
+        dataset = load_dataset(args.seed) if args.no_seed and not in_process else generate(args.scale, args.seed)
+        if not dataset.members:
+            parser.error("No generated data found, run `python -m benchmarks.generate` first")
+        seed_seconds = time.perf_counter() - started
+
+        tokens = get_tokens(dataset)
+
+        mix = READ_MIX if args.mix == "read" else MIX
+        if args.warmup:
+            run_load(transport, dataset, tokens, args.warmup, args.concurrency, seed=args.seed + 1, mix=mix)
+        started = time.perf_counter()
+        results = run_load(transport, dataset, tokens, args.requests, args.concurrency, seed=args.seed, mix=mix)
+        elapsed = time.perf_counter() - started
+    finally:
+        if in_process:
+            connection.creation.destroy_test_db(test_db, verbosity=0)
+
+    report = {
+        "commit": get_commit(),
+        "target": args.target,
+        "scale": args.scale,
+        "groups": len(dataset.members),
+        "mix": args.mix,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed_seconds": round(seed_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": round(args.requests / elapsed, 2),
+        "routes": summarize(results, elapsed),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
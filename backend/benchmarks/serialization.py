@@ -0,0 +1,82 @@
+"""
+CPU cost of the get-current-user payload: building it from rows, then rendering it with the stdlib encoder
+(DjangoJSONEncoder) and with orjson. Runs in-process on a throwaway test database:
+
+    python -m benchmarks.serialization --events 2000 --iterations 20
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+
+def timed(fn, iterations):
+    """ Best-of-`iterations` wall time of fn() in milliseconds, and its last result """
+    best = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 3), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time building and rendering a large dashboard payload")
+    parser.add_argument("--groups", type=int, default=5)
+    parser.add_argument("--members", type=int, default=10, help="Members per group")
+    parser.add_argument("--events", type=int, default=2000, help="Events per group")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    from benchmarks.run import get_commit, setup_django
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.serializers.json import DjangoJSONEncoder
+    from django.db import connection
+    from django.test.utils import setup_test_environment, override_settings
+
+    from chore_tracker.models import Group, Event
+    from chore_tracker.renderers import dumps
+    from chore_tracker.serializers import serialize_current_user
+
+    setup_test_environment()
+    test_db = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        User = get_user_model()
+        users = User.objects.bulk_create([User(username=f"user{i}", email=f"user{i}@example.com")
+                                          for i in range(args.members)])
+        today = date.today()
+        for g in range(args.groups):
+            group = Group.objects.create(name=f"Group {g}", status="active", timezone="UTC", creator=users[0])
+            group.members.add(*users)
+            events = Event.objects.bulk_create([
+                Event(name=f"Chore {i % 50}", first_date=today + timedelta(days=i // 50), group=group,
+                      repeat_every="Weekly" if i < 10 else None)
+                for i in range(args.events)
+            ])
+            Event.members.through.objects.bulk_create([
+                Event.members.through(event_id=event.id, user_id=users[(event.id + j) % args.members].id)
+                for event in events for j in range(2)
+            ])
+
+        expand_until = today + timedelta(days=90)
+        build_ms, payload = timed(lambda: serialize_current_user(users[0], expand_until), args.iterations)
+        stdlib_ms, body = timed(lambda: json.dumps(payload, cls=DjangoJSONEncoder).encode(), args.iterations)
+        with override_settings(JSON_RENDERER='orjson'):
+            orjson_ms, _ = timed(lambda: dumps(payload), args.iterations)
+    finally:
+        connection.creation.destroy_test_db(test_db, verbosity=0)
+
+    print(json.dumps({
+        "commit": get_commit(),
+        "events": sum(len(group['events']) for group in payload['groups']),
+        "bytes": len(body),
+        "build_ms": build_ms,
+        "render_stdlib_ms": stdlib_ms,
+        "render_orjson_ms": orjson_ms,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
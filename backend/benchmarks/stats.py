@@ -0,0 +1,98 @@
+"""
+Cost of /group/stats/ on a large event history: building the daily rollup once, then reading statistics from
+it, against aggregating the raw occurrences of the same window. Runs in-process on a throwaway test database:
+
+    python -m benchmarks.stats --events 1000000 --iterations 5
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.serialization import timed
+
+BATCH = 10000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time group statistics over a large event history")
+    parser.add_argument("--events", type=int, default=1000000, help="Stored occurrences in total")
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--members", type=int, default=8, help="Members per group")
+    parser.add_argument("--days", type=int, default=3 * 365, help="Days of history")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    from benchmarks.run import get_commit, setup_django
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from chore_tracker.models import Group, Event
+    from chore_tracker.stats import aggregate_days, get_group_stats, roll_up
+
+    setup_test_environment()
+    test_db = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        User = get_user_model()
+        rng = random.Random(args.seed)
+        today = date.today()
+        first_day = today - timedelta(days=args.days)
+
+        start = time.perf_counter()
+        users = User.objects.bulk_create([User(username=f"stats{i}", email=f"stats{i}@example.com")
+                                          for i in range(args.groups * args.members)])
+        groups = []
+        for g in range(args.groups):
+            group = Group.objects.create(name=f"Group {g}", status="active", timezone="UTC", creator=users[0])
+            group.members.add(*users[g * args.members:(g + 1) * args.members])
+            groups.append(group)
+
+        Membership = Event.members.through
+        per_group = args.events // args.groups
+        for g, group in enumerate(groups):
+            members = users[g * args.members:(g + 1) * args.members]
+            for offset in range(0, per_group, BATCH):
+                count = min(BATCH, per_group - offset)
+                events = Event.objects.bulk_create([
+                    Event(name=f"Chore {i % 40}", group=group,
+                          first_date=first_day + timedelta(days=(offset + i) * args.days // per_group),
+                          is_complete=rng.random() < 0.8)
+                    for i in range(count)
+                ])
+                Membership.objects.bulk_create([
+                    Membership(event_id=event.id, user_id=rng.choice(members).id) for event in events
+                ])
+        seed_s = round(time.perf_counter() - start, 2)
+
+        group = groups[0]
+        start = time.perf_counter()
+        for each in groups:
+            roll_up(each)
+        rollup_s = round(time.perf_counter() - start, 2)
+
+        results = {}
+        for window in (28, 365, args.days):
+            window_start = today - timedelta(days=window - 1)
+            fresh = Group.objects.get(id=group.id)
+            rollup_ms, _ = timed(lambda: get_group_stats(fresh, window_start, today), args.iterations)
+            raw_ms, _ = timed(lambda: aggregate_days([group.id], window_start, today), args.iterations)
+            results[f"{window}d"] = {"rollup_ms": rollup_ms, "raw_aggregate_ms": raw_ms}
+    finally:
+        connection.creation.destroy_test_db(test_db, verbosity=0)
+
+    print(json.dumps({
+        "commit": get_commit(),
+        "events": per_group * args.groups,
+        "groups": args.groups,
+        "seed_s": seed_s,
+        "initial_rollup_s": rollup_s,
+        "stats": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
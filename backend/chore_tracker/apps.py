@@ -1,6 +1,49 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+# Substring search on usernames (GetUsers) can only use an index through pg_trgm. The expression matches what
+# Django generates for `username__icontains` on Postgres. Created outside of Meta.indexes so SQLite still migrates.
+USERNAME_TRGM_INDEX = (
+    "CREATE INDEX IF NOT EXISTS user_username_trgm_idx "
+    "ON chore_tracker_user USING gin (UPPER(username::text) gin_trgm_ops)"
+)
+
+
+def create_postgres_indexes(using, **kwargs):
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(USERNAME_TRGM_INDEX)
+
+
+def backfill_series_ids(using, **kwargs):
+    # migrations are generated per checkout (see README), so this runs after migrate instead of as a data migration
+    from chore_tracker.utils import assign_series_ids
+
+    assign_series_ids()
 
 
 class ChoreTrackerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "chore_tracker"
+
+    def ready(self):
+        from chore_tracker import signals  # noqa: F401
+
+        post_migrate.connect(create_postgres_indexes, sender=self)
+        post_migrate.connect(backfill_series_ids, sender=self)
+
+        from chore_tracker.middleware import install_query_recorder
+        connection_created.connect(install_query_recorder)
+
+        # Opt-in in-process recurrence worker, see chore_tracker/scheduler.py
+        interval = getattr(settings, 'RECURRENCE_WORKER_INTERVAL', 0)
+        if interval:
+            from chore_tracker.scheduler import start_worker
+            start_worker(interval)
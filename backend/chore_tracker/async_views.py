@@ -0,0 +1,228 @@
+"""
+Async-native versions of the read endpoints, served instead of the DRF views when ASYNC_READ_VIEWS is set
+(see chore_tracker/urls.py), and the group update stream. Under ASGI they wait on the database without
+holding a worker thread.
+
+DRF has no async APIView, so these are plain Django views: the JWT is validated in the event loop with
+simplejwt, as JWTCookieAuthentication would, and only the user lookup goes to the database. Responses match
+the DRF views field for field.
+"""
+import asyncio
+import json
+import logging
+
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.views import View
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from chore_tracker.cache import aget_dashboard
+from chore_tracker.models import Group, Event
+from chore_tracker.renderers import JsonResponse
+from chore_tracker.revisions import aconditional, agroup_validators, aevent_validators, acurrent_user_validators
+from chore_tracker.search import asearch_users, DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT
+from chore_tracker.serializers import serialize_current_user
+from chore_tracker.stream import get_broker
+from chore_tracker.utils import parse_expand_until
+
+logger = logging.getLogger(__name__)
+
+# Seconds between SSE comments that keep idle connections (and proxies) open
+KEEPALIVE = 15
+
+User = get_user_model()
+
+
+class AuthenticationFailed(Exception):
+    pass
+
+
+async def aauthenticate(request):
+    """ Returns the user of the request's JWT (Authorization header first, then cookie), or None without one """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is not None:
+        raw_token = authentication.get_raw_token(header)
+    else:
+        raw_token = request.COOKIES.get(rest_auth_settings.JWT_AUTH_COOKIE)
+    if raw_token is None:
+        return None
+
+    try:
+        token = authentication.get_validated_token(raw_token)
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, KeyError):
+        raise AuthenticationFailed('Given token not valid for any token type')
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise AuthenticationFailed('User not found')
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive')
+    return user
+
+
+class AsyncAPIView(View):
+    """ Authenticates like the DRF views do: a bad token is rejected even where no login is required """
+    login_required = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await aauthenticate(request) or AnonymousUser()
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail': str(e)}, status=401)
+        if self.login_required and not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class CurrentUserView(AsyncAPIView):
+    """ Fetches User Info for Auth """
+    login_required = True
+
+    @aconditional(acurrent_user_validators)
+    async def get(self, request):
+        try:
+            expand_until = parse_expand_until(request.GET.get('to'))
+        except ValueError:
+            return JsonResponse({"success": False, "message": "Invalid date"}, status=400)
+
+        return JsonResponse(await aget_dashboard(request.user, expand_until, serialize_current_user))
+
+
+class ViewGroup(AsyncAPIView):
+    """ View a Group """
+
+    @aconditional(agroup_validators)
+    async def get(self, request):
+        group_id = request.GET.get('group_id')
+
+        try:
+            group = await Group.objects.select_related('creator').aget(id=group_id)
+            members = [member.username async for member in group.members.all()]
+
+            return JsonResponse({
+                'group': {
+                    'id': group.id,
+                    'name': group.name,
+                    'status': group.status,
+                    'expiration': group.expiration,
+                    'timezone': group.timezone,
+                    'creator': group.creator.username,
+                    'members': members,
+                }
+            }, status=200)
+        except (Group.DoesNotExist, ValueError):
+            logger.error("Group not found")
+            return JsonResponse({'error': 'Group not found'}, status=404)
+        except Exception as e:
+            logger.error(e)
+            return JsonResponse({'error': 'Failed to view group: ' + str(e)}, status=500)
+
+
+class ViewEvent(AsyncAPIView):
+    """ View a single event's details """
+
+    @aconditional(aevent_validators)
+    async def get(self, request, event_id):
+        try:
+            event = await Event.objects.select_related('group').aget(id=event_id)
+        except Event.DoesNotExist:
+            logger.error("Event not found")
+            return JsonResponse({"success": False, "message": "Event not found"}, status=404)
+
+        data = {
+            "id": event.id,
+            "name": event.name,
+            "first_date": str(event.first_date),
+            "repeat_every": event.repeat_every,
+            "is_complete": event.is_complete,
+            "group": {
+                "id": event.group.id,
+                "name": event.group.name,
+            },
+            "members": [user.username async for user in event.members.all()],
+        }
+        return JsonResponse({"success": True, "event": data}, status=200)
+
+
+class GetUsers(AsyncAPIView):
+    # get the best matching users for a particular string (autocomplete)
+    @aconditional()
+    async def get(self, request):
+        try:
+            query = request.GET.get('search', '')
+            limit = int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT))
+            users = await asearch_users(query, limit)
+            return JsonResponse({"success": True, 'users': users}, status=200)
+
+        except Exception as e:
+            logger.error(e)
+            return JsonResponse({"success": False, 'error': str(e)}, status=400)
+
+
+class UserExists(AsyncAPIView):
+    """ Check if a User exists using username """
+
+    async def get(self, request):
+        username = request.GET.get('username')
+
+        try:
+            user = await User.objects.values('id', 'username').aget(username=username)
+            return JsonResponse({'exists': True, 'user': user}, status=200)
+        except User.DoesNotExist:
+            logger.error("User not found")
+            return JsonResponse({'exists': False, 'message': 'User not found'}, status=404)
+
+
+def format_event(message):
+    """ One Server-Sent Events frame """
+    lines = [f"event: {message['type']}", f"data: {json.dumps(message, cls=DjangoJSONEncoder)}"]
+    if 'id' in message:
+        lines.insert(0, f"id: {message['id']}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class GroupStream(AsyncAPIView):
+    """
+    Server-Sent Events stream of a group's deltas, see chore_tracker/stream.py. Needs ASGI: under WSGI the
+    response would be buffered until the stream ends.
+    """
+    login_required = True
+
+    async def get(self, request):
+        group_id = request.GET.get('group_id')
+        try:
+            group_id = int(group_id)
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+
+        is_member = await Group.members.through.objects.filter(group_id=group_id, user_id=request.user.id).aexists()
+        if not is_member:
+            logger.error("Stream of a group the user is not in")
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+
+        async def events():
+            subscription = get_broker().subscribe(group_id)
+            try:
+                # tells the client it is subscribed, deltas published from now on are delivered
+                yield 'retry: 3000\n\n'
+                while True:
+                    try:
+                        message = await subscription.get(timeout=KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        yield ': keepalive\n\n'
+                        continue
+                    yield format_event(message)
+            finally:
+                subscription.close()
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,120 @@
+"""
+Read-through cache for the get-current-user dashboard.
+
+Each payload is stored per user together with the versions of the keys it was built from: one version for
+the user (username, group memberships) and one per group (name, members, events, costs). Writes bump only the
+versions they affect (see chore_tracker/signals.py), so a cached payload is served until something it contains
+changes. Versions are random tokens rather than counters, so an evicted version key can never come back with
+a value an old payload was stored under.
+"""
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from chore_tracker.models import Group
+
+DASHBOARD_TIMEOUT = 60 * 60 * 24
+
+
+def get_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE', 'default')]
+
+
+def user_version_key(user_id):
+    return f'dashboard:user:{user_id}'
+
+
+def group_version_key(group_id):
+    return f'dashboard:group:{group_id}'
+
+
+def dashboard_key(user_id, expand_until):
+    return f'dashboard:{user_id}:{expand_until.isoformat()}'
+
+
+def get_versions(keys):
+    """ Returns {key: version}, creating versions for keys that were never bumped or have been evicted """
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+async def aget_versions(keys):
+    cache = get_cache()
+    versions = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+        versions.update(await cache.aget_many(missing))
+    return versions
+
+
+def bump_versions(keys):
+    keys = list(keys)
+    if not keys:
+        return
+    cache = get_cache()
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+
+def invalidate(group_ids=(), user_ids=()):
+    """
+    Bumps the versions of the given groups and users. Bumped again once the transaction commits, so a
+    dashboard built from the pre-commit state by a concurrent request cannot stay cached.
+    """
+    keys = [group_version_key(group_id) for group_id in set(group_ids)]
+    keys.extend(user_version_key(user_id) for user_id in set(user_ids))
+    bump_versions(keys)
+    transaction.on_commit(lambda: bump_versions(keys))
+
+
+def get_dashboard(user, expand_until, build):
+    """
+    Returns the dashboard of `user`, calling build(user, expand_until) on a miss.
+    A hit costs two cache reads and no SQL queries.
+    """
+    cache = get_cache()
+    key = dashboard_key(user.id, expand_until)
+    entry = cache.get(key)
+    if entry is not None:
+        versions, payload = entry
+        if get_versions(list(versions)) == versions:
+            return payload
+
+    # versions are read before the payload, so a write that lands while it is built invalidates it
+    group_ids = Group.members.through.objects.filter(user_id=user.id).values_list('group_id', flat=True)
+    versions = get_versions([user_version_key(user.id)] + [group_version_key(group_id) for group_id in group_ids])
+    payload = build(user, expand_until)
+    cache.set(key, (versions, payload), timeout=DASHBOARD_TIMEOUT)
+    return payload
+
+
+async def aget_dashboard(user, expand_until, build):
+    """
+    get_dashboard for async views. A hit stays in the event loop; a miss builds the payload with one
+    sync_to_async call, since the prefetches of `build` are not available through the async ORM.
+    """
+    cache = get_cache()
+    key = dashboard_key(user.id, expand_until)
+    entry = await cache.aget(key)
+    if entry is not None:
+        versions, payload = entry
+        if await aget_versions(list(versions)) == versions:
+            return payload
+
+    group_ids = [group_id async for group_id in
+                 Group.members.through.objects.filter(user_id=user.id).values_list('group_id', flat=True)]
+    versions = await aget_versions([user_version_key(user.id)] +
+                                   [group_version_key(group_id) for group_id in group_ids])
+    payload = await sync_to_async(build)(user, expand_until)
+    await cache.aset(key, (versions, payload), timeout=DASHBOARD_TIMEOUT)
+    return payload
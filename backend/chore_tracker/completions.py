@@ -0,0 +1,137 @@
+"""
+Per-user completion log of event occurrences.
+
+Completions are stored as monthly bitmaps (chore_tracker.models.Completion), so any occurrence can be
+completed, stored or virtual, and storage grows with the months that have completions rather than with the
+scheduled occurrences. The status of a date range is read with one range scan over (group, month) or
+(series_id, month).
+
+The is_complete flag of the occurrence (its Event row, or an EventException for a virtual occurrence) is kept
+as "completed by anyone" in the same transaction, so the read endpoints need no extra query.
+"""
+from collections import defaultdict
+
+from django.db import transaction, IntegrityError
+
+from chore_tracker.models import Completion, Event, EventException
+from chore_tracker.revisions import mark_changed
+from chore_tracker.stats import invalidate_rollup
+from chore_tracker.utils import get_series_root, is_occurrence
+
+
+def month_of(date):
+    return date.replace(day=1)
+
+
+def day_bit(date):
+    return 1 << (date.day - 1)
+
+
+def decode_days(month, days):
+    """ Yields the dates of the bits set in a monthly bitmap """
+    while days:
+        bit = days & -days
+        yield month.replace(day=bit.bit_length())
+        days ^= bit
+
+
+def get_occurrence_root(event, date):
+    """ Returns the root of `event`'s series, raising ValueError if `date` is not one of its occurrences """
+    root = get_series_root(event)
+    if not is_occurrence(root, date):
+        raise ValueError(f"{date} is not an occurrence of {root}")
+    return root
+
+
+def toggle_completion(event, date, user):
+    """
+    Toggles `user`'s completion of the occurrence of `event`'s series on `date`.
+    Returns whether the occurrence is now complete, by `user` or anyone else.
+    """
+    return toggle_root_completion(get_occurrence_root(event, date), date, user)
+
+
+def toggle_root_completion(root, date, user):
+    month, bit = month_of(date), day_bit(date)
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                completion = (Completion.objects.select_for_update()
+                              .filter(series_id=root.series_id, month=month, user=user).first())
+                if completion is None:
+                    Completion.objects.create(series_id=root.series_id, month=month, days=bit,
+                                              group_id=root.group_id, user=user)
+                elif completion.days ^ bit:
+                    completion.days ^= bit
+                    completion.save(update_fields=['days'])
+                else:
+                    completion.delete()
+
+                is_complete = any(days & bit for days in Completion.objects.filter(
+                    series_id=root.series_id, month=month).values_list('days', flat=True))
+                set_occurrence_complete(root, date, is_complete)
+                mark_changed(group_ids=[root.group_id])
+            return is_complete
+        except IntegrityError:
+            # a concurrent toggle of the same user created the month first, the retry updates it instead
+            if attempt:
+                raise
+
+
+def set_completion(event, date, user, is_complete):
+    """
+    Sets the occurrence of `event`'s series on `date` the way its checkbox reads: completing it records
+    `user`'s completion (once), reopening it clears everyone's, as the chore is no longer done.
+    Returns whether the occurrence is now complete.
+    """
+    root = get_occurrence_root(event, date)
+    month, bit = month_of(date), day_bit(date)
+    if is_complete:
+        days = (Completion.objects.filter(series_id=root.series_id, month=month, user=user)
+                .values_list('days', flat=True).first())
+        if days is not None and days & bit:
+            return True
+        return toggle_root_completion(root, date, user)
+
+    with transaction.atomic():
+        for completion in Completion.objects.select_for_update().filter(series_id=root.series_id, month=month):
+            if not completion.days & bit:
+                continue
+            completion.days ^= bit
+            if completion.days:
+                completion.save(update_fields=['days'])
+            else:
+                completion.delete()
+        set_occurrence_complete(root, date, False)
+        mark_changed(group_ids=[root.group_id])
+    return False
+
+
+def set_occurrence_complete(root, date, is_complete):
+    """ Sets the shared is_complete flag of an occurrence, on its row if stored and as an exception otherwise """
+    if Event.objects.filter(group_id=root.group_id, series_id=root.series_id,
+                            first_date=date).update(is_complete=is_complete):
+        invalidate_rollup(root.group_id, date)
+        return
+    if not EventException.objects.filter(event=root, date=date).update(is_complete=is_complete) and is_complete:
+        EventException.objects.create(event=root, date=date, is_complete=True)
+
+
+def get_completions(start=None, end=None, **filters):
+    """
+    Returns {(series_id, date): [username]} for the completions matching `filters` (e.g. group_id=...,
+    series_id=...) between `start` and `end`, both included.
+    """
+    completions = Completion.objects.filter(**filters)
+    if start is not None:
+        completions = completions.filter(month__gte=month_of(start))
+    if end is not None:
+        completions = completions.filter(month__lte=month_of(end))
+
+    result = defaultdict(list)
+    for series_id, month, days, username in (completions.order_by('month', 'series_id', 'user_id')
+                                             .values_list('series_id', 'month', 'days', 'user__username')):
+        for date in decode_days(month, days):
+            if (start is None or date >= start) and (end is None or date <= end):
+                result[(series_id, date)].append(username)
+    return result
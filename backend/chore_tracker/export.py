@@ -0,0 +1,128 @@
+"""
+Streaming export of a group's costs and events as CSV or NDJSON, optionally gzipped.
+
+Rows are read with values_list().iterator(chunk_size), so the database driver fetches them in chunks (with a
+server-side cursor on PostgreSQL), and encoded into buffers of about BUFFER_SIZE bytes that are handed to a
+StreamingHttpResponse. Memory use depends on the chunk size, not on the length of the history.
+"""
+import csv
+import io
+import zlib
+from itertools import chain, islice
+
+from chore_tracker.models import Cost, Event
+from chore_tracker.renderers import dumps
+from chore_tracker.serializers import event_members
+
+CHUNK_SIZE = 2000
+# Bytes collected before a piece of the response is sent
+BUFFER_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# column name -> queryset field
+COST_COLUMNS = {
+    'id': 'id',
+    'transaction_id': 'transaction_id',
+    'name': 'name',
+    'category': 'category',
+    'date': 'date',
+    'time': 'time',
+    'amount': 'amount',
+    'payer': 'payer__username',
+    'borrower': 'borrower__username',
+    'settled': 'settled',
+    'settled_date': 'settled_date',
+}
+EVENT_COLUMNS = {
+    'id': 'id',
+    'series_id': 'series_id',
+    'name': 'name',
+    'date': 'first_date',
+    'repeat_every': 'repeat_every',
+    'is_complete': 'is_complete',
+}
+
+
+def cost_rows(group_id, chunk_size=CHUNK_SIZE):
+    """ Yields the group's costs as tuples of COST_COLUMNS, oldest first """
+    return (Cost.objects.filter(group_id=group_id).order_by('date', 'time', 'id')
+            .values_list(*COST_COLUMNS.values()).iterator(chunk_size=chunk_size))
+
+
+def event_rows(group_id, chunk_size=CHUNK_SIZE):
+    """
+    Yields the group's stored occurrences as tuples of EVENT_COLUMNS plus their members' usernames, oldest
+    first. Members are read with one query per chunk.
+    """
+    rows = (Event.objects.filter(group_id=group_id).order_by('first_date', 'id')
+            .values_list(*EVENT_COLUMNS.values()).iterator(chunk_size=chunk_size))
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        members = event_members(event_id__in=[row[0] for row in chunk])
+        for row in chunk:
+            yield row + (' '.join(member['username'] for member in members.get(row[0], [])),)
+
+
+EXPORTS = {
+    'costs': (list(COST_COLUMNS), cost_rows),
+    'events': (list(EVENT_COLUMNS) + ['members'], event_rows),
+}
+
+
+def encode_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chain([columns], rows):
+        writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def encode_ndjson(columns, rows):
+    for row in rows:
+        yield dumps(dict(zip(columns, row))) + b'\n'
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+}
+
+
+def buffered(pieces, size=BUFFER_SIZE):
+    """ Joins small byte strings into pieces of about `size` bytes """
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(pieces):
+    """ Compresses a stream of byte strings into one gzip stream as they arrive """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for piece in pieces:
+        compressed = compressor.compress(piece)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export(group_id, kind, output, gzip=False, chunk_size=CHUNK_SIZE):
+    """ Returns an iterator over the bytes of a group's `kind` export (costs or events) in the `output` format """
+    columns, rows = EXPORTS[kind]
+    stream = buffered(ENCODERS[output](columns, rows(group_id, chunk_size=chunk_size)))
+    return gzipped(stream) if gzip else stream
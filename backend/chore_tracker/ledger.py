@@ -0,0 +1,328 @@
+import heapq
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction, IntegrityError
+from django.db.models import Sum, Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from django.contrib.auth import get_user_model
+
+from chore_tracker.models import Balance, Cost, CostSummary
+from chore_tracker.revisions import mark_changed
+
+User = get_user_model()
+
+CENT = Decimal('0.01')
+
+
+def to_decimal(amount):
+    """ Cost.amount is a float; balances are kept as exact cents """
+    return Decimal(str(amount)).quantize(CENT)
+
+
+def sum_costs(costs):
+    """ Returns {(group_id, payer_id, borrower_id): total} for `costs`, ignoring what payers lent themselves """
+    totals = defaultdict(Decimal)
+    for cost in costs:
+        if cost.payer_id == cost.borrower_id:
+            continue
+        totals[(cost.group_id, cost.payer_id, cost.borrower_id)] += to_decimal(cost.amount)
+    return totals
+
+
+def apply_totals(totals):
+    """
+    Adds signed amounts to the Balance rows of the given (group, payer, borrower) keys.
+    Existing rows are locked and updated with one bulk_update, missing ones are inserted with one bulk_create.
+    Must run inside a transaction.
+    """
+    totals = {key: amount for key, amount in totals.items() if amount}
+    if not totals:
+        return
+
+    group_ids = {group_id for group_id, _, _ in totals}
+    payer_ids = {payer_id for _, payer_id, _ in totals}
+    existing = {}
+    for balance in (Balance.objects.select_for_update()
+                    .filter(group_id__in=group_ids, payer_id__in=payer_ids)):
+        existing[(balance.group_id, balance.payer_id, balance.borrower_id)] = balance
+
+    updated = []
+    created = []
+    for (group_id, payer_id, borrower_id), amount in totals.items():
+        balance = existing.get((group_id, payer_id, borrower_id))
+        if balance is None:
+            created.append(Balance(group_id=group_id, payer_id=payer_id, borrower_id=borrower_id, amount=amount))
+        else:
+            balance.amount += amount
+            updated.append(balance)
+
+    Balance.objects.bulk_update(updated, ['amount'])
+    Balance.objects.bulk_create(created)
+
+
+def sum_spend(costs):
+    """ Returns {(group_id, month, category, payer_id): (total, count)} for `costs` """
+    spend = defaultdict(lambda: (Decimal('0.00'), 0))
+    for cost in costs:
+        cost_date = parse_date(cost.date) if isinstance(cost.date, str) else cost.date
+        key = (cost.group_id, cost_date.replace(day=1), cost.category or '', cost.payer_id)
+        total, count = spend[key]
+        spend[key] = (total + to_decimal(cost.amount), count + 1)
+    return spend
+
+
+def apply_spend(spend):
+    """
+    Adds (total, count) deltas to the CostSummary rows of the given (group, month, category, payer) keys, like
+    apply_totals. Must run inside a transaction.
+    """
+    if not spend:
+        return
+
+    group_ids = {group_id for group_id, _, _, _ in spend}
+    months = {month for _, month, _, _ in spend}
+    existing = {}
+    for summary in (CostSummary.objects.select_for_update()
+                    .filter(group_id__in=group_ids, month__in=months)):
+        existing[(summary.group_id, summary.month, summary.category, summary.payer_id)] = summary
+
+    updated = []
+    created = []
+    for (group_id, month, category, payer_id), (total, count) in spend.items():
+        summary = existing.get((group_id, month, category, payer_id))
+        if summary is None:
+            created.append(CostSummary(group_id=group_id, month=month, category=category, payer_id=payer_id,
+                                       amount=total, count=count))
+        else:
+            summary.amount += total
+            summary.count += count
+            updated.append(summary)
+
+    CostSummary.objects.bulk_update(updated, ['amount', 'count'])
+    CostSummary.objects.bulk_create(created)
+
+
+def record_costs(costs):
+    """
+    Adds newly created costs to the balances (unsettled ones) and to the cost summary; call in the transaction
+    that created them
+    """
+    costs = list(costs)
+    mark_changed(group_ids=[cost.group_id for cost in costs])  # bulk_create sends no post_save
+    totals = sum_costs(cost for cost in costs if not cost.settled)
+    spend = sum_spend(costs)
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                apply_totals(totals)
+                apply_spend(spend)
+            return
+        except IntegrityError:
+            # a concurrent request inserted one of the missing pairs first, the retry updates it instead
+            if attempt:
+                raise
+
+
+def settle_costs(costs):
+    """
+    Marks the unsettled costs of the `costs` queryset as settled and removes them from the balances.
+    Returns the number of costs settled.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        costs = list(costs.select_for_update().filter(settled=False))
+        if not costs:
+            return 0
+        totals = sum_costs(costs)
+        Cost.objects.filter(id__in=[cost.id for cost in costs]).update(
+            settled=True, settled_date=now.date(), settled_time=now.time()
+        )
+        apply_totals({key: -amount for key, amount in totals.items()})
+        mark_changed(group_ids=[cost.group_id for cost in costs])
+    return len(costs)
+
+
+def get_balances(group):
+    """
+    Returns who owes whom in a group as a list of {'payer', 'borrower', 'amount'} with both directions of a
+    pair netted out, largest debts first. Reads only the group's Balance rows.
+    """
+    pairs = {}
+    for balance in Balance.objects.filter(group=group).select_related('payer', 'borrower'):
+        pairs[(balance.payer_id, balance.borrower_id)] = balance
+
+    debts = []
+    for (payer_id, borrower_id), balance in pairs.items():
+        reverse = pairs.get((borrower_id, payer_id))
+        amount = balance.amount - (reverse.amount if reverse is not None else 0)
+        if amount > 0:
+            debts.append({
+                'payer': {'id': payer_id, 'username': balance.payer.username},
+                'borrower': {'id': borrower_id, 'username': balance.borrower.username},
+                'amount': amount,
+            })
+    debts.sort(key=lambda debt: (-debt['amount'], debt['payer']['id'], debt['borrower']['id']))
+    return debts
+
+
+def get_net_balances(group):
+    """ Returns {user_id: net} for a group, positive when the member is owed money, from the Balance rows """
+    net = defaultdict(Decimal)
+    for payer_id, borrower_id, amount in Balance.objects.filter(group=group).values_list(
+            'payer_id', 'borrower_id', 'amount'):
+        net[payer_id] += amount
+        net[borrower_id] -= amount
+    return net
+
+
+def plan_settlement(group):
+    """
+    Computes a short list of transfers that settles every debt in a group.
+    Pairwise debts are netted per member first, then the largest debtor repeatedly pays the largest creditor
+    (greedy matching with heaps, exact Decimal cents), which needs at most one transfer less than the number
+    of members with a non-zero balance.
+    Returns a list of {'from', 'to', 'amount'}, 'from' paying 'to'.
+    """
+    net = get_net_balances(group)
+    creditors = [(-amount, user_id) for user_id, amount in net.items() if amount > 0]
+    debtors = [(amount, user_id) for user_id, amount in net.items() if amount < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor_id = heapq.heappop(creditors)
+        debt, debtor_id = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor_id, creditor_id, amount))
+
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor_id))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor_id))
+
+    users = User.objects.in_bulk({user_id for transfer in transfers for user_id in transfer[:2]})
+    return [{
+        'from': {'id': debtor_id, 'username': users[debtor_id].username},
+        'to': {'id': creditor_id, 'username': users[creditor_id].username},
+        'amount': amount,
+    } for debtor_id, creditor_id, amount in transfers]
+
+
+def apply_settlement(group):
+    """
+    Settles the whole group: computes the plan and marks every unsettled Cost of the group as settled, in one
+    transaction so costs added concurrently are either part of the plan or left unsettled.
+    Returns the plan and the number of costs settled.
+    """
+    with transaction.atomic():
+        list(Balance.objects.select_for_update().filter(group=group))
+        plan = plan_settlement(group)
+        settled = settle_costs(Cost.objects.filter(group=group))
+    return plan, settled
+
+
+def compute_balances(group_ids=None):
+    """ Recomputes {(group_id, payer_id, borrower_id): total} from the unsettled Cost rows """
+    costs = Cost.objects.filter(settled=False)
+    if group_ids is not None:
+        costs = costs.filter(group_id__in=group_ids)
+    totals = {}
+    for row in costs.values('group_id', 'payer_id', 'borrower_id').annotate(total=Sum('amount')).order_by():
+        if row['payer_id'] != row['borrower_id']:
+            totals[(row['group_id'], row['payer_id'], row['borrower_id'])] = to_decimal(row['total'])
+    return totals
+
+
+def reconcile_balances(group_ids=None, fix=True):
+    """
+    Compares the Balance table with balances recomputed from Cost.
+    Returns the drifting keys as {(group_id, payer_id, borrower_id): (stored, expected)}; rewrites them if `fix`.
+    """
+    expected = compute_balances(group_ids)
+    balances = Balance.objects.all()
+    if group_ids is not None:
+        balances = balances.filter(group_id__in=group_ids)
+
+    with transaction.atomic():
+        stored = {(b.group_id, b.payer_id, b.borrower_id): b.amount for b in balances.select_for_update()}
+        drift = {}
+        for key in stored.keys() | expected.keys():
+            stored_amount = stored.get(key, Decimal('0.00'))
+            expected_amount = expected.get(key, Decimal('0.00'))
+            if stored_amount != expected_amount:
+                drift[key] = (stored_amount, expected_amount)
+
+        if fix and drift:
+            apply_totals({key: expected_amount - stored_amount
+                          for key, (stored_amount, expected_amount) in drift.items()})
+    return drift
+
+
+def rebuild_cost_summary(group_ids=None):
+    """ Rewrites the CostSummary rows of the given groups (default all) from Cost; returns the number of rows """
+    costs = Cost.objects.all()
+    summaries = CostSummary.objects.all()
+    if group_ids is not None:
+        costs = costs.filter(group_id__in=group_ids)
+        summaries = summaries.filter(group_id__in=group_ids)
+
+    rows = (costs.annotate(month=TruncMonth('date'))
+            .values('group_id', 'month', 'category', 'payer_id')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by())
+    spend = defaultdict(lambda: (Decimal('0.00'), 0))
+    for row in rows:
+        # null and empty categories are both stored as ''
+        key = (row['group_id'], row['month'], row['category'] or '', row['payer_id'])
+        total, count = spend[key]
+        spend[key] = (total + to_decimal(row['total']), count + row['count'])
+
+    with transaction.atomic():
+        changed = set(summaries.values_list('group_id', flat=True).distinct())
+        changed.update(group_id for group_id, _, _, _ in spend)
+        summaries.delete()
+        CostSummary.objects.bulk_create([
+            CostSummary(group_id=group_id, month=month, category=category, payer_id=payer_id, amount=total,
+                        count=count)
+            for (group_id, month, category, payer_id), (total, count) in spend.items()
+        ])
+        mark_changed(group_ids=changed)
+    return len(spend)
+
+
+def get_cost_summary(group, start=None, end=None):
+    """
+    Spend of a group per category, payer and month, for the months from `start` to `end` (first days of
+    months, both included). Reads only the group's CostSummary rows.
+    """
+    summaries = CostSummary.objects.filter(group=group)
+    if start is not None:
+        summaries = summaries.filter(month__gte=start)
+    if end is not None:
+        summaries = summaries.filter(month__lte=end)
+
+    categories = defaultdict(lambda: [Decimal('0.00'), 0])
+    payers = defaultdict(lambda: [Decimal('0.00'), 0])
+    months = defaultdict(lambda: [Decimal('0.00'), 0])
+    for month, category, payer_id, username, amount, count in summaries.values_list(
+            'month', 'category', 'payer_id', 'payer__username', 'amount', 'count'):
+        for totals in (categories[category or None], payers[(payer_id, username)], months[month]):
+            totals[0] += amount
+            totals[1] += count
+
+    by_amount = lambda item: (-item[1][0], str(item[0]))
+    return {
+        'total': sum((amount for amount, _ in months.values()), Decimal('0.00')),
+        'count': sum(count for _, count in months.values()),
+        'categories': [{'category': category, 'amount': amount, 'count': count}
+                       for category, (amount, count) in sorted(categories.items(), key=by_amount)],
+        'payers': [{'payer': {'id': payer_id, 'username': username}, 'amount': amount, 'count': count}
+                   for (payer_id, username), (amount, count) in sorted(payers.items(), key=by_amount)],
+        'months': [{'month': month, 'amount': amount, 'count': count}
+                   for month, (amount, count) in sorted(months.items())],
+    }
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chore_tracker.models import Group
+from chore_tracker.scheduler import materialize_due_groups, BATCH_SIZE
+from chore_tracker.utils import update_recurring_events
+
+
+class Command(BaseCommand):
+    help = "Extend stored occurrences of recurring events up to the materialization horizon"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help="Materialize up to this date (YYYY-MM-DD)")
+        parser.add_argument('--group', type=int, help="Only process this group id")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--until must be a date in YYYY-MM-DD format")
+
+        if options['group'] is not None:
+            try:
+                group = Group.objects.get(id=options['group'])
+            except Group.DoesNotExist:
+                raise CommandError(f"Group {options['group']} not found")
+            update_recurring_events(group, until=until)
+            updated = 1
+        else:
+            updated = materialize_due_groups(until=until, batch_size=options['batch_size'])
+
+        self.stdout.write(f"Materialized recurrences for {updated} groups")
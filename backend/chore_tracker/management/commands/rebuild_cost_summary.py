@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from chore_tracker.ledger import rebuild_cost_summary
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per month, category and payer cost summary from Cost"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', type=int, action='append', help="Only rebuild this group id (repeatable)")
+
+    def handle(self, *args, **options):
+        rows = rebuild_cost_summary(group_ids=options['group'])
+        self.stdout.write(f"Rebuilt {rows} cost summary rows")
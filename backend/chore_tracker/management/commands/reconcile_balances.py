@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from chore_tracker.ledger import reconcile_balances
+
+
+class Command(BaseCommand):
+    help = "Rebuild the balance ledger from unsettled costs and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', type=int, action='append', help="Only reconcile this group id (repeatable)")
+        parser.add_argument('--dry-run', action='store_true', help="Only report drift, do not fix it")
+
+    def handle(self, *args, **options):
+        drift = reconcile_balances(group_ids=options['group'], fix=not options['dry_run'])
+
+        for (group_id, payer_id, borrower_id), (stored, expected) in sorted(drift.items()):
+            self.stdout.write(f"group {group_id}: user {borrower_id} owes user {payer_id} "
+                              f"{expected}, ledger had {stored}")
+
+        action = "Found" if options['dry_run'] else "Fixed"
+        self.stdout.write(f"{action} {len(drift)} drifting balances")
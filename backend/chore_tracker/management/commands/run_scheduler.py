@@ -0,0 +1,29 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from chore_tracker.scheduler import run_pending, get_worker_id, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ("Run the maintenance jobs (recurring events, recurring costs, stats rollup), which the app needs to "
+            "keep recurring events stored ahead; several runners may share one database")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the due jobs once and exit")
+        parser.add_argument('--force', action='store_true', help="Run every job now, even if not due")
+        parser.add_argument('--interval', type=int, default=60, help="Seconds between checks for due jobs")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        worker_id = get_worker_id()
+        while True:
+            for metrics in run_pending(worker_id=worker_id, batch_size=options['batch_size'],
+                                       force=options['force']):
+                self.stdout.write(json.dumps(metrics))
+            if options['once']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
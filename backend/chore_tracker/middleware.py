@@ -0,0 +1,175 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+from django.http import HttpResponse
+
+# Upper bounds (seconds) of the request duration histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class QueryRecorder:
+    """ connection.execute_wrapper hook counting queries, their time and repeated SQL (N+1 patterns) """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.seen = set()
+        self.duplicates = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            if sql in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(sql)
+
+
+# Recorder of the request being served. A context variable rather than a wrapper on the request thread's
+# connection: connections are per thread, and the ORM calls of async views run in a worker thread.
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """ Execute wrapper kept on every connection, forwards to the current request's recorder if any """
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """ connection_created receiver (see apps.py), also called per request for connections opened earlier """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ViewMetrics:
+    """ Per-view request counters and duration histograms, rendered in the Prometheus text format """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = defaultdict(int)
+        self.buckets = defaultdict(lambda: [0] * len(BUCKETS))
+        self.seconds = defaultdict(float)
+        self.queries = defaultdict(int)
+        self.db_seconds = defaultdict(float)
+        self.duplicates = defaultdict(int)
+
+    def observe(self, view, duration, recorder):
+        i = bisect_left(BUCKETS, duration)
+        with self.lock:
+            self.requests[view] += 1
+            if i < len(BUCKETS):
+                self.buckets[view][i] += 1
+            self.seconds[view] += duration
+            self.queries[view] += recorder.count
+            self.db_seconds[view] += recorder.duration
+            self.duplicates[view] += recorder.duplicates
+
+    def render(self):
+        lines = [
+            '# HELP chore_tracker_request_duration_seconds Wall time of requests per view',
+            '# TYPE chore_tracker_request_duration_seconds histogram',
+        ]
+        with self.lock:
+            views = sorted(self.requests)
+            for view in views:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, self.buckets[view]):
+                    cumulative += count
+                    lines.append(f'chore_tracker_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} '
+                                 f'{cumulative}')
+                lines.append(f'chore_tracker_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} '
+                             f'{self.requests[view]}')
+                lines.append(f'chore_tracker_request_duration_seconds_sum{{view="{view}"}} {self.seconds[view]:.6f}')
+                lines.append(f'chore_tracker_request_duration_seconds_count{{view="{view}"}} {self.requests[view]}')
+
+            for name, help_text, values, fmt in (
+                ('db_queries_total', 'SQL queries issued per view', self.queries, '{}'),
+                ('db_duration_seconds_total', 'Time spent in SQL per view', self.db_seconds, '{:.6f}'),
+                ('db_duplicate_queries_total', 'Queries repeating an earlier SQL statement of the same request',
+                 self.duplicates, '{}'),
+            ):
+                lines.append(f'# HELP chore_tracker_{name} {help_text}')
+                lines.append(f'# TYPE chore_tracker_{name} counter')
+                for view in views:
+                    lines.append(f'chore_tracker_{name}{{view="{view}"}} {fmt.format(values[view])}')
+        return '\n'.join(lines) + '\n'
+
+
+view_metrics = ViewMetrics()
+
+
+def get_view_name(request):
+    """ View class (or function) name of the resolved URL; read after the fact, no process_view hop under ASGI """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, 'view_class', None)
+    return view_class.__name__ if view_class is not None else match.func.__name__
+
+
+class QueryMetricsMiddleware:
+    """
+    Records query count, DB time, duplicate queries and wall time of every request, keyed by view class.
+    Adds a Server-Timing header and feeds the /metrics endpoint. Overhead is a timer and a set insert per query.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        install_query_recorder(connection=connection)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    def finish(self, request, response, recorder, duration):
+        view = get_view_name(request)
+        if view is not None:
+            view_metrics.observe(view, duration, recorder)
+        response['Server-Timing'] = (f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries, '
+                                     f'{recorder.duplicates} duplicates", total;dur={duration * 1000:.2f}')
+        return response
+
+
+def metrics_view(request):
+    """ Prometheus scrape endpoint """
+    return HttpResponse(view_metrics.render(), content_type='text/plain; version=0.0.4')
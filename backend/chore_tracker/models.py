@@ -1,9 +1,16 @@
+import uuid
+
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import BaseUserManager
 from django.utils import timezone
 
+# Allows `username__lower=...` lookups, which can use the Lower(username) index below
+models.CharField.register_lookup(Lower)
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -35,6 +42,12 @@ class User(AbstractBaseUser):
     email = models.EmailField(max_length=60)
     photo_url = models.CharField(max_length=60, default="None")
 
+    class Meta:
+        indexes = [
+            # case-insensitive login / lookups; substring search gets a trigram index on Postgres (see apps.py)
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -50,6 +63,13 @@ class Group(models.Model):
     status = models.CharField(max_length=30)
     expiration = models.DateTimeField(null=True, blank=True)
     timezone = models.CharField(max_length=30)
+    # Recurring events are stored as rows up to this date, later occurrences are expanded on read
+    materialized_until = models.DateField(null=True, blank=True)
+    # Bumped on every write to the group, its members, events or costs; read endpoints derive ETags from it
+    revision = models.PositiveBigIntegerField(default=0)
+    modified_at = models.DateTimeField(null=True, blank=True)
+    # Days up to this date are summarized in DailyStat, see chore_tracker/stats.py
+    stats_rolled_until = models.DateField(null=True, blank=True)
 
     # Relationships
     creator = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name="owned_groups")
@@ -64,16 +84,107 @@ class Event(models.Model):
     name = models.CharField(max_length=60)
     first_date = models.DateField()
     repeat_every = models.CharField(max_length=40, null=True, blank=True)
+    # Shared by every stored occurrence of a recurring event; the row with the lowest id is the series' rule
+    series_id = models.UUIDField(default=uuid.uuid4)
+    # Last date the series repeats on, set when it is ended or split ("this and following" edits)
+    repeat_until = models.DateField(null=True, blank=True)
 
     # Relationships
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name="events")
     members = models.ManyToManyField(User, related_name="events")
     is_complete = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # occurrence lookups and keyset pagination on (first_date, id) within a group
+            models.Index(fields=['group', 'first_date', 'name'], name='event_group_date_name_idx'),
+            # series lookups: occurrences of a series, its root and set-based deletes
+            models.Index(fields=['series_id', 'first_date'], name='event_series_date_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class EventException(models.Model):
+    """ Per-date override of a recurring Event, so single occurrences can differ without storing every one """
+    id = models.AutoField(primary_key=True)
+    date = models.DateField()
+    is_cancelled = models.BooleanField(default=False)
+    is_complete = models.BooleanField(default=False)
+
+    # Relationships
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="exceptions")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'date'], name='unique_event_exception_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.event.name} ({self.date})"
+
+
+class Completion(models.Model):
+    """
+    Who completed which occurrences of a series, as one bitmap per (series, user, month): bit n of `days` is
+    day n + 1 of `month`. Rows only exist for months with completions, see chore_tracker/completions.py.
+    """
+    id = models.AutoField(primary_key=True)
+    series_id = models.UUIDField()
+    month = models.DateField()  # first day of the month
+    days = models.IntegerField(default=0)
+
+    # Relationships
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name="completions")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="completions")
+
+    class Meta:
+        constraints = [
+            # also serves range scans over a series
+            models.UniqueConstraint(fields=['series_id', 'month', 'user'], name='unique_completion_month'),
+        ]
+        indexes = [
+            models.Index(fields=['group', 'month'], name='completion_group_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} ({self.month:%Y-%m})"
+
+
+class DailyStat(models.Model):
+    """
+    Rollup of a group's stored occurrences on one day: assigned to and completed for one member, or all of the
+    group's occurrences when `user` is null. Maintained by chore_tracker/stats.py.
+    """
+    id = models.AutoField(primary_key=True)
+    date = models.DateField()
+    assigned = models.PositiveIntegerField(default=0)
+    # completed by the member themselves (by anyone for the group total)
+    completed = models.PositiveIntegerField(default=0)
+    # of the assigned occurrences, those completed by anyone
+    done = models.PositiveIntegerField(default=0)
+
+    # Relationships
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name="daily_stats")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="daily_stats")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['group', 'date'], name='dailystat_group_date_idx'),
+        ]
+        constraints = [
+            # the group total (null user) needs its own constraint, nulls never conflict
+            models.UniqueConstraint(fields=['group', 'date', 'user'], condition=Q(user__isnull=False),
+                                    name='unique_dailystat_member'),
+            models.UniqueConstraint(fields=['group', 'date'], condition=Q(user__isnull=True),
+                                    name='unique_dailystat_total'),
+        ]
+
+    def __str__(self):
+        return f"{self.group} {self.date}: {self.completed}/{self.assigned}"
+
+
 class Cost(models.Model):
     id = models.AutoField(primary_key=True)
     transaction_id = models.UUIDField(null=True, blank=True)  # to group Costs that are part of the same transaction
@@ -91,6 +202,74 @@ class Cost(models.Model):
     borrower = models.ForeignKey(User, on_delete=models.CASCADE, related_name="borrower")
     payer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="costs")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['group', 'settled'], name='cost_group_settled_idx'),
+            # outstanding debts only, a small fraction of the table once groups settle up
+            models.Index(fields=['group', 'payer', 'borrower'], condition=Q(settled=False),
+                         name='cost_unsettled_idx'),
+            models.Index(fields=['borrower', 'payer'], name='cost_borrower_payer_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Balance(models.Model):
+    """ Running total of what `borrower` owes `payer` in a group over unsettled Costs, see chore_tracker/ledger.py """
+    id = models.AutoField(primary_key=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Relationships
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name="balances")
+    payer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="credit_balances")
+    borrower = models.ForeignKey(User, on_delete=models.CASCADE, related_name="debit_balances")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'payer', 'borrower'], name='unique_balance_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.borrower} owes {self.payer} {self.amount}"
+
+
+class CostSummary(models.Model):
+    """ Total of a group's Costs per month, category and payer, kept up to date by chore_tracker/ledger.py """
+    id = models.AutoField(primary_key=True)
+    month = models.DateField()  # first day of the month
+    category = models.CharField(max_length=40, blank=True, default='')  # '' for uncategorized costs
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    # Relationships
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name="cost_summaries")
+    payer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="cost_summaries")
+
+    class Meta:
+        constraints = [
+            # also serves the month range reads of a group
+            models.UniqueConstraint(fields=['group', 'month', 'category', 'payer'], name='unique_cost_summary'),
+        ]
+
+    def __str__(self):
+        return f"{self.group} {self.month:%Y-%m} {self.category}: {self.amount}"
+
+
+class ScheduledJob(models.Model):
+    """ Maintenance job run by chore_tracker/scheduler.py; the lease columns elect a single runner per job """
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=60, unique=True)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    # Metrics of the last run
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_duration = models.FloatField(null=True, blank=True)
+    last_processed = models.IntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+
     def __str__(self):
         return self.name
 
@@ -112,39 +291,78 @@ class RecurringCost(models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name="recurring_costs")
     payer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recurring_costs")
     borrowers = models.ManyToManyField(User, related_name="recurring_cost_borrowers")
+    # Date of the last cycle whose Costs were generated
+    generated_through = models.DateField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.name} ({self.frequency})"
 
-    def generate_costs(self):
-        """Generate individual Cost entries based on the recurrence pattern."""
-        from datetime import timedelta, date
+    def generate_costs(self, until=None):
+        """
+        Generate the Cost entries of the cycles that have not been generated yet, up to `until` (default today).
+        Runs are incremental and idempotent: the last generated cycle is stored in `generated_through`.
+        """
+        from datetime import date
+        from decimal import Decimal, ROUND_HALF_UP
+        from dateutil.relativedelta import relativedelta
+        from django.db import transaction
         import uuid
+        from chore_tracker.ledger import record_costs
 
         interval = {
-            'daily': timedelta(days=1),
-            'weekly': timedelta(weeks=1),
-            'monthly': timedelta(days=30),  # Approximation for simplicity
+            'daily': relativedelta(days=1),
+            'weekly': relativedelta(weeks=1),
+            'monthly': relativedelta(months=1),
         }.get(self.frequency)
 
         if not interval:
             raise ValueError("Invalid frequency")
 
-        current_date = self.start_date
-        while current_date <= (self.end_date or date.today()):
-            # Generate a unique transaction_id for this recurrence cycle
-            transaction_id = uuid.uuid4()
-
-            for borrower in self.borrowers.all():
-                Cost.objects.create(
-                    name=self.name,
-                    category=self.category,
-                    time=timezone.now().time(),
-                    date=current_date,
-                    amount=(self.amount / self.borrowers.count()),
-                    group=self.group,
-                    payer=self.payer,
-                    borrower=borrower,
-                    transaction_id=transaction_id
-                )
-            current_date += interval
+        until = until or date.today()
+        if self.end_date is not None and self.end_date < until:
+            until = self.end_date
+
+        with transaction.atomic():
+            # Lock the row so concurrent runs cannot generate the same cycle twice
+            locked = RecurringCost.objects.select_for_update().get(pk=self.pk)
+            self.generated_through = locked.generated_through
+
+            borrowers = list(self.borrowers.all())
+            if not borrowers:
+                return []
+            amount = (Decimal(self.amount) / len(borrowers)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            time = timezone.now().time()
+
+            costs = []
+            # Cycles are start_date + n * interval, so monthly costs keep their day of month.
+            # Jump close to the watermark instead of walking every past cycle.
+            n = 0
+            if self.generated_through is not None:
+                max_days = {'daily': 1, 'weekly': 7, 'monthly': 31}[self.frequency]
+                n = max(0, (self.generated_through - self.start_date).days // max_days)
+            current_date = self.start_date + interval * n
+            while current_date <= until:
+                if self.generated_through is None or current_date > self.generated_through:
+                    # Generate a unique transaction_id for this recurrence cycle
+                    transaction_id = uuid.uuid4()
+                    for borrower in borrowers:
+                        costs.append(Cost(
+                            name=self.name,
+                            category=self.category,
+                            time=time,
+                            date=current_date,
+                            amount=amount,
+                            group_id=self.group_id,
+                            payer_id=self.payer_id,
+                            borrower=borrower,
+                            transaction_id=transaction_id
+                        ))
+                    self.generated_through = current_date
+                n += 1
+                current_date = self.start_date + interval * n
+
+            if costs:
+                Cost.objects.bulk_create(costs)
+                record_costs(costs)
+                RecurringCost.objects.filter(pk=self.pk).update(generated_through=self.generated_through)
+        return costs
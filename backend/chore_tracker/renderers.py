@@ -0,0 +1,53 @@
+"""
+JSON rendering for API responses.
+
+orjson is used when it is installed (it serializes dates, datetimes and UUIDs natively and is several times
+faster than the stdlib encoder on large payloads such as the dashboard); otherwise, or with
+settings.JSON_RENDERER = 'stdlib', the stdlib encoder with DjangoJSONEncoder is used. Both render Decimals
+as strings, like DjangoJSONEncoder. orjson keeps the microseconds of times and datetimes, which
+DjangoJSONEncoder truncates to milliseconds.
+"""
+import json
+from datetime import date, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def orjson_default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (date, time)):
+        # subclasses of date and time (e.g. freezegun's) are not serialized natively
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def use_orjson():
+    return orjson is not None and getattr(settings, 'JSON_RENDERER', 'orjson') == 'orjson'
+
+
+def dumps(data):
+    """ Renders `data` to JSON bytes """
+    if use_orjson():
+        return orjson.dumps(data, default=orjson_default, option=ORJSON_OPTIONS)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class JsonResponse(HttpResponse):
+    """ Drop-in replacement for django.http.JsonResponse that renders with dumps() """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
@@ -0,0 +1,179 @@
+"""
+Per-group revision counters and conditional GET support.
+
+Every write to a group's events, costs, members or to the group itself bumps Group.revision (and
+Group.modified_at) through mark_changed, which is called from the model signals in chore_tracker/signals.py and
+from the bulk write paths that send no signals. Read endpoints derive an ETag and Last-Modified from those
+columns with a single indexed lookup and answer If-None-Match / If-Modified-Since with 304 before building
+their payload.
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from chore_tracker.cache import invalidate
+from chore_tracker.models import Group, Event
+
+
+def bump_revisions(group_ids):
+    group_ids = set(group_ids)
+    if group_ids:
+        Group.objects.filter(id__in=group_ids).update(revision=F('revision') + 1, modified_at=timezone.now())
+
+
+def mark_changed(group_ids=(), user_ids=()):
+    """ Records a write to the given groups (and memberships of the given users) for caches and validators """
+    group_ids = set(group_ids)
+    bump_revisions(group_ids)
+    invalidate(group_ids=group_ids, user_ids=user_ids)
+
+
+def make_etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def parse_id(value):
+    """ Returns `value` as a primary key, or None if it is not one; validators run before the handler checks it """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def group_filter(request):
+    group_id = parse_id(request.GET.get('group_id'))
+    if group_id is None:
+        return Group.objects.none().values('id', 'revision', 'modified_at')
+    return Group.objects.filter(id=group_id).values('id', 'revision', 'modified_at')
+
+
+def group_etag(group):
+    if group is None:
+        return None, None
+    return f"g{group['id']}-{group['revision']}", group['modified_at']
+
+
+def group_validators(request, *args, **kwargs):
+    """ (etag, last_modified) of the group in ?group_id= """
+    return group_etag(next(iter(group_filter(request)), None))
+
+
+async def agroup_validators(request, *args, **kwargs):
+    return group_etag(await group_filter(request).afirst())
+
+
+def event_filter(event_id):
+    event_id = parse_id(event_id)
+    if event_id is None:
+        return Event.objects.none().values('id', 'group_id', 'group__revision', 'group__modified_at')
+    return Event.objects.filter(id=event_id).values('id', 'group_id', 'group__revision', 'group__modified_at')
+
+
+def event_etag(event):
+    if event is None:
+        return None, None
+    return f"e{event['id']}-g{event['group_id']}-{event['group__revision']}", event['group__modified_at']
+
+
+def event_validators(request, event_id, *args, **kwargs):
+    """ (etag, last_modified) of an event, from the revision of its group """
+    return event_etag(next(iter(event_filter(event_id)), None))
+
+
+async def aevent_validators(request, event_id, *args, **kwargs):
+    return event_etag(await event_filter(event_id).afirst())
+
+
+def current_user_filter(user):
+    return Group.objects.filter(members=user).order_by('id').values_list('id', 'revision')
+
+
+def current_user_etag(request, revisions):
+    user = request.user
+    return make_etag(user.id, user.username, user.email, request.GET.get('to') or date.today(), revisions), None
+
+
+def current_user_validators(request, *args, **kwargs):
+    """
+    (etag, None) of the dashboard, from the revisions of the user's groups.
+    The expansion window is part of the ETag since virtual occurrences depend on it. There is no Last-Modified:
+    leaving a group changes the dashboard without making any of the remaining groups newer.
+    """
+    return current_user_etag(request, list(current_user_filter(request.user)))
+
+
+async def acurrent_user_validators(request, *args, **kwargs):
+    return current_user_etag(request, [revision async for revision in current_user_filter(request.user)])
+
+
+def set_validators(response, etag, timestamp):
+    if etag is not None:
+        response.headers['ETag'] = etag
+    if timestamp is not None:
+        response.headers['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+def check_preconditions(request, etag, last_modified):
+    """ Returns (etag, timestamp, response), where response is a 304 when the client's copy is current """
+    if etag is not None:
+        etag = quote_etag(etag)
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    if etag is None and timestamp is None:
+        return etag, timestamp, None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if not_modified is not None:
+        not_modified = set_validators(not_modified, etag, timestamp)
+    return etag, timestamp, not_modified
+
+
+def finish_response(request, response, etag, timestamp, hash_body):
+    """ Adds the validators to a freshly built response, or hashes its body when there were none """
+    if response.status_code != 200:
+        return response
+    if hash_body:
+        etag = quote_etag(hashlib.md5(response.content).hexdigest())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return set_validators(not_modified, etag, timestamp)
+    return set_validators(response, etag, timestamp)
+
+
+def conditional(validators=None):
+    """
+    Decorates an APIView GET handler with ETag / Last-Modified support.
+    `validators(request, *args, **kwargs)` returns (etag, last_modified) without building the payload; a
+    matching request gets a 304 before the handler runs. Without validators the ETag is a hash of the
+    response body, which saves the transfer but not the work.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            validated = validators(request, *args, **kwargs) if validators else (None, None)
+            etag, timestamp, not_modified = check_preconditions(request, *validated)
+            if not_modified is not None:
+                return not_modified
+            response = handler(self, request, *args, **kwargs)
+            return finish_response(request, response, etag, timestamp, hash_body=validators is None)
+        return wrapper
+    return decorator
+
+
+def aconditional(validators=None):
+    """ conditional() for async handlers, `validators` is a coroutine function """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(self, request, *args, **kwargs):
+            validated = await validators(request, *args, **kwargs) if validators else (None, None)
+            etag, timestamp, not_modified = check_preconditions(request, *validated)
+            if not_modified is not None:
+                return not_modified
+            response = await handler(self, request, *args, **kwargs)
+            return finish_response(request, response, etag, timestamp, hash_body=validators is None)
+        return wrapper
+    return decorator
@@ -0,0 +1,183 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from chore_tracker.models import Group, RecurringCost, ScheduledJob
+from chore_tracker.stats import roll_up_due_groups
+from chore_tracker.utils import update_recurring_events, get_materialize_until
+from django.db import close_old_connections, transaction
+from django.db.models import Q, F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+# How long a runner owns a job without renewing its lease; renewed after every batch
+LEASE = timedelta(minutes=5)
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def materialize_due_groups(until=None, batch_size=BATCH_SIZE, heartbeat=None):
+    """
+    Extends the stored recurrences of every group whose materialized_until watermark is behind `until`.
+    Groups are processed in id order, `batch_size` at a time, one transaction per group.
+    Returns the number of groups updated.
+    """
+    if until is None:
+        until = get_materialize_until()
+
+    due = Group.objects.filter(Q(materialized_until__isnull=True) | Q(materialized_until__lt=until)).order_by('id')
+    updated = 0
+    last_id = 0
+    while True:
+        batch = list(due.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return updated
+        for group in batch:
+            with transaction.atomic():
+                update_recurring_events(group, until=until)
+            updated += 1
+        last_id = batch[-1].id
+        if heartbeat is not None:
+            heartbeat()
+
+
+def generate_due_costs(until=None, batch_size=BATCH_SIZE, heartbeat=None):
+    """
+    Runs RecurringCost.generate_costs for every recurring cost that may have cycles left, `batch_size` at a time.
+    Each recurring cost is generated in its own transaction. Returns the number of costs created.
+    """
+    until = until or timezone.now().date()
+    due = (RecurringCost.objects
+           .filter(Q(end_date__isnull=True) | Q(generated_through__isnull=True) | Q(generated_through__lt=F('end_date')))
+           .filter(Q(generated_through__isnull=True) | Q(generated_through__lt=until))
+           .filter(start_date__lte=until)
+           .order_by('id'))
+    created = 0
+    last_id = 0
+    while True:
+        batch = list(due.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return created
+        for recurring_cost in batch:
+            try:
+                created += len(recurring_cost.generate_costs(until=until))
+            except ValueError as e:
+                logger.error(f"{recurring_cost}: {e}")
+        last_id = batch[-1].id
+        if heartbeat is not None:
+            heartbeat()
+
+
+# name -> (function, seconds between runs)
+JOBS = {
+    'materialize_recurrences': (materialize_due_groups, 15 * 60),
+    'generate_recurring_costs': (generate_due_costs, 60 * 60),
+    'roll_up_stats': (roll_up_due_groups, 60 * 60),
+}
+
+
+def get_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def acquire_lease(name, worker_id):
+    """
+    Takes or renews the lease on a job with one conditional UPDATE, which the database serializes on the row:
+    only one runner can win while the current lease is still valid. Returns True if `worker_id` holds it.
+    """
+    now = timezone.now()
+    return ScheduledJob.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now) | Q(locked_by=worker_id), name=name
+    ).update(locked_by=worker_id, locked_until=now + LEASE) == 1
+
+
+def release_lease(name, worker_id, **fields):
+    ScheduledJob.objects.filter(name=name, locked_by=worker_id).update(locked_by=None, locked_until=None, **fields)
+
+
+def run_job(name, worker_id=None, batch_size=BATCH_SIZE):
+    """
+    Runs one job if this runner wins its lease. Returns the run's metrics, or None if another runner has it.
+    """
+    worker_id = worker_id or get_worker_id()
+    function, interval = JOBS[name]
+    ScheduledJob.objects.get_or_create(name=name)
+    if not acquire_lease(name, worker_id):
+        return None
+
+    started = timezone.now()
+    start = time.perf_counter()
+    processed = 0
+    error = None
+    try:
+        processed = function(batch_size=batch_size, heartbeat=lambda: acquire_lease(name, worker_id))
+    except Exception as e:
+        logger.error(f"{name} failed: {e}")
+        error = str(e)
+    duration = time.perf_counter() - start
+
+    release_lease(name, worker_id, next_run_at=started + timedelta(seconds=interval), last_run_at=started,
+                  last_duration=duration, last_processed=processed, last_error=error)
+    return {
+        'job': name,
+        'processed': processed,
+        'duration': round(duration, 4),
+        'throughput': round(processed / duration, 2) if duration > 0 else None,
+        'error': error,
+    }
+
+
+def run_pending(worker_id=None, batch_size=BATCH_SIZE, force=False):
+    """ Runs every job that is due (or all of them with `force`) and returns their metrics """
+    now = timezone.now()
+    for name in JOBS:
+        ScheduledJob.objects.get_or_create(name=name)
+    due = ScheduledJob.objects.filter(name__in=JOBS.keys())
+    if not force:
+        due = due.filter(Q(next_run_at__isnull=True) | Q(next_run_at__lte=now))
+
+    metrics = []
+    for name in due.order_by('name').values_list('name', flat=True):
+        result = run_job(name, worker_id=worker_id, batch_size=batch_size)
+        if result is not None:
+            metrics.append(result)
+    return metrics
+
+
+class RecurrenceWorker(threading.Thread):
+    """ Background thread that runs the due scheduler jobs every `interval` seconds """
+
+    def __init__(self, interval):
+        super().__init__(name="recurrence-worker", daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                for metrics in run_pending():
+                    logger.info(f"scheduler run: {metrics}")
+            except Exception as e:
+                logger.error(e)
+            finally:
+                close_old_connections()
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_worker(interval):
+    """ Starts the in-process worker once per process """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = RecurrenceWorker(interval)
+            _worker.start()
+        return _worker
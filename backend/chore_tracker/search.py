@@ -0,0 +1,264 @@
+import re
+import secrets
+import threading
+from bisect import bisect_left, insort
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from chore_tracker.cache import get_cache
+
+User = get_user_model()
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Upper bound on index entries examined per query
+MAX_SCAN = 500
+
+# Usernames are also searchable by their parts, so "smith" finds "john_smith"
+TOKEN_SEPARATORS = re.compile(r'[\W_]+')
+
+# Ranks, lower is better
+EXACT, PREFIX, TOKEN_PREFIX, FUZZY = range(4)
+# Shortest query that also matches usernames one typo away
+MIN_FUZZY_LENGTH = 4
+
+# Shared by every process through the cache: a counter incremented for every username added, changed or
+# removed, the change itself being kept under CHANGE_KEY for CHANGE_TIMEOUT so that the other processes can
+# apply it to their index. It starts from a random value, so a counter that was evicted does not come back
+# with a value an index was already at.
+VERSION_KEY = 'search:usernames:version'
+CHANGE_KEY = 'search:usernames:{}'
+CHANGE_TIMEOUT = 60 * 60 * 24
+# An index further behind than this is rebuilt rather than brought up to date change by change
+MAX_CHANGES = 500
+
+
+def tokens(username):
+    """ Returns the lower-cased keys a username is indexed under: the full name and its later parts """
+    key = username.lower()
+    parts = [part for part in TOKEN_SEPARATORS.split(key) if part]
+    return [key] + [part for part in parts[1:] if part != key]
+
+
+def within_one_edit(a, b):
+    """ Whether b is a, or a with one character inserted, deleted or replaced """
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+def is_fuzzy_prefix(query, key):
+    """ Whether `key` starts with `query` give or take one typo """
+    n = len(query)
+    return any(within_one_edit(query, key[:length]) for length in (n - 1, n, n + 1))
+
+
+def get_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, secrets.randbelow(1 << 48), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_version():
+    cache = get_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, secrets.randbelow(1 << 48), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def next_version():
+    get_version()
+    try:
+        return get_cache().incr(VERSION_KEY)
+    except ValueError:  # evicted since
+        return get_version()
+
+
+def record_username(user_id, username):
+    """ Publishes a user's new username, None once deleted, to the UsernameIndex of every process """
+    get_cache().set(CHANGE_KEY.format(next_version()), (user_id, username), timeout=CHANGE_TIMEOUT)
+
+
+def invalidate_usernames():
+    """ Makes every process rebuild its UsernameIndex before the next search """
+    next_version()
+
+
+class UsernameIndex:
+    """
+    In-memory prefix index over usernames.
+    Keys are kept in a sorted array so a prefix query is a binary search plus a scan over the matches only,
+    independent of the total number of users. The User signals in chore_tracker/signals.py publish every
+    username change through the cache, and each process applies the ones it has not seen yet before its next
+    search, so a user registered through one worker process shows up in the others' searches too. The index
+    is only rebuilt from the database when it is missing, or when the changes it missed are no longer all in
+    the cache; one thread rebuilds at a time while the others keep searching the index they have.
+    """
+
+    def __init__(self):
+        self.keys = []  # sorted (key, username, id)
+        self.usernames = {}  # id: username, to find a user's keys when they change
+        self.lock = threading.Lock()
+        self.building = threading.Lock()
+        self.version = None
+
+    def build(self, version):
+        entries, usernames = [], {}
+        for user_id, username in User.objects.values_list('id', 'username').iterator(chunk_size=10000):
+            entries.extend((key, username, user_id) for key in tokens(username))
+            usernames[user_id] = username
+        entries.sort()
+        with self.lock:
+            self.keys = entries
+            self.usernames = usernames
+            self.version = version
+
+    def update(self, user_id, username):
+        """ Re-indexes one user under `username`, or drops them when it is None; the caller holds the lock """
+        old = self.usernames.pop(user_id, None)
+        if old is not None:
+            for key in tokens(old):
+                i = bisect_left(self.keys, (key, old, user_id))
+                if i < len(self.keys) and self.keys[i] == (key, old, user_id):
+                    del self.keys[i]
+        if username is not None:
+            for key in tokens(username):
+                insort(self.keys, (key, username, user_id))
+            self.usernames[user_id] = username
+
+    def missed_changes(self, version):
+        """ The changes between the index's version and `version`, None when they cannot all be replayed """
+        if self.version is None or not self.version < version <= self.version + MAX_CHANGES:
+            return None
+        keys = [CHANGE_KEY.format(number) for number in range(self.version + 1, version + 1)]
+        changes = get_cache().get_many(keys)
+        if len(changes) < len(keys):
+            return None
+        return [changes[key] for key in keys]
+
+    def refresh(self, version=None):
+        """
+        Brings the index up to the shared version. When it has to be rebuilt, the version is read before the
+        users, so a change committed during the build is picked up by the next refresh.
+        """
+        if version is None:
+            version = get_version()
+        if version == self.version:
+            return
+        changes = self.missed_changes(version)
+        if changes is not None:
+            with self.lock:
+                for user_id, username in changes:
+                    self.update(user_id, username)
+                self.version = max(self.version, version)
+            return
+        # only the first search has to wait for a build; later ones use the index they have meanwhile
+        if not self.building.acquire(blocking=self.version is None):
+            return
+        try:
+            if self.version != version:
+                self.build(version)
+        finally:
+            self.building.release()
+
+    async def arefresh(self):
+        version = await aget_version()
+        if version != self.version:
+            await sync_to_async(self.refresh)(version)
+
+    def reset(self):
+        """ Drops the index, it is rebuilt from the database on the next search """
+        with self.lock:
+            self.keys = []
+            self.usernames = {}
+            self.version = None
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """ lookup() on an up to date index """
+        self.refresh()
+        return self.lookup(query, limit)
+
+    def lookup(self, query, limit=DEFAULT_LIMIT):
+        """
+        Returns up to `limit` users as {'id', 'username'}: exact match first, then username prefix matches,
+        then matches on a later part of the username, shorter names first. When that leaves room, queries of
+        MIN_FUZZY_LENGTH or more also match usernames one typo away, provided the first letter and one of
+        the next two are right. At most MAX_SCAN index entries are looked at per scan, which keeps one-letter
+        queries as cheap as long ones.
+        """
+        query = query.lower()
+        ranked = {}
+
+        def rank_entry(rank, username, user_id):
+            ranked[user_id] = min(ranked.get(user_id, (rank, len(username), username)),
+                                  (rank, len(username), username))
+
+        with self.lock:
+            for key, username, user_id in self.scan(query):
+                if key == username.lower():
+                    rank_entry(EXACT if key == query else PREFIX, username, user_id)
+                else:
+                    rank_entry(TOKEN_PREFIX, username, user_id)
+
+            if len(ranked) < limit and len(query) >= MIN_FUZZY_LENGTH:
+                for prefix in {query[:2], query[0] + query[2]}:
+                    for key, username, user_id in self.scan(prefix):
+                        if user_id not in ranked and is_fuzzy_prefix(query, key):
+                            rank_entry(FUZZY, username, user_id)
+
+        results = sorted(ranked.items(), key=lambda item: item[1])[:limit]
+        return [{'id': user_id, 'username': username} for user_id, (_, _, username) in results]
+
+    def scan(self, prefix):
+        """ Yields up to MAX_SCAN entries whose key starts with `prefix`; the caller holds the lock """
+        i = bisect_left(self.keys, (prefix,))
+        end = min(len(self.keys), i + MAX_SCAN)
+        while i < end and self.keys[i][0].startswith(prefix):
+            yield self.keys[i]
+            i += 1
+
+
+username_index = UsernameIndex()
+
+
+def postgres_search(query, limit):
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    return (User.objects.filter(username__icontains=query)
+            .annotate(similarity=TrigramSimilarity('username', query))
+            .order_by('-similarity', 'username')
+            .values('id', 'username')[:limit])
+
+
+def search_users(query, limit=DEFAULT_LIMIT):
+    """
+    Ranked username autocomplete. On Postgres the trigram index from apps.py serves substring matches,
+    elsewhere the in-process UsernameIndex is used.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    if connection.vendor == 'postgresql':
+        return list(postgres_search(query, limit))
+    return username_index.search(query, limit)
+
+
+async def asearch_users(query, limit=DEFAULT_LIMIT):
+    """ search_users for async views; only (re)building the in-process index leaves the event loop """
+    limit = max(1, min(limit, MAX_LIMIT))
+    if connection.vendor == 'postgresql':
+        return [user async for user in postgres_search(query, limit)]
+    await username_index.arefresh()
+    return username_index.lookup(query, limit)
@@ -0,0 +1,117 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+
+from chore_tracker.models import Group, Event
+from chore_tracker.utils import find_series, get_exceptions, expand_series, occurrence_key
+
+User = get_user_model()
+
+# Columns of the row shapes below. Read endpoints serialize straight from values_list() tuples, so no model
+# instances (and no per-field descriptor work) are created for large payloads.
+EVENT_FIELDS = ('id', 'group_id', 'name', 'first_date', 'repeat_every', 'series_id', 'repeat_until', 'is_complete')
+
+
+def serialize_event(event):
+    """ Serializes a stored Event; members must be prefetched """
+    return {
+        'id': event.id,
+        'key': occurrence_key(event.id, event.first_date),
+        'name': event.name,
+        'members': [{'username': member.username} for member in event.members.all()],
+        'first_date': event.first_date,
+        'repeat_every': event.repeat_every,
+        'is_complete': event.is_complete,
+        'is_virtual': False,
+    }
+
+
+def serialize_cost(cost):
+    """ Compact form of a Cost for stream deltas; users are referred to by id """
+    return {
+        'id': cost.id,
+        'transaction_id': cost.transaction_id,
+        'name': cost.name,
+        'category': cost.category,
+        'amount': cost.amount,
+        'date': cost.date,
+        'payer': cost.payer_id,
+        'borrower': cost.borrower_id,
+    }
+
+
+def event_rows(queryset):
+    """ Events of `queryset` as namedtuples of EVENT_FIELDS """
+    return list(queryset.values_list(*EVENT_FIELDS, named=True))
+
+
+def event_members(**filters):
+    """ {event_id: [{'username'}]} for the event memberships matching `filters` """
+    members = defaultdict(list)
+    for event_id, username in (Event.members.through.objects.filter(**filters).order_by('event_id', 'user_id')
+                               .values_list('event_id', 'user__username')):
+        members[event_id].append({'username': username})
+    return members
+
+
+def group_members(group_ids):
+    """ {group_id: [{'username', 'photo_url'}]} """
+    members = defaultdict(list)
+    for group_id, username, photo_url in (Group.members.through.objects.filter(group_id__in=group_ids)
+                                          .order_by('group_id', 'user_id')
+                                          .values_list('group_id', 'user__username', 'user__photo_url')):
+        members[group_id].append({'username': username, 'photo_url': photo_url})
+    return members
+
+
+def serialize_event_row(row, members):
+    """ serialize_event for a row from event_rows(), with members from event_members() """
+    return {
+        'id': row.id,
+        'key': occurrence_key(row.id, row.first_date),
+        'name': row.name,
+        'members': members.get(row.id, []),
+        'first_date': row.first_date,
+        'repeat_every': row.repeat_every,
+        'is_complete': row.is_complete,
+        'is_virtual': False,
+    }
+
+
+def serialize_current_user(user, expand_until):
+    """
+    Builds the get-current-user payload: user -> groups -> events -> members.
+    Everything is read up front as rows, so the number of queries is fixed (groups, group members, events,
+    event members, recurrence exceptions) no matter how many groups, events or members there are.
+    """
+    groups = list(Group.objects.filter(members=user).order_by('id').values_list('id', 'name'))
+    group_ids = [group_id for group_id, _ in groups]
+
+    members = group_members(group_ids)
+    events = defaultdict(list)
+    for row in event_rows(Event.objects.filter(group_id__in=group_ids).order_by('id')):
+        events[row.group_id].append(row)
+    assigned = event_members(event__group_id__in=group_ids)
+
+    series = {group_id: find_series(events[group_id]) for group_id in group_ids}
+    root_ids = [root.id for group_series in series.values() for root, _ in group_series]
+    exceptions = get_exceptions(root_ids) if root_ids else {}
+
+    group_data = []
+    for group_id, name in groups:
+        event_data = [serialize_event_row(row, assigned) for row in events[group_id]]
+        event_data.extend(expand_series(series[group_id], exceptions, expand_until, members=assigned))
+
+        group_data.append({
+            'id': group_id,
+            'name': name,
+            'members': members[group_id],
+            'events': event_data
+        })
+
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'groups': group_data
+    }
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Min
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils.dateparse import parse_date
+
+from chore_tracker.models import Group, Event, EventException, Cost
+from chore_tracker.revisions import mark_changed
+from chore_tracker.search import record_username
+from chore_tracker.stats import invalidate_rollup
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reindex_usernames(sender, instance, signal, update_fields=None, **kwargs):
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    user_id, username = instance.id, None if signal is post_delete else instance.username
+    # only once committed, so a rolled back registration never shows up in search
+    transaction.on_commit(lambda: record_username(user_id, username))
+
+
+# Group revisions and dashboard cache invalidation, see chore_tracker/revisions.py. Bulk writes do not send
+# these signals, the code paths that use them (materialize_events, record_costs, settle_costs) call
+# mark_changed explicitly.
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)  # memberships are gone by post_delete
+def invalidate_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    # usernames also appear in the member lists of every group the user is in
+    group_ids = Group.members.through.objects.filter(user_id=instance.id).values_list('group_id', flat=True)
+    mark_changed(group_ids=group_ids, user_ids=[instance.id])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    mark_changed(group_ids=[instance.id])
+
+
+@receiver(m2m_changed, sender=Group.members.through)
+def invalidate_group_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        related = instance.joined_groups if reverse else instance.members
+        pk_set = set(related.values_list('id', flat=True))
+    if reverse:
+        mark_changed(group_ids=pk_set, user_ids=[instance.id])
+    else:
+        mark_changed(group_ids=[instance.id], user_ids=pk_set)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Cost)
+@receiver(post_delete, sender=Cost)
+def invalidate_group_content(sender, instance, **kwargs):
+    mark_changed(group_ids=[instance.group_id])
+
+
+@receiver(post_save, sender=EventException)
+@receiver(post_delete, sender=EventException)
+def invalidate_event_exception(sender, instance, **kwargs):
+    if EventException.event.is_cached(instance):
+        group_ids = [instance.event.group_id]
+    else:
+        # not loaded, or already gone when the exception is deleted through a cascade
+        group_ids = Event.objects.filter(id=instance.event_id).values_list('group_id', flat=True)
+    mark_changed(group_ids=group_ids)
+
+
+@receiver(m2m_changed, sender=Event.members.through)
+def invalidate_event_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        mark_changed(group_ids=[instance.group_id])
+        return
+    events = instance.events.all() if action == 'pre_clear' else Event.objects.filter(id__in=pk_set)
+    mark_changed(group_ids=events.values_list('group_id', flat=True))
+
+
+# Rewinds the statistics rollup when a stored occurrence on an already rolled up day changes, see
+# chore_tracker/stats.py. The bulk paths (materialize_events, delete_occurrences, set_occurrence_complete)
+# call invalidate_rollup explicitly.
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_stats(sender, instance, **kwargs):
+    first_date = instance.first_date
+    if isinstance(first_date, str):
+        # instances created with a string date keep it until they are refreshed
+        first_date = parse_date(first_date)
+    invalidate_rollup(instance.group_id, first_date)
+
+
+@receiver(m2m_changed, sender=Event.members.through)
+def invalidate_event_members_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_event_stats(sender, instance)
+        return
+    events = instance.events.all() if action == 'pre_clear' else Event.objects.filter(id__in=pk_set)
+    for group_id, first_date in events.values('group_id').annotate(first_date=Min('first_date')).values_list(
+            'group_id', 'first_date'):
+        invalidate_rollup(group_id, first_date)
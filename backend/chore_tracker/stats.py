@@ -0,0 +1,216 @@
+"""
+Chore statistics of a group: completion rate, streaks and overdue occurrences per member, and chores per week.
+
+Past days are summarized in DailyStat, one row per (group, day, member) plus a group total, aggregated from
+the stored occurrences (Event / Event.members). The group total counts an occurrence as completed when anyone
+completed it (is_complete); a member is only credited for the occurrences they completed themselves, from the
+Completion log, while an occurrence a co-assignee completed still counts as done (not overdue) for them. The rollup is rolling: each group's stats_rolled_until watermark is moved up to yesterday by
+the `roll_up_stats` scheduler job, and writes to an occurrence on an already rolled up day move it back to
+just before that day, so only the days since are aggregated again. Reads never write: they combine the
+rollup with a live aggregate of the requested days after the watermark.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from chore_tracker.models import Group, Event, Completion, DailyStat
+
+# Window of /group/stats/ without a `from`
+DEFAULT_DAYS = 28
+
+
+def aggregate_days(group_ids, start, end):
+    """ DailyStat rows (unsaved) of the given groups from start to end, aggregated from the stored occurrences """
+    occurrences = Event.objects.filter(group_id__in=group_ids, first_date__gte=start, first_date__lte=end)
+    totals = (occurrences.values('group_id', 'first_date')
+              .annotate(assigned=Count('id'), completed=Count('id', filter=Q(is_complete=True)))
+              .order_by())
+    members = (Event.members.through.objects.filter(event__in=occurrences)
+               .values('event__group_id', 'event__first_date', 'user_id')
+               .annotate(assigned=Count('id'), done=Count('id', filter=Q(event__is_complete=True)))
+               .order_by())
+    completed = member_completions(group_ids, start, end)
+
+    stats = [DailyStat(group_id=row['group_id'], date=row['first_date'], assigned=row['assigned'],
+                       completed=row['completed'], done=row['completed']) for row in totals]
+    stats.extend(DailyStat(group_id=row['event__group_id'], date=row['event__first_date'], user_id=row['user_id'],
+                           assigned=row['assigned'], done=row['done'],
+                           completed=completed.get((row['event__group_id'], row['event__first_date'],
+                                                    row['user_id']), 0))
+                 for row in members)
+    return stats
+
+
+def member_completions(group_ids, start, end):
+    """
+    Returns {(group_id, date, user_id): count} of the stored occurrences from start to end that a member was
+    assigned to and completed themselves. Reads the completions of the window, then the assignments of only
+    the series and users that have any.
+    """
+    # chore_tracker.completions imports this module
+    from chore_tracker.completions import month_of, decode_days
+
+    done = set()
+    for series_id, user_id, month, days in (Completion.objects.filter(
+            group_id__in=group_ids, month__gte=month_of(start), month__lte=month_of(end))
+            .values_list('series_id', 'user_id', 'month', 'days')):
+        done.update((series_id, date, user_id) for date in decode_days(month, days) if start <= date <= end)
+    if not done:
+        return {}
+
+    counts = defaultdict(int)
+    assignments = (Event.members.through.objects
+                   .filter(event__group_id__in=group_ids, event__first_date__gte=start, event__first_date__lte=end,
+                           event__series_id__in={series_id for series_id, _, _ in done},
+                           user_id__in={user_id for _, _, user_id in done})
+                   .values_list('event__group_id', 'event__first_date', 'event__series_id', 'user_id'))
+    for group_id, date, series_id, user_id in assignments:
+        if (series_id, date, user_id) in done:
+            counts[(group_id, date, user_id)] += 1
+    return counts
+
+
+def roll_up(group, until=None):
+    """
+    Rolls the group's DailyStat rows up to `until` (default yesterday) from its watermark.
+    Returns the number of days aggregated.
+    """
+    if until is None:
+        until = timezone.now().date() - timedelta(days=1)
+    rolled = group.stats_rolled_until
+    if rolled is not None and rolled >= until:
+        return 0
+
+    if rolled is not None:
+        start = rolled + timedelta(days=1)
+    else:
+        start = Event.objects.filter(group=group).aggregate(start=Min('first_date'))['start'] or until
+        start = min(start, until)
+
+    try:
+        with transaction.atomic():
+            DailyStat.objects.filter(group=group, date__gte=start, date__lte=until).delete()
+            DailyStat.objects.bulk_create(aggregate_days([group.id], start, until))
+            # conditional, so a write that rewound the watermark meanwhile gets its days aggregated again next time
+            moved = Group.objects.filter(id=group.id, stats_rolled_until=rolled).update(stats_rolled_until=until)
+    except IntegrityError:
+        # a concurrent roll up of the same days got there first
+        return 0
+    if moved:
+        group.stats_rolled_until = until
+    return (until - start).days + 1
+
+
+def invalidate_rollup(group_id, date):
+    """ Moves the group's watermark back before `date` after a write to an occurrence on that day """
+    if date >= timezone.now().date():
+        return  # days from today on are never rolled up
+    Group.objects.filter(id=group_id, stats_rolled_until__gte=date).update(
+        stats_rolled_until=date - timedelta(days=1))
+
+
+def roll_up_due_groups(batch_size=100, heartbeat=None):
+    """ Scheduler job: rolls every group that is behind up to yesterday. Returns the number of groups rolled """
+    until = timezone.now().date() - timedelta(days=1)
+    due = Group.objects.filter(Q(stats_rolled_until__isnull=True) | Q(stats_rolled_until__lt=until)).order_by('id')
+    rolled = 0
+    last_id = 0
+    while True:
+        batch = list(due.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return rolled
+        for group in batch:
+            roll_up(group, until=until)
+            rolled += 1
+        last_id = batch[-1].id
+        if heartbeat is not None:
+            heartbeat()
+
+
+def get_daily_stats(group, start, end):
+    """
+    Returns {(date, user_id or None): (assigned, completed, done)} from the rollup and a live aggregate after it.
+    Read-only: rolling up is left to the scheduler, a group that is behind is aggregated live for the window.
+    """
+    rolled = group.stats_rolled_until
+    stats = []
+    live_start = start
+    if rolled is not None and start <= rolled:
+        stats = list(DailyStat.objects.filter(group=group, date__gte=start, date__lte=min(end, rolled))
+                     .values_list('date', 'user_id', 'assigned', 'completed', 'done'))
+        live_start = rolled + timedelta(days=1)
+    if live_start <= end:
+        stats.extend((stat.date, stat.user_id, stat.assigned, stat.completed, stat.done)
+                     for stat in aggregate_days([group.id], live_start, end))
+    return {(date, user_id): figures for date, user_id, *figures in stats}
+
+
+def streaks(days):
+    """
+    (current, longest) runs of consecutive days on which everything assigned was completed, over
+    [(date, assigned, completed)] in date order; days without assignments neither extend nor break a run
+    """
+    current = longest = 0
+    for _, assigned, completed in days:
+        if not assigned:
+            continue
+        current = current + 1 if completed >= assigned else 0
+        longest = max(longest, current)
+    return current, longest
+
+
+def get_group_stats(group, start, end):
+    """
+    Per-member completion rate, streaks and overdue occurrences between start and end (both included), the
+    members ranked by completions, and the group's chores per week (weeks start on Monday).
+    Rates and streaks credit a member for what they completed themselves; an occurrence is overdue for its
+    assignees while nobody has completed it. Occurrences after today count as assigned but not overdue, and
+    are left out of rates and streaks.
+    """
+    today = timezone.now().date()
+    daily = get_daily_stats(group, start, end)
+    members = list(group.members.order_by('id').values_list('id', 'username'))
+
+    by_user = defaultdict(list)
+    weeks = defaultdict(lambda: [0, 0])
+    for (date, user_id), (assigned, completed, done) in sorted(daily.items(), key=lambda item: item[0][0]):
+        if user_id is None:
+            week = weeks[date - timedelta(days=date.weekday())]
+            week[0] += assigned
+            week[1] += completed
+        else:
+            by_user[user_id].append((date, assigned, completed, done))
+
+    leaderboard = []
+    for user_id, username in members:
+        days = by_user.get(user_id, [])
+        past = [day for day in days if day[0] <= today]
+        assigned = sum(day[1] for day in past)
+        completed = sum(day[2] for day in past)
+        current, longest = streaks([day[:3] for day in past])
+        # today still counts towards the streak once done, but does not break it while open
+        if past and past[-1][0] == today and past[-1][2] < past[-1][1]:
+            current, longest = streaks([day[:3] for day in past[:-1]])
+        leaderboard.append({
+            'user': {'id': user_id, 'username': username},
+            'assigned': assigned,
+            'completed': completed,
+            'completion_rate': round(completed / assigned, 4) if assigned else None,
+            'overdue': sum(day[1] - day[3] for day in past if day[0] < today),
+            'current_streak': current,
+            'longest_streak': longest,
+            'upcoming': sum(day[1] for day in days if day[0] > today),
+        })
+    leaderboard.sort(key=lambda member: (-member['completed'], -(member['completion_rate'] or 0),
+                                         member['user']['username']))
+
+    return {
+        'from': start,
+        'to': end,
+        'members': leaderboard,
+        'weeks': [{'week': week, 'assigned': assigned, 'completed': completed}
+                  for week, (assigned, completed) in sorted(weeks.items())],
+    }
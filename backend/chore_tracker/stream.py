@@ -0,0 +1,122 @@
+"""
+Push channel for group updates.
+
+Write views call publish() with a compact delta (event.created, event.completed, cost.added, member.joined);
+once the transaction commits it goes to the broker, which fans it out to every open stream of the group
+(GroupStream in chore_tracker/async_views.py, served as Server-Sent Events under ASGI). Clients patch their
+state from the deltas and only refetch get-current-user on a `resync` message or after reconnecting, since
+missed deltas are not replayed.
+
+The broker is pluggable through settings.STREAM_BROKER. LocalBroker fans out within one process; several
+worker processes need a broker backed by a shared channel (e.g. Redis pub/sub) implementing the three
+methods of Broker.
+"""
+import abc
+import asyncio
+import itertools
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Undelivered messages kept per subscriber before it is told to resync
+MAX_QUEUE = 100
+
+
+class Broker(abc.ABC):
+    """ publish() may be called from any thread, subscribe() from the event loop that consumes the messages """
+
+    @abc.abstractmethod
+    def publish(self, group_id, message):
+        """ Delivers `message` to every subscription of the group """
+
+    @abc.abstractmethod
+    def subscribe(self, group_id):
+        """ Returns a Subscription; the caller closes it """
+
+    @abc.abstractmethod
+    def unsubscribe(self, subscription):
+        """ Stops delivering to `subscription`, called by Subscription.close() """
+
+
+class Subscription:
+    """ Messages of one group for one consumer, buffered in an asyncio queue of the consumer's loop """
+
+    def __init__(self, broker, group_id, max_queue=MAX_QUEUE):
+        self.broker = broker
+        self.group_id = group_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_queue)
+
+    def put(self, message):
+        """ Thread-safe; returns False once the consumer's loop is gone """
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+            return True
+        except RuntimeError:
+            return False
+
+    def _put(self, message):
+        if self.queue.full():
+            # a slow consumer gets one resync instead of an unbounded backlog
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = {'type': 'resync', 'group_id': self.group_id, 'data': {}}
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """ Next message, raises asyncio.TimeoutError after `timeout` seconds without one """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker(Broker):
+    """ In-process fan-out hub """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def publish(self, group_id, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(group_id, ()))
+        for subscription in subscriptions:
+            if not subscription.put(message):
+                self.unsubscribe(subscription)
+
+    def subscribe(self, group_id):
+        subscription = Subscription(self, group_id)
+        with self.lock:
+            self.subscriptions[group_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.group_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.group_id]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'STREAM_BROKER', 'chore_tracker.stream.LocalBroker'))()
+        return _broker
+
+
+def publish(group_id, type, data):
+    """ Sends a delta to the group's streams once the current transaction commits """
+    message = {'id': next(_ids), 'type': type, 'group_id': group_id, 'data': data}
+    transaction.on_commit(lambda: get_broker().publish(group_id, message))
@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # ids are reused once a test's transaction is rolled back, cached payloads must not leak between tests
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,92 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from chore_tracker import urls
+from chore_tracker.middleware import view_metrics
+from chore_tracker.models import Group, Event
+from chore_tracker.search import username_index
+
+User = get_user_model()
+
+# the async read views shadow the DRF ones, as with ASYNC_READ_VIEWS
+urlpatterns = [path('api/', include(urls.async_urlpatterns + urls.urlpatterns))]
+
+
+@pytest.fixture
+def setup(db):
+    username_index.reset()
+    user = User.objects.create_user(username='user', password='pass', email='user@test.com')
+    other = User.objects.create_user(username='other', password='pass', email='other@test.com')
+    group = Group.objects.create(name='Flat', status='active', timezone='UTC', creator=user)
+    group.members.add(user, other)
+    event = Event.objects.create(name='Dishes', first_date=timezone.now().date(), repeat_every='Weekly', group=group)
+    event.members.add(user, other)
+    yield user, group, event
+    username_index.reset()
+
+
+def auth(user):
+    return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def async_get(url, data=None, **headers):
+    async def get():
+        return await AsyncClient().get(url, data or {}, headers=headers)
+
+    with override_settings(ROOT_URLCONF=__name__):
+        return async_to_sync(get)()
+
+
+@pytest.mark.parametrize('name, args, params', [
+    ('get-current-user', [], {}),
+    ('get-current-user', [], {'to': 'bogus'}),
+    ('get-current-user', [], {'to': '2400-01-01'}),
+    ('view_group', [], 'group'),
+    ('view-event', 'event', {}),
+    ('get-users', [], {'search': 'u'}),
+    ('user_exists', [], {'username': 'other'}),
+    ('user_exists', [], {'username': 'nobody'}),
+])
+def test_async_views_match_drf_views(setup, name, args, params):
+    user, group, event = setup
+    args = [event.id] if args == 'event' else args
+    params = {'group_id': group.id} if params == 'group' else params
+    url = reverse(name, args=args)
+
+    expected = Client().get(url, params, headers=auth(user))
+    response = async_get(url, params, **auth(user))
+    assert response.status_code == expected.status_code
+    assert response.json() == expected.json()
+    assert response.get('ETag') == expected.get('ETag')
+
+
+def test_authentication(setup):
+    user = setup[0]
+    assert async_get(reverse('get-current-user')).status_code == 401
+    assert async_get(reverse('user_exists'), {'username': 'user'},
+                     Authorization='Bearer not-a-token').status_code == 401
+    assert async_get(reverse('get-current-user'), **auth(user)).json()['username'] == 'user'
+
+
+def test_conditional_get(setup):
+    user, group, event = setup
+    etag = async_get(reverse('view_group'), {'group_id': group.id})['ETag']
+    assert async_get(reverse('view_group'), {'group_id': group.id}, **{'If-None-Match': etag}).status_code == 304
+
+    group.members.remove(user)
+    response = async_get(reverse('view_group'), {'group_id': group.id}, **{'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json()['group']['members'] == ['other']
+
+
+def test_query_metrics_in_async_mode(setup):
+    view_metrics.reset()
+    response = async_get(reverse('user_exists'), {'username': 'user'})
+    assert 'desc="1 queries, 0 duplicates"' in response['Server-Timing']
+    assert view_metrics.queries['UserExists'] == 1
+    view_metrics.reset()
@@ -0,0 +1,90 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from chore_tracker.models import Group, Event
+
+User = get_user_model()
+
+
+@pytest.fixture
+def dashboard(db):
+    user = User.objects.create_user(username='user', password='pass', email='user@test.com')
+    other = User.objects.create_user(username='other', password='pass', email='other@test.com')
+    group = Group.objects.create(name='Flat', status='active', timezone='UTC', creator=user)
+    group.members.add(user, other)
+    unrelated = Group.objects.create(name='Elsewhere', status='active', timezone='UTC', creator=other)
+    unrelated.members.add(other)
+    event = Event.objects.create(name='Dishes', first_date=timezone.now().date(), repeat_every='Weekly', group=group)
+    event.members.add(user)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    client.get(reverse('get-current-user'))
+    return client, user, other, group, unrelated, event
+
+
+def load(client, django_assert_num_queries=None, cached=False):
+    if cached:
+        # only the ETag lookup, see chore_tracker/revisions.py
+        with django_assert_num_queries(1):
+            return client.get(reverse('get-current-user')).json()
+    return client.get(reverse('get-current-user')).json()
+
+
+def test_repeat_load_is_served_from_the_cache(dashboard, django_assert_num_queries):
+    client = dashboard[0]
+    assert load(client, django_assert_num_queries, cached=True)['groups'][0]['name'] == 'Flat'
+
+
+def test_event_changes_invalidate(dashboard):
+    client, user, other, group, unrelated, event = dashboard
+    event.name = 'Laundry'
+    event.save()
+    assert {e['name'] for e in load(client)['groups'][0]['events']} == {'Laundry'}
+
+    event.members.add(other)
+    assert {m['username'] for m in load(client)['groups'][0]['events'][0]['members']} == {'user', 'other'}
+
+    other.events.remove(event)
+    assert {m['username'] for m in load(client)['groups'][0]['events'][0]['members']} == {'user'}
+
+
+def test_membership_changes_invalidate(dashboard):
+    client, user, other, group, unrelated, event = dashboard
+    unrelated.members.add(user)
+    assert {g['name'] for g in load(client)['groups']} == {'Flat', 'Elsewhere'}
+
+    user.joined_groups.remove(unrelated)
+    assert {g['name'] for g in load(client)['groups']} == {'Flat'}
+
+    group.members.clear()
+    assert load(client)['groups'] == []
+
+
+def test_username_change_invalidates_members(dashboard):
+    client, user, other, group, unrelated, event = dashboard
+    other.username = 'renamed'
+    other.save()
+    assert {m['username'] for m in load(client)['groups'][0]['members']} == {'user', 'renamed'}
+
+
+def test_occurrence_exceptions_invalidate(dashboard):
+    client, user, other, group, unrelated, event = dashboard
+    response = client.post(reverse('mark_event_complete'),
+                           {'eventId': event.id, 'date': (event.first_date + timezone.timedelta(weeks=4)).isoformat()},
+                           format='json')
+    assert response.status_code == 200
+    virtual = [e for e in load(client)['groups'][0]['events'] if e['is_virtual'] and e['is_complete']]
+    assert len(virtual) == 1
+
+
+def test_unrelated_writes_keep_the_cache(dashboard, django_assert_num_queries):
+    client, user, other, group, unrelated, event = dashboard
+    Event.objects.create(name='Elsewhere chore', first_date=timezone.now().date(), group=unrelated)
+    client.post(reverse('create_cost'), {'group_id': unrelated.id, 'name': 'Pizza', 'category': 'Food',
+                                         'date': '2025-01-01', 'time': '20:00:00', 'amount': '10.00',
+                                         'payer': other.id, 'borrower': [other.id]}, format='json')
+    load(client, django_assert_num_queries, cached=True)
@@ -0,0 +1,119 @@
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from chore_tracker.completions import toggle_completion, set_completion, get_completions, decode_days, day_bit
+from chore_tracker.models import Group, Event, EventException, Completion
+from chore_tracker.utils import materialize_event
+
+User = get_user_model()
+
+
+@pytest.fixture
+def series(db):
+    user = User.objects.create_user(username='user', password='pass', email='user@test.com')
+    other = User.objects.create_user(username='other', password='pass', email='other@test.com')
+    group = Group.objects.create(name='Flat', status='active', timezone='UTC', creator=user)
+    group.members.add(user, other)
+    event = Event.objects.create(name='Dishes', first_date=date(2025, 1, 1), repeat_every='Daily', group=group)
+    materialize_event(event, until=date(2025, 1, 7))
+    return user, other, group, event
+
+
+def test_decode_days():
+    days = day_bit(date(2025, 1, 1)) | day_bit(date(2025, 1, 15)) | day_bit(date(2025, 1, 31))
+    assert list(decode_days(date(2025, 1, 1), days)) == [date(2025, 1, 1), date(2025, 1, 15), date(2025, 1, 31)]
+
+
+def test_storage_grows_with_completed_months(series):
+    user, other, group, event = series
+
+    for day in range(1, 32):
+        toggle_completion(event, date(2025, 1, day), user)
+    toggle_completion(event, date(2025, 3, 3), user)
+
+    assert Completion.objects.count() == 2
+    assert Completion.objects.get(month=date(2025, 1, 1)).days == 2 ** 31 - 1
+
+    toggle_completion(event, date(2025, 3, 3), user)
+    assert Completion.objects.count() == 1
+
+
+def test_toggle_stored_and_virtual_occurrences(series):
+    user, other, group, event = series
+    stored = Event.objects.get(series_id=event.series_id, first_date=date(2025, 1, 3))
+
+    assert toggle_completion(stored, date(2025, 1, 3), user) is True
+    assert toggle_completion(event, date(2025, 2, 10), user) is True
+    stored.refresh_from_db()
+    assert stored.is_complete is True
+    assert EventException.objects.get(event=event, date=date(2025, 2, 10)).is_complete is True
+
+    # the occurrence stays complete until everyone who completed it undoes it
+    assert toggle_completion(event, date(2025, 1, 3), other) is True
+    assert toggle_completion(event, date(2025, 1, 3), user) is True
+    assert toggle_completion(event, date(2025, 1, 3), other) is False
+    stored.refresh_from_db()
+    assert stored.is_complete is False
+
+    with pytest.raises(ValueError):
+        toggle_completion(event, date(2024, 12, 31), user)
+
+
+def test_get_completions_is_one_range_query(series, django_assert_num_queries):
+    user, other, group, event = series
+    for day in (date(2025, 1, 30), date(2025, 2, 1), date(2025, 2, 28), date(2025, 3, 1)):
+        toggle_completion(event, day, user)
+    toggle_completion(event, date(2025, 2, 1), other)
+
+    with django_assert_num_queries(1):
+        completions = get_completions(date(2025, 1, 31), date(2025, 2, 28), group_id=group.id)
+
+    assert completions == {
+        (event.series_id, date(2025, 2, 1)): ['user', 'other'],
+        (event.series_id, date(2025, 2, 28)): ['user'],
+    }
+
+
+def test_completion_endpoints(series):
+    user, other, group, event = series
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post(reverse('mark_event_complete'), {'eventId': event.id, 'date': '2025-03-05'}, format='json')
+    assert response.status_code == 200
+    assert response.json()['eventStatus'] is True
+
+    response = client.get(reverse('event_completions'), {'group_id': group.id, 'from': '2025-03-01', 'to': '2025-03-31'})
+    assert response.status_code == 200
+    assert response.json()['completions'] == [{'series_id': str(event.series_id), 'date': '2025-03-05',
+                                               'users': ['user']}]
+
+    response = client.get(reverse('event_completions'), {'group_id': group.id, 'series_id': str(event.series_id),
+                                                         'from': '2025-01-01', 'to': '2025-02-28'})
+    assert response.json()['completions'] == []
+    response = client.get(reverse('event_completions'), {'group_id': group.id, 'from': '2025-03-01'})
+    assert response.status_code == 400
+
+    assert APIClient().post(reverse('mark_event_complete'), {'eventId': event.id}, format='json').status_code == 401
+
+
+def test_reopening_clears_everyones_completion(series):
+    user, other, group, event = series
+    toggle_completion(event, date(2025, 1, 3), other)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.post(reverse('mark_event_complete'),
+                           {'eventId': event.id, 'date': '2025-01-03', 'eventIsComplete': True}, format='json')
+    assert (response.json()['eventStatus'], response.json()['completedBy']) == (True, ['user', 'other'])
+    assert set_completion(event, date(2025, 1, 3), user, True) is True
+
+    response = client.post(reverse('mark_event_complete'),
+                           {'eventId': event.id, 'date': '2025-01-03', 'eventIsComplete': False}, format='json')
+    assert (response.json()['eventStatus'], response.json()['completedBy']) == (False, [])
+    assert not Event.objects.get(series_id=event.series_id, first_date=date(2025, 1, 3)).is_complete
+    assert not Completion.objects.exists()
@@ -0,0 +1,95 @@
+import csv
+import gzip
+import io
+import json
+from datetime import date, time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from chore_tracker.export import export
+from chore_tracker.models import Group, Event, Cost
+
+User = get_user_model()
+
+
+@pytest.fixture
+def history(db):
+    user = User.objects.create_user(username='user', password='pass', email='user@test.com')
+    other = User.objects.create_user(username='other', password='pass', email='other@test.com')
+    group = Group.objects.create(name='Flat', status='active', timezone='UTC', creator=user)
+    group.members.add(user, other)
+    for day in range(1, 11):
+        Cost.objects.create(name=f'Groceries {day}', category='Food', date=date(2025, 1, day), time=time(12),
+                            amount=day * 1.5, group=group, payer=user, borrower=other)
+        event = Event.objects.create(name=f'Dishes {day}', first_date=date(2025, 1, day), group=group)
+        event.members.add(other)
+        if day % 2:
+            event.members.add(user)
+    return user, other, group
+
+
+def read(response):
+    return b''.join(response.streaming_content)
+
+
+def test_export_costs_csv(history):
+    user, other, group = history
+    rows = list(csv.reader(io.StringIO(b''.join(export(group.id, 'costs', 'csv')).decode())))
+    assert rows[0][:3] == ['id', 'transaction_id', 'name']
+    assert len(rows) == 11
+    assert rows[1][2:9] == ['Groceries 1', 'Food', '2025-01-01', '12:00:00', '1.5', 'user', 'other']
+
+
+@pytest.mark.django_db
+def test_export_of_an_empty_group_has_a_header():
+    assert b''.join(export(9999, 'costs', 'csv')).decode().splitlines() == [
+        'id,transaction_id,name,category,date,time,amount,payer,borrower,settled,settled_date']
+    assert b''.join(export(9999, 'events', 'ndjson')) == b''
+
+
+def test_export_events_ndjson(history):
+    user, other, group = history
+    lines = b''.join(export(group.id, 'events', 'ndjson')).decode().splitlines()
+    assert len(lines) == 10
+    first, second = json.loads(lines[0]), json.loads(lines[1])
+    assert (first['name'], first['date'], first['members']) == ('Dishes 1', '2025-01-01', 'user other')
+    assert second['members'] == 'other'
+
+
+def test_export_queries_do_not_grow_with_history(history, django_assert_num_queries):
+    user, other, group = history
+    # events: the occurrences, and the members of each chunk of 4
+    with django_assert_num_queries(4):
+        pieces = export(group.id, 'events', 'csv', chunk_size=4)
+        assert len(b''.join(pieces).splitlines()) == 11
+    with django_assert_num_queries(1):
+        b''.join(export(group.id, 'costs', 'ndjson', chunk_size=4))
+
+
+def test_export_view(history):
+    user, other, group = history
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(reverse('group_export'), {'group_id': group.id, 'type': 'events', 'output': 'ndjson'})
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert response['Content-Disposition'] == f'attachment; filename="group-{group.id}-events.ndjson"'
+    assert len(read(response).splitlines()) == 10
+
+    response = client.get(reverse('group_export'), {'group_id': group.id, 'gzip': '1'})
+    assert response['Content-Type'] == 'application/gzip'
+    assert response['Content-Disposition'].endswith(f'group-{group.id}-costs.csv.gz"')
+    assert gzip.decompress(read(response)) == b''.join(export(group.id, 'costs', 'csv'))
+
+    assert client.get(reverse('group_export'), {'group_id': group.id, 'output': 'xml'}).status_code == 400
+    assert client.get(reverse('group_export'), {'group_id': group.id, 'type': 'users'}).status_code == 400
+
+    outsider = User.objects.create_user(username='outsider', password='pass', email='outsider@test.com')
+    client.force_authenticate(user=outsider)
+    assert client.get(reverse('group_export'), {'group_id': group.id}).status_code == 404
+    client.force_authenticate(user=None)
+    assert client.get(reverse('group_export'), {'group_id': group.id}).status_code in (401, 403)
@@ -0,0 +1,224 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from chore_tracker.ledger import (record_costs, settle_costs, get_balances, reconcile_balances, plan_settlement,
+                                  get_cost_summary, rebuild_cost_summary)
+from chore_tracker.models import Group, Cost, Balance, CostSummary
+
+User = get_user_model()
+
+
+@pytest.fixture
+def group():
+    alice = User.objects.create_user(username="alice", email="alice@test.com", password="pass")
+    bob = User.objects.create_user(username="bob", email="bob@test.com", password="pass")
+    carol = User.objects.create_user(username="carol", email="carol@test.com", password="pass")
+    group = Group.objects.create(name="Flat", status="active", timezone="UTC", creator=alice)
+    group.members.add(alice, bob, carol)
+    return group
+
+
+def add_cost(group, payer, borrower, amount, settled=False):
+    cost = Cost.objects.create(name="Cost", date=date(2025, 1, 1), time="12:00", amount=amount, group=group,
+                               payer=payer, borrower=borrower, settled=settled)
+    record_costs([cost])
+    return cost
+
+
+@pytest.mark.django_db
+def test_balances_are_netted(group):
+    alice, bob, carol = group.members.order_by('id')
+    add_cost(group, alice, bob, 10.10)
+    add_cost(group, alice, bob, 5.05)
+    add_cost(group, bob, alice, 3.15)
+    add_cost(group, carol, carol, 99)
+    add_cost(group, carol, alice, 1.00)
+
+    balances = [(b['borrower']['username'], b['payer']['username'], b['amount']) for b in get_balances(group)]
+    assert balances == [("bob", "alice", Decimal("12.00")), ("alice", "carol", Decimal("1.00"))]
+    assert Balance.objects.get(payer=alice, borrower=bob).amount == Decimal("15.15")
+
+
+@pytest.mark.django_db
+def test_settle_costs_updates_balances(group):
+    alice, bob, _ = group.members.order_by('id')
+    first = add_cost(group, alice, bob, 10)
+    add_cost(group, alice, bob, 2.5)
+
+    assert settle_costs(Cost.objects.filter(id=first.id)) == 1
+    assert settle_costs(Cost.objects.filter(id=first.id)) == 0
+    first.refresh_from_db()
+    assert first.settled is True
+    assert first.settled_date is not None
+    assert Balance.objects.get(payer=alice, borrower=bob).amount == Decimal("2.50")
+
+
+@pytest.mark.django_db
+def test_reconcile_balances(group):
+    alice, bob, _ = group.members.order_by('id')
+    add_cost(group, alice, bob, 10)
+    # written without going through the ledger
+    Cost.objects.create(name="Cost", date=date(2025, 1, 1), time="12:00", amount=4, group=group,
+                        payer=bob, borrower=alice)
+
+    assert reconcile_balances(fix=False) == {(group.id, bob.id, alice.id): (Decimal("0.00"), Decimal("4.00"))}
+
+    out = StringIO()
+    call_command('reconcile_balances', stdout=out)
+    assert "Fixed 1 drifting balances" in out.getvalue()
+    assert reconcile_balances(fix=False) == {}
+    assert Balance.objects.get(payer=bob, borrower=alice).amount == Decimal("4.00")
+
+
+@pytest.mark.django_db
+def test_group_balances_view(group):
+    alice, bob, carol = group.members.order_by('id')
+    client = APIClient()
+    client.force_authenticate(user=alice)
+    cost_data = {'group_id': group.id, 'name': 'Pizza', 'date': '2025-01-01', 'time': '20:00:00',
+                 'amount': '30.00', 'payer': alice.id, 'borrower': [alice.id, bob.id, carol.id]}
+    client.post(reverse('create_cost'), data=cost_data, format='json')
+
+    response = client.get(reverse('group_balances'), {'group_id': group.id})
+
+    assert response.status_code == 200
+    assert [(b['borrower']['username'], b['amount']) for b in response.json()['balances']] == [
+        ("bob", "10.00"), ("carol", "10.00")]
+    assert client.get(reverse('group_balances'), {'group_id': 9999}).status_code == 404
+
+    outsider = User.objects.create_user(username="outsider", email="outsider@test.com", password="pass")
+    client.force_authenticate(user=outsider)
+    assert client.get(reverse('group_balances'), {'group_id': group.id}).status_code == 404
+    client.force_authenticate(user=None)
+    assert client.get(reverse('group_balances'), {'group_id': group.id}).status_code in (401, 403)
+
+
+@pytest.mark.django_db
+def test_plan_settlement_minimizes_transfers(group):
+    alice, bob, carol = group.members.order_by('id')
+    # a chain bob -> alice -> carol collapses into a single transfer
+    add_cost(group, alice, bob, 10)
+    add_cost(group, carol, alice, 10)
+    add_cost(group, carol, bob, 0.01)
+
+    plan = plan_settlement(group)
+
+    assert [(t['from']['username'], t['to']['username'], t['amount']) for t in plan] == [
+        ("bob", "carol", Decimal("10.01"))]
+
+
+@pytest.mark.django_db
+def test_plan_settlement_many_members():
+    users = [User.objects.create_user(username=f"user{i}", email=f"user{i}@test.com", password="pass")
+             for i in range(8)]
+    group = Group.objects.create(name="Big", status="active", timezone="UTC", creator=users[0])
+    for i, payer in enumerate(users):
+        for borrower in users[i + 1:]:
+            add_cost(group, payer, borrower, 1.11 * (i + 1))
+
+    plan = plan_settlement(group)
+
+    assert len(plan) <= len(users) - 1
+    net = {user.id: Decimal(0) for user in users}
+    for transfer in plan:
+        net[transfer['from']['id']] -= transfer['amount']
+        net[transfer['to']['id']] += transfer['amount']
+    expected = {}
+    for balance in Balance.objects.filter(group=group):
+        expected[balance.payer_id] = expected.get(balance.payer_id, 0) + balance.amount
+        expected[balance.borrower_id] = expected.get(balance.borrower_id, 0) - balance.amount
+    assert all(net[user_id] == amount for user_id, amount in expected.items())
+
+
+@pytest.mark.django_db
+def test_settle_plan_view(group):
+    alice, bob, _ = group.members.order_by('id')
+    add_cost(group, alice, bob, 12.34)
+    outsider = User.objects.create_user(username="outsider", email="outsider@test.com", password="pass")
+    client = APIClient()
+    url = reverse('group_settle_plan')
+    assert client.post(url, {'groupId': group.id}, format='json').status_code == 401
+    client.force_authenticate(user=outsider)
+    assert client.get(url, {'group_id': group.id}).status_code == 404
+    assert client.post(url, {'groupId': group.id}, format='json').status_code == 404
+    assert not Cost.objects.filter(settled=True).exists()
+    client.force_authenticate(user=alice)
+
+    response = client.get(reverse('group_settle_plan'), {'group_id': group.id})
+    assert response.json()['transfers'] == [
+        {'from': {'id': bob.id, 'username': 'bob'}, 'to': {'id': alice.id, 'username': 'alice'}, 'amount': '12.34'}]
+
+    response = client.post(reverse('group_settle_plan'), {'groupId': group.id}, format='json')
+    assert response.status_code == 200
+    assert response.json()['settled'] == 1
+    assert not Cost.objects.filter(settled=False).exists()
+    assert client.get(reverse('group_settle_plan'), {'group_id': group.id}).json()['transfers'] == []
+
+
+@pytest.mark.django_db
+def test_cost_summary_view(group, django_assert_num_queries):
+    alice, bob, carol = group.members.order_by('id')
+    client = APIClient()
+    client.force_authenticate(user=alice)
+    expenses = [
+        {'name': 'Pizza', 'category': 'Food', 'date': '2025-01-05', 'amount': '30.00', 'payer': alice.id,
+         'borrower': [alice.id, bob.id, carol.id]},
+        {'name': 'Soap', 'category': 'Household', 'date': '2025-01-20', 'amount': '5.00', 'payer': bob.id,
+         'borrower': [alice.id]},
+        {'name': 'Sushi', 'category': 'Food', 'date': '2025-02-01', 'amount': '12.50', 'payer': bob.id,
+         'borrower': [bob.id, carol.id]},
+        {'name': 'Tip', 'date': '2025-02-02', 'amount': '1.00', 'payer': carol.id, 'borrower': [alice.id]},
+    ]
+    response = client.post(reverse('create_cost'), {'group_id': group.id, 'expenses': [
+        {'time': '20:00:00', **expense} for expense in expenses]}, format='json')
+    assert response.status_code == 201
+    assert CostSummary.objects.count() == 4
+
+    # ETag lookup, group, summary rows
+    with django_assert_num_queries(3):
+        response = client.get(reverse('cost_summary'), {'group_id': group.id})
+    summary = response.json()['summary']
+    assert (summary['total'], summary['count']) == ("48.50", 7)
+    assert [(c['category'], c['amount']) for c in summary['categories']] == [
+        ("Food", "42.50"), ("Household", "5.00"), (None, "1.00")]
+    assert [(p['payer']['username'], p['amount']) for p in summary['payers']] == [
+        ("alice", "30.00"), ("bob", "17.50"), ("carol", "1.00")]
+    assert [(m['month'], m['count']) for m in summary['months']] == [("2025-01-01", 4), ("2025-02-01", 3)]
+
+    response = client.get(reverse('cost_summary'), {'group_id': group.id, 'from': '2025-02', 'to': '2025-02'})
+    assert response.json()['summary']['total'] == "13.50"
+    assert client.get(reverse('cost_summary'), {'group_id': group.id, 'from': '2025-02-01'}).status_code == 400
+    assert client.get(reverse('cost_summary'), {'group_id': 9999}).status_code == 404
+
+    outsider = User.objects.create_user(username="outsider", email="outsider@test.com", password="pass")
+    client.force_authenticate(user=outsider)
+    assert client.get(reverse('cost_summary'), {'group_id': group.id}).status_code == 404
+    client.force_authenticate(user=None)
+    assert client.get(reverse('cost_summary'), {'group_id': group.id}).status_code in (401, 403)
+
+
+@pytest.mark.django_db
+def test_rebuild_cost_summary(group):
+    alice, bob, _ = group.members.order_by('id')
+    add_cost(group, alice, bob, 10.10)
+    add_cost(group, alice, alice, 0.20)
+    incremental = get_cost_summary(group)
+    # written without going through the ledger
+    Cost.objects.create(name="Cost", category="Food", date=date(2025, 3, 1), time="12:00", amount=4, group=group,
+                        payer=bob, borrower=alice)
+
+    assert rebuild_cost_summary(group_ids=[group.id]) == 2
+    assert get_cost_summary(group, end=date(2025, 1, 1)) == incremental
+
+    CostSummary.objects.all().delete()
+    out = StringIO()
+    call_command('rebuild_cost_summary', stdout=out)
+    assert "Rebuilt 2 cost summary rows" in out.getvalue()
+    assert get_cost_summary(group)['total'] == Decimal("14.30")
@@ -0,0 +1,45 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+
+from chore_tracker.middleware import QueryRecorder, view_metrics
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    view_metrics.reset()
+    yield view_metrics
+    view_metrics.reset()
+
+
+@pytest.mark.django_db
+def test_query_recorder_counts_duplicates():
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        for username in ("a", "b", "c"):
+            list(User.objects.filter(username=username))
+        User.objects.count()
+
+    assert recorder.count == 4
+    assert recorder.duplicates == 2
+    assert recorder.duration > 0
+
+
+@pytest.mark.django_db
+def test_server_timing_and_metrics(client):
+    User.objects.create_user(username="testuser", password="password", email="testuser@test.com")
+
+    response = client.get(reverse('user_exists'), {'username': 'testuser'})
+    assert 'db;dur=' in response['Server-Timing']
+    assert 'desc="1 queries, 0 duplicates"' in response['Server-Timing']
+
+    client.get(reverse('user_exists'), {'username': 'nobody'})
+    body = client.get(reverse('metrics')).content.decode()
+
+    assert 'chore_tracker_request_duration_seconds_count{view="UserExists"} 2' in body
+    assert 'chore_tracker_request_duration_seconds_bucket{view="UserExists",le="+Inf"} 2' in body
+    assert 'chore_tracker_db_queries_total{view="UserExists"} 2' in body
+    assert '# TYPE chore_tracker_db_duplicate_queries_total counter' in body
@@ -134,3 +134,38 @@ class ModelTestCase(TestCase):
     def test_create_user_without_email_raises_value_error(self):
         with pytest.raises(ValueError):
             User.objects.create_user(email=None, password=None)
+
+    def test_generate_recurring_cost_is_incremental(self):
+        created = self.recurring_cost.generate_costs(until=date(2023, 1, 10))
+        self.assertEqual(len(created), 10)
+        self.assertEqual(self.recurring_cost.generated_through, date(2023, 1, 10))
+
+        self.assertEqual(self.recurring_cost.generate_costs(until=date(2023, 1, 10)), [])
+        created = self.recurring_cost.generate_costs(until=date(2023, 1, 12))
+        self.assertEqual([cost.date for cost in created], [date(2023, 1, 11), date(2023, 1, 12)])
+        self.assertEqual(Cost.objects.filter(name="Test Recurring Cost").count(), 12)
+
+    def test_generate_recurring_cost_stops_at_end_date(self):
+        self.recurring_cost.generate_costs(until=date(2026, 1, 1))
+        self.recurring_cost.refresh_from_db()
+        self.assertEqual(self.recurring_cost.generated_through, date(2025, 1, 2))
+
+    def test_generate_monthly_recurring_cost_splits_amount(self):
+        rent = RecurringCost.objects.create(
+            name="Rent",
+            amount=Decimal("100.00"),
+            start_date=date(2023, 1, 31),
+            frequency="monthly",
+            group=self.group,
+            payer=self.user1,
+        )
+        rent.borrowers.add(self.user1, self.user2, self.recurring_cost.payer)
+
+        # lock, borrowers, one bulk insert, group revision, ledger and summary upserts and watermark, whatever the
+        # number of cycles
+        with self.assertNumQueries(13):
+            created = rent.generate_costs(until=date(2023, 4, 30))
+
+        self.assertEqual(sorted({cost.date for cost in created}),
+                         [date(2023, 1, 31), date(2023, 2, 28), date(2023, 3, 31), date(2023, 4, 30)])
+        self.assertTrue(all(cost.amount == Decimal("50.00") for cost in created))
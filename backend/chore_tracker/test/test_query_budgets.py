@@ -0,0 +1,180 @@
+"""
+Query and wall-time budgets for every endpoint, on a realistically sized group
+(50 members, 500 events, 10k costs). A failing budget usually means a new N+1 loop.
+"""
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from chore_tracker.ledger import record_costs
+from chore_tracker.models import Group, Event, Cost
+
+User = get_user_model()
+
+N_MEMBERS = 50
+N_EVENTS = 500
+N_COSTS = 10000
+
+
+class QueryBudgetTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.members = User.objects.bulk_create([
+            User(username=f"member{i:02d}", email=f"member{i}@test.com", name=f"Member {i}") for i in range(N_MEMBERS)
+        ])
+        cls.user = cls.members[0]
+        cls.group = Group.objects.create(name="Big Flat", status="active", timezone="UTC", creator=cls.user)
+        cls.group.members.add(*cls.members)
+
+        start = date.today() - timedelta(days=N_EVENTS // 5)
+        cls.events = Event.objects.bulk_create([
+            Event(name=f"Chore {i % 25}", first_date=start + timedelta(days=i // 5), group=cls.group,
+                  repeat_every="Weekly" if i < 25 else None)
+            for i in range(N_EVENTS)
+        ])
+        Membership = Event.members.through
+        Membership.objects.bulk_create([
+            Membership(event_id=event.id, user_id=cls.members[(event.id + j) % N_MEMBERS].id)
+            for event in cls.events for j in range(3)
+        ])
+
+        costs = Cost.objects.bulk_create([
+            Cost(name=f"Expense {i}", category="Food", date=start + timedelta(days=i % 100), time="12:00",
+                 amount=10, group=cls.group, payer=cls.members[i % N_MEMBERS],
+                 borrower=cls.members[(i * 7 + 1) % N_MEMBERS], transaction_id=uuid.uuid4())
+            for i in range(N_COSTS)
+        ])
+        record_costs(costs)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assertWithinBudget(self, method, url, max_queries, max_seconds, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, **kwargs)
+            if response.streaming:
+                # streamed responses run their queries while the body is consumed
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(response.status_code, 500, getattr(response, 'content', b'')[:500])
+        self.assertLessEqual(len(queries), max_queries,
+                             f"{method.upper()} {url} ran {len(queries)} queries:\n" +
+                             "\n".join(q['sql'] for q in queries.captured_queries))
+        self.assertLessEqual(elapsed, max_seconds, f"{method.upper()} {url} took {elapsed:.3f}s")
+        return response
+
+    def test_index(self):
+        self.assertWithinBudget('get', reverse('index'), 0, 0.1)
+
+    def test_current_user(self):
+        response = self.assertWithinBudget('get', reverse('get-current-user'), 7, 2.0)
+        self.assertEqual(len(response.json()['groups'][0]['members']), N_MEMBERS)
+
+    def test_view_group(self):
+        self.assertWithinBudget('get', reverse('view_group'), 4, 0.2, data={'group_id': self.group.id})
+
+    def test_group_balances(self):
+        self.assertWithinBudget('get', reverse('group_balances'), 2, 0.5, data={'group_id': self.group.id})
+
+    def test_group_settle_plan(self):
+        self.assertWithinBudget('get', reverse('group_settle_plan'), 3, 0.5, data={'group_id': self.group.id})
+
+    def test_group_stats(self):
+        self.assertWithinBudget('get', reverse('group_stats'), 5, 0.5, data={'group_id': self.group.id})
+
+    def test_group_export(self):
+        # membership, then one query per chunk of rows (and of event members)
+        self.assertWithinBudget('get', reverse('group_export'), 2, 1.0,
+                                data={'group_id': self.group.id, 'type': 'costs'})
+        self.assertWithinBudget('get', reverse('group_export'), 3, 0.5,
+                                data={'group_id': self.group.id, 'type': 'events', 'output': 'ndjson'})
+
+    def test_cost_summary(self):
+        self.assertWithinBudget('get', reverse('cost_summary'), 3, 0.1, data={'group_id': self.group.id})
+
+    def test_view_event(self):
+        self.assertWithinBudget('get', reverse('view-event', args=[self.events[0].id]), 4, 0.1)
+
+    def test_event_list(self):
+        self.assertWithinBudget('get', reverse('event_list'), 7, 0.5,
+                                data={'group_id': self.group.id, 'limit': 200})
+
+    def test_event_completions(self):
+        start = date.today() - timedelta(days=30)
+        self.assertWithinBudget('get', reverse('event_completions'), 3, 0.1,
+                                data={'group_id': self.group.id, 'from': start.isoformat(),
+                                      'to': date.today().isoformat()})
+
+    def test_get_users(self):
+        self.assertWithinBudget('get', reverse('get-users'), 1, 0.5, data={'search': 'member1'})
+
+    def test_user_exists(self):
+        self.assertWithinBudget('get', reverse('user_exists'), 1, 0.1, data={'username': 'member01'})
+
+    def test_register(self):
+        payload = {'username': 'newcomer', 'email': 'newcomer@test.com', 'password': 'a-long-password'}
+        # the wall-time budgets of register and login are mostly password hashing
+        self.assertWithinBudget('post', reverse('register'), 4, 1.0, data=payload, format='json')
+
+    def test_login(self):
+        User.objects.create_user(username='returning', email='returning@test.com', password='a-long-password')
+        response = self.assertWithinBudget('post', reverse('login'), 9, 1.0,
+                                           data={'username': 'Returning', 'password': 'a-long-password'},
+                                           format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_username(self):
+        self.assertWithinBudget('post', reverse('update_username'), 4, 0.1, data={'username': 'renamed'},
+                                format='json')
+
+    def test_create_event(self):
+        payload = {"groupId": self.group.id, "name": "Vacuum", "date": date.today().isoformat(),
+                   "repeatEvery": "Daily", "memberNames": ["member01", "member02"]}
+        self.assertWithinBudget('post', reverse('create_event'), 21, 0.5, data=payload, format='json')
+
+    def test_update_event(self):
+        payload = {"name": "Chore 0", "repeat_every": "Weekly"}
+        self.assertWithinBudget('put', reverse('update_event', args=[self.events[0].id]), 25, 0.5,
+                                data=payload, format='json')
+
+    def test_delete_event(self):
+        self.assertWithinBudget('delete', reverse('delete_event', args=[self.events[-1].id]), 10, 0.5)
+
+    def test_change_event_members(self):
+        payload = {"groupId": self.group.id, "name": "Chore 30", "memberNames": ["member01", "member02"]}
+        self.assertWithinBudget('post', reverse('change_event_members'), 10, 0.2, data=payload, format='json')
+
+    def test_mark_event_complete(self):
+        self.assertWithinBudget('post', reverse('mark_event_complete'), 11, 0.1,
+                                data={"eventId": self.events[0].id}, format='json')
+
+    def test_create_cost(self):
+        payload = {'group_id': self.group.id, 'name': 'Dinner', 'category': 'Food', 'date': '2025-01-01',
+                   'time': '20:00:00', 'amount': '500.00', 'payer': self.user.id,
+                   'borrower': [member.id for member in self.members]}
+        self.assertWithinBudget('post', reverse('create_cost'), 14, 0.5, data=payload, format='json')
+
+    def test_add_user_to_group(self):
+        User.objects.create(username="newcomer", email="newcomer@test.com")
+        self.assertWithinBudget('post', reverse('add_user'), 6, 0.1,
+                                data={'groupId': self.group.id, 'username': 'newcomer'}, format='json')
+
+    def test_create_group(self):
+        payload = {'groupName': 'Another', 'groupStatus': 'active', 'groupTimezone': 'UTC',
+                   'groupCreatorId': self.user.id}
+        self.assertWithinBudget('post', reverse('create_group'), 8, 0.1, data=payload, format='json')
+
+    def test_leave_group(self):
+        self.assertWithinBudget('post', reverse('leave_group'), 6, 0.1, data={'groupId': self.group.id},
+                                format='json')
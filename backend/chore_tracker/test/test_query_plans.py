@@ -0,0 +1,71 @@
+import re
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+
+from chore_tracker.models import Group, Event, Cost, Completion, DailyStat, CostSummary
+
+User = get_user_model()
+
+
+def assert_uses_index(queryset):
+    """ Fails if the plan of `queryset` reads any table with a full scan """
+    if connection.vendor == 'postgresql':
+        # tiny test tables would otherwise always be sequentially scanned
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+        plan = queryset.explain()
+        assert 'Seq Scan' not in plan, plan
+    else:
+        plan = queryset.explain()
+        full_scans = [line for line in plan.splitlines()
+                      if re.search(r'\bSCAN\b', line) and 'INDEX' not in line]
+        assert not full_scans, plan
+
+
+@pytest.fixture
+def data():
+    user = User.objects.create_user(username="Alice", email="alice@test.com", password="pass")
+    other = User.objects.create_user(username="bob", email="bob@test.com", password="pass")
+    group = Group.objects.create(name="Group", status="active", timezone="UTC", creator=user)
+    Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    Cost.objects.create(name="Food", date=date(2025, 1, 1), time="12:00", amount=10, group=group,
+                        payer=user, borrower=other)
+    return user, other, group
+
+
+HOT_QUERIES = {
+    'occurrence lookup': lambda user, other, group: Event.objects.filter(
+        group=group, first_date=date(2025, 1, 2), name="Dishes"),
+    'series occurrences': lambda user, other, group: Event.objects.filter(
+        series_id=group.events.get().series_id, first_date__gt=date(2025, 1, 1)),
+    'event list keyset': lambda user, other, group: Event.objects.filter(group=group).filter(
+        Q(first_date__gt=date(2025, 1, 1)) | Q(first_date=date(2025, 1, 1), id__gt=1)).order_by('first_date', 'id'),
+    'completion range': lambda user, other, group: Completion.objects.filter(
+        group=group, month__gte=date(2025, 1, 1), month__lte=date(2025, 3, 1)),
+    'series completion range': lambda user, other, group: Completion.objects.filter(
+        series_id=group.events.get().series_id, month__gte=date(2025, 1, 1), month__lte=date(2025, 3, 1)),
+    'stats rollup range': lambda user, other, group: DailyStat.objects.filter(
+        group=group, date__gte=date(2025, 1, 1), date__lte=date(2025, 3, 1)),
+    'cost summary range': lambda user, other, group: CostSummary.objects.filter(
+        group=group, month__gte=date(2025, 1, 1), month__lte=date(2025, 12, 1)),
+    'unsettled costs': lambda user, other, group: Cost.objects.filter(group=group, settled=False),
+    'costs between users': lambda user, other, group: Cost.objects.filter(borrower=other, payer=user),
+    'costs by payer': lambda user, other, group: Cost.objects.filter(payer=user),
+    'login': lambda user, other, group: User.objects.filter(username__lower="alice"),
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", HOT_QUERIES.keys())
+def test_hot_query_uses_index(name, data):
+    assert_uses_index(HOT_QUERIES[name](*data))
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason="substring search is only indexed with pg_trgm")
+def test_user_search_uses_trigram_index(data):
+    assert_uses_index(User.objects.filter(username__icontains="li"))
@@ -0,0 +1,38 @@
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import override_settings
+
+from chore_tracker.renderers import JsonResponse, dumps
+
+PAYLOAD = {
+    'id': 1,
+    'date': date(2025, 1, 31),
+    'created': datetime(2025, 1, 31, 12, 30, tzinfo=timezone.utc),
+    'amount': Decimal('12.50'),
+    'transaction_id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'members': [{'username': 'user', 'photo_url': None}],
+    'is_complete': False,
+}
+
+
+@pytest.mark.parametrize('renderer', ['orjson', 'stdlib'])
+def test_renderers_match_django_encoder(renderer):
+    with override_settings(JSON_RENDERER=renderer):
+        rendered = dumps(PAYLOAD)
+    assert json.loads(rendered) == json.loads(json.dumps(PAYLOAD, cls=DjangoJSONEncoder))
+
+
+def test_json_response():
+    response = JsonResponse({'success': True, 'amount': Decimal('1.10')}, status=201)
+    assert response.status_code == 201
+    assert response['Content-Type'] == 'application/json'
+    assert json.loads(response.content) == {'success': True, 'amount': '1.10'}
+
+    with pytest.raises(TypeError):
+        JsonResponse([1, 2])
+    assert json.loads(JsonResponse([1, 2], safe=False).content) == [1, 2]
@@ -0,0 +1,96 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from chore_tracker.models import Group, Event
+from chore_tracker.search import username_index
+
+User = get_user_model()
+
+
+@pytest.fixture
+def setup(db):
+    user = User.objects.create_user(username='user', password='pass', email='user@test.com')
+    other = User.objects.create_user(username='other', password='pass', email='other@test.com')
+    group = Group.objects.create(name='Flat', status='active', timezone='UTC', creator=user)
+    group.members.add(user, other)
+    event = Event.objects.create(name='Dishes', first_date=timezone.now().date(), group=group)
+    event.members.add(user)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client, user, other, group, event
+
+
+def test_writes_bump_the_group_revision(setup):
+    client, user, other, group, event = setup
+    revision = Group.objects.get(id=group.id).revision
+
+    client.post(reverse('create_cost'), {'group_id': group.id, 'name': 'Pizza', 'category': 'Food',
+                                         'date': '2025-01-01', 'time': '20:00:00', 'amount': '10.00',
+                                         'payer': user.id, 'borrower': [other.id]}, format='json')
+    group.refresh_from_db()
+    assert group.revision > revision
+    assert group.modified_at is not None
+
+
+def test_view_group_answers_304_with_one_query(setup, django_assert_num_queries):
+    client, user, other, group, event = setup
+    response = client.get(reverse('view_group'), {'group_id': group.id})
+    assert response.status_code == 200
+    assert response.has_header('Last-Modified')
+    etag = response['ETag']
+
+    with django_assert_num_queries(1):
+        response = client.get(reverse('view_group'), {'group_id': group.id}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+    group.members.remove(other)
+    response = client.get(reverse('view_group'), {'group_id': group.id}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['group']['members'] == ['user']
+    assert response['ETag'] != etag
+
+
+def test_view_event_changes_with_its_members(setup):
+    client, user, other, group, event = setup
+    etag = client.get(reverse('view-event', args=[event.id]))['ETag']
+    assert client.get(reverse('view-event', args=[event.id]), HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    event.members.add(other)
+    response = client.get(reverse('view-event', args=[event.id]), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert sorted(response.json()['event']['members']) == ['other', 'user']
+
+
+def test_current_user_etag_follows_memberships(setup):
+    client, user, other, group, event = setup
+    etag = client.get(reverse('get-current-user'))['ETag']
+    assert client.get(reverse('get-current-user'), HTTP_IF_NONE_MATCH=etag).status_code == 304
+    # a different expansion window is a different representation
+    assert client.get(reverse('get-current-user'), {'to': '2030-01-01'}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    group.members.remove(user)
+    response = client.get(reverse('get-current-user'), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['groups'] == []
+
+
+def test_get_users_etag_is_content_based(setup):
+    client = setup[0]
+    username_index.reset()
+    etag = client.get(reverse('get-users'), {'search': 'us'})['ETag']
+    assert client.get(reverse('get-users'), {'search': 'us'}, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get(reverse('get-users'), {'search': 'ot'}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    username_index.reset()
+
+
+@pytest.mark.parametrize('name', ['view_group', 'event_completions', 'cost_summary'])
+def test_malformed_group_id_reaches_the_handler(setup, name):
+    client, user, other, group, event = setup
+    response = client.get(reverse(name), {'group_id': 'abc'})
+    assert response.status_code in (400, 404)
+    assert 'ETag' not in response
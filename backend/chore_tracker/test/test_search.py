@@ -0,0 +1,120 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from chore_tracker.search import (UsernameIndex, username_index, tokens, within_one_edit, invalidate_usernames,
+                                  record_username, get_version)
+
+User = get_user_model()
+
+
+@pytest.fixture
+def index():
+    username_index.reset()
+    yield UsernameIndex()
+    username_index.reset()
+
+
+def test_tokens():
+    assert tokens("John_Smith") == ["john_smith", "smith"]
+    assert tokens("alice") == ["alice"]
+
+
+@pytest.mark.django_db
+def test_search_ranking(index):
+    for username in ["annabel", "ann", "anna", "joanna", "bob_ann", "zed"]:
+        User.objects.create_user(username=username, email=f"{username}@test.com", password="pass")
+
+    results = [user['username'] for user in index.search("ann")]
+    assert results == ["ann", "anna", "annabel", "bob_ann"]
+    assert [user['username'] for user in index.search("ANN", limit=2)] == ["ann", "anna"]
+    assert index.search("nobody") == []
+
+
+def test_within_one_edit():
+    assert within_one_edit("john", "john")
+    assert within_one_edit("jonh", "john") is False
+    assert within_one_edit("jon", "john")
+    assert within_one_edit("johnn", "john")
+    assert within_one_edit("jahn", "john")
+    assert not within_one_edit("jo", "john")
+
+
+@pytest.mark.django_db
+def test_search_tolerates_one_typo(index):
+    for username in ["jonathan", "john_smith", "jane", "smithers"]:
+        User.objects.create_user(username=username, email=f"{username}@test.com", password="pass")
+
+    assert [user['username'] for user in index.search("jonatan")] == ["jonathan"]
+    assert [user['username'] for user in index.search("smiht")] == ["smithers", "john_smith"]
+    # exact and prefix matches first, typos only fill up the rest
+    assert [user['username'] for user in index.search("jane")] == ["jane"]
+    assert [user['username'] for user in index.search("jan")] == ["jane"]
+
+
+@pytest.mark.django_db
+def test_index_follows_the_shared_version(index):
+    user = User.objects.create_user(username="carol", email="carol@test.com", password="pass")
+    assert [u['username'] for u in index.search("car")] == ["carol"]
+
+    # a rename in another process: only the shared version tells this one
+    User.objects.filter(id=user.id).update(username="caroline")
+    assert [u['username'] for u in index.search("car")] == ["carol"]
+    invalidate_usernames()
+    assert [u['username'] for u in index.search("car")] == ["caroline"]
+
+
+@pytest.mark.django_db
+def test_index_applies_changes_without_rebuilding(index, django_assert_num_queries):
+    carol = User.objects.create_user(username="carol", email="carol@test.com", password="pass")
+    index.search("car")
+
+    # changes published by other processes
+    record_username(carol.id, "caroline")
+    record_username(carol.id + 1, "carl")
+    record_username(carol.id + 2, "cary")
+    record_username(carol.id + 2, None)
+    with django_assert_num_queries(0):
+        assert [u['username'] for u in index.search("car")] == ["carl", "caroline"]
+        assert index.search("carol")[0] == {'id': carol.id, 'username': 'caroline'}
+    assert index.version == get_version()
+
+
+@pytest.mark.django_db
+def test_index_is_rebuilt_by_one_thread_at_a_time(index, django_assert_num_queries):
+    User.objects.create_user(username="carol", email="carol@test.com", password="pass")
+    index.search("car")
+    User.objects.create_user(username="carl", email="carl@test.com", password="pass")
+    invalidate_usernames()
+
+    # while another thread rebuilds, searches use the index as it is
+    with index.building, django_assert_num_queries(0):
+        assert [u['username'] for u in index.search("car")] == ["carol"]
+    assert [u['username'] for u in index.search("car")] == ["carl", "carol"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_signals_keep_global_index_current(index):
+    username_index.search("dav")
+    user = User.objects.create_user(username="dave", email="dave@test.com", password="pass")
+    assert username_index.search("dav") == [{'id': user.id, 'username': 'dave'}]
+
+    user.username = "david"
+    user.save()
+    assert username_index.search("dav") == [{'id': user.id, 'username': 'david'}]
+
+    user.delete()
+    assert username_index.search("dav") == []
+
+
+@pytest.mark.django_db
+def test_get_users_view_limits_results(client, index):
+    for i in range(15):
+        User.objects.create_user(username=f"user{i:02d}", email=f"user{i}@test.com", password="pass")
+
+    response = client.get(reverse('get-users'), {'search': 'user'})
+    assert response.status_code == 200
+    assert len(response.json()['users']) == 10
+
+    response = client.get(reverse('get-users'), {'search': 'user1', 'limit': 3})
+    assert [u['username'] for u in response.json()['users']] == ["user10", "user11", "user12"]
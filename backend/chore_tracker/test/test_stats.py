@@ -0,0 +1,160 @@
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework.test import APIClient
+
+from chore_tracker.completions import toggle_completion
+from chore_tracker.models import Group, Event, DailyStat
+from chore_tracker.scheduler import run_pending
+from chore_tracker.stats import get_group_stats, roll_up, streaks
+from chore_tracker.utils import materialize_event
+
+User = get_user_model()
+
+
+@pytest.fixture
+def chores(db):
+    user = User.objects.create_user(username='user', password='pass', email='user@test.com')
+    other = User.objects.create_user(username='other', password='pass', email='other@test.com')
+    group = Group.objects.create(name='Flat', status='active', timezone='UTC', creator=user)
+    group.members.add(user, other)
+    dishes = Event.objects.create(name='Dishes', first_date=date(2025, 1, 1), repeat_every='Daily', group=group)
+    dishes.members.add(user)
+    materialize_event(dishes, until=date(2025, 1, 17))
+    party = Event.objects.create(name='Party', first_date=date(2025, 1, 5), group=group)
+    party.members.add(other)
+    toggle_completion(party, date(2025, 1, 5), other)
+    for day in (1, 2, 3, 5, 6, 7, 8, 9):
+        toggle_completion(dishes, date(2025, 1, day), user)
+    return user, other, group, dishes
+
+
+def test_streaks():
+    days = [(None, 1, 1), (None, 1, 0), (None, 0, 0), (None, 2, 2), (None, 1, 1)]
+    assert streaks(days) == (2, 2)
+    assert streaks([]) == (0, 0)
+
+
+@freeze_time("2025-01-10")
+def test_group_stats(chores):
+    user, other, group, dishes = chores
+
+    stats = get_group_stats(group, date(2025, 1, 1), date(2025, 1, 17))
+
+    members = {member['user']['username']: member for member in stats['members']}
+    assert [member['user']['username'] for member in stats['members']] == ['user', 'other']
+    assert members['user'] == {
+        'user': {'id': user.id, 'username': 'user'}, 'assigned': 10, 'completed': 8, 'completion_rate': 0.8,
+        'overdue': 1, 'current_streak': 5, 'longest_streak': 5, 'upcoming': 7,
+    }
+    assert members['other']['completion_rate'] == 1.0
+    assert stats['weeks'][0] == {'week': date(2024, 12, 30), 'assigned': 6, 'completed': 5}
+    assert sum(week['assigned'] for week in stats['weeks']) == 18
+
+
+@freeze_time("2025-01-10")
+def test_rollup_is_rewound_by_late_writes(chores, django_assert_num_queries):
+    user, other, group, dishes = chores
+    expected = get_group_stats(group, date(2025, 1, 1), date(2025, 1, 10))
+    # reads never roll up
+    assert not DailyStat.objects.exists()
+
+    roll_up(group)
+    assert group.stats_rolled_until == date(2025, 1, 9)
+    assert DailyStat.objects.filter(group=group, user=user).count() == 9
+
+    # rollup range, live aggregate of today (totals, members, completions), members
+    with django_assert_num_queries(5):
+        assert get_group_stats(group, date(2025, 1, 1), date(2025, 1, 10)) == expected
+
+    toggle_completion(dishes, date(2025, 1, 4), user)
+    group.refresh_from_db()
+    assert group.stats_rolled_until == date(2025, 1, 3)
+
+    stats = get_group_stats(group, date(2025, 1, 1), date(2025, 1, 10))
+    assert stats['members'][0]['overdue'] == 0
+    assert stats['members'][0]['current_streak'] == 9
+    roll_up(group)
+    assert DailyStat.objects.get(group=group, user=user, date=date(2025, 1, 4)).completed == 1
+
+
+@freeze_time("2025-01-10")
+def test_members_are_credited_for_their_own_completions(chores):
+    user, other, group, dishes = chores
+    trash = Event.objects.create(name='Trash', first_date=date(2025, 1, 6), group=group)
+    trash.members.add(user, other)
+    toggle_completion(trash, date(2025, 1, 6), other)
+
+    def check():
+        stats = get_group_stats(group, date(2025, 1, 6), date(2025, 1, 6))
+        members = {member['user']['username']: member for member in stats['members']}
+        assert (members['user']['assigned'], members['user']['completed']) == (2, 1)
+        assert (members['other']['assigned'], members['other']['completed']) == (1, 1)
+        assert stats['weeks'][0]['completed'] == 2
+
+    check()  # live aggregate
+    roll_up(group)
+    check()  # from the rollup
+
+
+@freeze_time("2025-01-10")
+def test_chores_completed_by_anyone_are_not_overdue(chores):
+    user, other, group, dishes = chores
+    trash = Event.objects.create(name='Trash', first_date=date(2025, 1, 4), group=group)
+    trash.members.add(user, other)
+    toggle_completion(trash, date(2025, 1, 4), user)
+    Event.objects.filter(group=group, series_id=dishes.series_id, first_date=date(2025, 1, 4)).update(is_complete=True)
+
+    def check():
+        stats = get_group_stats(group, date(2025, 1, 4), date(2025, 1, 4))
+        members = {member['user']['username']: member for member in stats['members']}
+        assert members['user']['overdue'] == members['other']['overdue'] == 0
+        assert (members['user']['assigned'], members['user']['completed']) == (2, 1)
+        assert (members['other']['assigned'], members['other']['completed']) == (1, 0)
+
+    check()
+    roll_up(group)
+    check()
+
+
+@freeze_time("2025-01-10")
+def test_daily_stats_are_unique(chores):
+    user, other, group, dishes = chores
+    roll_up(group)
+    with pytest.raises(IntegrityError), transaction.atomic():
+        DailyStat.objects.create(group=group, date=date(2025, 1, 1), assigned=1)
+    with pytest.raises(IntegrityError), transaction.atomic():
+        DailyStat.objects.create(group=group, date=date(2025, 1, 1), user=user, assigned=1)
+
+
+@freeze_time("2025-01-10")
+def test_roll_up_job(chores):
+    user, other, group, dishes = chores
+
+    metrics = {m['job']: m for m in run_pending(worker_id="a")}
+
+    assert metrics['roll_up_stats']['processed'] == 1
+    group.refresh_from_db()
+    assert group.stats_rolled_until == date(2025, 1, 9)
+    assert roll_up(group) == 0
+
+
+@freeze_time("2025-01-10")
+def test_group_stats_view(chores):
+    user, other, group, dishes = chores
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(reverse('group_stats'), {'group_id': group.id})
+    assert response.status_code == 200
+    stats = response.json()['stats']
+    assert (stats['from'], stats['to']) == ('2024-12-14', '2025-01-10')
+    assert stats['members'][0]['completed'] == 8
+
+    assert client.get(reverse('group_stats'), {'group_id': group.id, 'from': '2025-01-10',
+                                               'to': '2025-01-01'}).status_code == 400
+    assert client.get(reverse('group_stats'), {'group_id': 999}).status_code == 404
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import NoReverseMatch, include, path, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from chore_tracker import stream, urls
+from chore_tracker.models import Group, Event
+
+User = get_user_model()
+
+# the stream is only routed with ASYNC_READ_VIEWS
+urlpatterns = [path('api/', include(urls.async_urlpatterns + urls.urlpatterns))]
+
+
+def test_local_broker_fans_out_per_group():
+    async def run():
+        broker = stream.LocalBroker()
+        first, second = broker.subscribe(1), broker.subscribe(1)
+        other = broker.subscribe(2)
+
+        # writes publish from request threads, not from the consumers' loop
+        thread = threading.Thread(target=broker.publish, args=(1, {'type': 'event.created'}))
+        thread.start()
+        thread.join()
+
+        assert (await first.get(timeout=1))['type'] == 'event.created'
+        assert (await second.get(timeout=1))['type'] == 'event.created'
+        with pytest.raises(asyncio.TimeoutError):
+            await other.get(timeout=0.05)
+
+        for subscription in (first, second, other):
+            subscription.close()
+        assert broker.subscriptions == {}
+
+    async_to_sync(run)()
+
+
+def test_slow_subscriber_gets_a_resync():
+    async def run():
+        broker = stream.LocalBroker()
+        subscription = broker.subscribe(1)
+        for i in range(stream.MAX_QUEUE + 5):
+            broker.publish(1, {'type': 'cost.added', 'id': i})
+        await asyncio.sleep(0)
+
+        messages = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+        assert messages[0]['type'] == 'resync'
+        assert [message['id'] for message in messages[1:]] == list(range(stream.MAX_QUEUE + 1, stream.MAX_QUEUE + 5))
+        subscription.close()
+
+    async_to_sync(run)()
+
+
+@pytest.fixture
+def group(db):
+    user = User.objects.create_user(username='user', password='pass', email='user@test.com')
+    outsider = User.objects.create_user(username='outsider', password='pass', email='outsider@test.com')
+    group = Group.objects.create(name='Flat', status='active', timezone='UTC', creator=user)
+    group.members.add(user)
+    return group, user, outsider
+
+
+def auth(user):
+    return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def post_committed(user, name, data):
+    """ A write view call whose on_commit callbacks (the stream deltas) run as if the request committed """
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        return client.post(reverse(name), data, format='json')
+
+
+def test_stream_needs_asgi_routes():
+    with pytest.raises(NoReverseMatch):
+        reverse('group_stream')
+
+
+def test_broker_interface():
+    with pytest.raises(TypeError):
+        stream.Broker()
+
+
+@override_settings(ROOT_URLCONF=__name__)
+def test_stream_delivers_deltas_of_write_views(group):
+    group, user, outsider = group
+    event = Event.objects.create(name='Dishes', first_date=timezone.now().date(), group=group)
+
+    async def run():
+        response = await AsyncClient().get(reverse('group_stream'), {'group_id': group.id}, headers=auth(user))
+        assert response['Content-Type'] == 'text/event-stream'
+        content = response.streaming_content
+        assert await anext(content) == b'retry: 3000\n\n'
+
+        await sync_to_async(post_committed)(user, 'mark_event_complete', {'eventId': event.id})
+        frame = (await asyncio.wait_for(anext(content), 1)).decode()
+        assert frame.startswith('id: ')
+        assert 'event: event.completed\n' in frame
+        delta = json.loads(frame.split('data: ')[1])
+        assert delta['group_id'] == group.id
+        assert delta['data'] == {'id': event.id, 'date': event.first_date.isoformat(), 'is_complete': True}
+
+        await sync_to_async(post_committed)(user, 'add_user', {'groupId': group.id, 'username': 'outsider'})
+        frame = (await asyncio.wait_for(anext(content), 1)).decode()
+        assert 'event: member.joined\n' in frame
+        assert json.loads(frame.split('data: ')[1])['data']['username'] == 'outsider'
+        await content.aclose()
+
+    async_to_sync(run)()
+    assert stream.get_broker().subscriptions == {}
+
+
+@override_settings(ROOT_URLCONF=__name__)
+def test_stream_requires_membership(group):
+    group, user, outsider = group
+
+    async def run():
+        client = AsyncClient()
+        assert (await client.get(reverse('group_stream'), {'group_id': group.id})).status_code == 401
+        response = await client.get(reverse('group_stream'), {'group_id': group.id}, headers=auth(outsider))
+        assert response.status_code == 404
+
+    async_to_sync(run)()
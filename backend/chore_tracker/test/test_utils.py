@@ -0,0 +1,214 @@
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from freezegun import freeze_time
+
+from chore_tracker.models import Group, Event, EventException, RecurringCost, ScheduledJob
+from chore_tracker.scheduler import materialize_due_groups, run_pending, run_job, acquire_lease, release_lease
+from chore_tracker.completions import toggle_completion
+from chore_tracker.utils import (occurrence_dates, expand_occurrences, cancel_occurrence,
+                                 update_recurring_events, materialize_event, delete_recurrences, end_series,
+                                 assign_series_ids)
+
+User = get_user_model()
+
+
+def test_occurrence_dates_monthly_does_not_drift():
+    dates = list(occurrence_dates(date(2025, 1, 31), "Monthly", date(2025, 1, 1), date(2025, 4, 30)))
+    assert dates == [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)]
+
+
+def test_occurrence_dates_skips_to_window():
+    dates = list(occurrence_dates(date(2020, 1, 1), "Weekly", date(2025, 1, 1), date(2025, 1, 15)))
+    assert dates == [date(2025, 1, 1), date(2025, 1, 8), date(2025, 1, 15)]
+
+
+def test_occurrence_dates_one_off():
+    assert list(occurrence_dates(date(2025, 1, 1), None, date(2025, 1, 1), date(2025, 2, 1))) == [date(2025, 1, 1)]
+    assert list(occurrence_dates(date(2025, 1, 1), "Yearly", date(2025, 2, 1), date(2025, 3, 1))) == []
+
+
+@pytest.mark.django_db
+@freeze_time("2025-01-01")
+def test_expand_occurrences_is_read_only():
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    group = Group.objects.create(name="Group", status="active", timezone="UTC", creator=user)
+    event = Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    event.members.add(user)
+
+    occurrences = expand_occurrences(group, date(2025, 3, 31))
+
+    assert len(occurrences) == 89
+    assert occurrences[0]['first_date'] == date(2025, 1, 2)
+    assert occurrences[0]['members'] == [{'username': 'user'}]
+    assert Event.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_virtual_occurrence_exceptions():
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    group = Group.objects.create(name="Group", status="active", timezone="UTC", creator=user)
+    event = Event.objects.create(name="Trash", first_date=date(2025, 1, 1), repeat_every="Weekly", group=group)
+
+    assert toggle_completion(event, date(2025, 1, 15), user) is True
+    cancel_occurrence(event, date(2025, 1, 22))
+    with pytest.raises(ValueError):
+        cancel_occurrence(event, date(2025, 1, 23))
+
+    occurrences = {o['first_date']: o for o in expand_occurrences(group, date(2025, 1, 31))}
+    assert occurrences[date(2025, 1, 15)]['is_complete'] is True
+    assert occurrences[date(2025, 1, 8)]['is_complete'] is False
+    assert date(2025, 1, 22) not in occurrences
+    assert EventException.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_update_recurring_events_is_incremental(django_assert_max_num_queries):
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    group = Group.objects.create(name="Group", status="active", timezone="UTC", creator=user)
+    Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+
+    update_recurring_events(group, until=date(2025, 1, 10))
+    assert Event.objects.count() == 10
+    assert group.materialized_until == date(2025, 1, 10)
+
+    with django_assert_max_num_queries(0):
+        update_recurring_events(group, until=date(2025, 1, 10))
+
+    update_recurring_events(group, until=date(2025, 1, 12))
+    assert sorted(Event.objects.values_list('first_date', flat=True))[-1] == date(2025, 1, 12)
+    assert Event.objects.count() == 12
+
+
+@pytest.mark.django_db
+def test_materialize_due_groups():
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    for i in range(3):
+        group = Group.objects.create(name=f"Group {i}", status="active", timezone="UTC", creator=user)
+        Event.objects.create(name="Trash", first_date=date(2025, 1, 1), repeat_every="Weekly", group=group)
+
+    assert materialize_due_groups(until=date(2025, 1, 31), batch_size=2) == 3
+    assert Event.objects.count() == 15
+    assert materialize_due_groups(until=date(2025, 1, 31)) == 0
+
+    call_command('materialize_recurrences', until='2025-02-07')
+    assert Event.objects.count() == 18
+
+
+@pytest.mark.django_db
+def test_materialize_event_uses_bulk_inserts(django_assert_max_num_queries):
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    other = User.objects.create_user(username="other", email="other@test.com", password="pass")
+    group = Group.objects.create(name="Group", status="active", timezone="UTC", creator=user)
+    event = Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    event.members.add(user, other)
+    EventException.objects.create(event=event, date=date(2025, 1, 5), is_cancelled=True)
+
+    # 3 reads and the bulk inserts, which SQLite splits into a few batches for a whole year
+    with django_assert_max_num_queries(12):
+        materialize_event(event, until=date(2025, 12, 31))
+
+    expected = 365 - 1  # one cancelled
+    assert Event.objects.count() == expected
+    assert not Event.objects.filter(first_date=date(2025, 1, 5)).exists()
+    assert Event.members.through.objects.count() == 2 * expected
+
+
+def test_delete_occurrences_covers_every_reference():
+    # delete_occurrences() deletes these before its raw deletes of events and exceptions
+    references = {(field.related_model, field.field.name)
+                  for model in (Event, EventException)
+                  for field in model._meta.get_fields(include_hidden=True)
+                  if field.one_to_many or field.one_to_one}
+    assert references == {(Event.members.through, 'event'), (EventException, 'event')}
+
+
+@pytest.mark.django_db
+def test_delete_recurrences_is_set_based(django_assert_max_num_queries):
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    group = Group.objects.create(name="Group", status="active", timezone="UTC", creator=user)
+    event = Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    event.members.add(user)
+    other = Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    materialize_event(event, until=date(2025, 12, 31))
+    materialize_event(other, until=date(2025, 1, 10))
+    EventException.objects.create(event=event, date=date(2026, 1, 5), is_complete=True)
+
+    # members, exceptions, occurrences, revision bump, stats watermark; none of them per row
+    with django_assert_max_num_queries(7):
+        assert delete_recurrences(event) == 364
+
+    assert Event.objects.filter(series_id=event.series_id).get() == event
+    assert Event.objects.filter(series_id=other.series_id).count() == 10
+    assert Event.members.through.objects.get().event == event
+    assert not EventException.objects.exists()
+
+
+@pytest.mark.django_db
+def test_assign_series_ids_splits_the_shared_default():
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    groups = [Group.objects.create(name=f"Group {i}", status="active", timezone="UTC", creator=user) for i in range(2)]
+    for group in groups:
+        dishes = Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+        materialize_event(dishes, until=date(2025, 1, 5))
+        Event.objects.create(name="Party", first_date=date(2025, 1, 3), group=group)
+        Event.objects.create(name="Party", first_date=date(2025, 1, 4), group=group)
+    # what adding the column leaves behind: one value for every row
+    Event.objects.update(series_id=groups[0].events.first().series_id)
+
+    assert assign_series_ids() == 14
+    assert Event.objects.values('series_id').distinct().count() == 6
+    assert groups[0].events.filter(name="Dishes").values('series_id').distinct().count() == 1
+    assert assign_series_ids() == 0
+
+    party = groups[0].events.get(name="Party", first_date=date(2025, 1, 3))
+    assert end_series(party) == 1
+    assert Event.objects.count() == 13
+
+
+@pytest.mark.django_db
+def test_series_deletes_stay_in_their_group():
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    group = Group.objects.create(name="Group", status="active", timezone="UTC", creator=user)
+    other_group = Group.objects.create(name="Other", status="active", timezone="UTC", creator=user)
+    event = Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    stray = Event.objects.create(name="Dishes", first_date=date(2025, 1, 2), repeat_every="Daily",
+                                 group=other_group, series_id=event.series_id)
+
+    end_series(event)
+    assert Event.objects.get() == stray
+
+
+@pytest.mark.django_db
+@freeze_time("2025-01-10")
+def test_run_pending_runs_due_jobs_once():
+    user = User.objects.create_user(username="user", email="user@test.com", password="pass")
+    group = Group.objects.create(name="Group", status="active", timezone="UTC", creator=user)
+    group.members.add(user)
+    Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    rent = RecurringCost.objects.create(name="Rent", amount=300, start_date=date(2025, 1, 1), frequency="weekly",
+                                        group=group, payer=user)
+    rent.borrowers.add(user)
+
+    metrics = {m['job']: m for m in run_pending(worker_id="a")}
+
+    assert metrics['materialize_recurrences']['processed'] == 1
+    assert metrics['generate_recurring_costs']['processed'] == 2
+    assert Event.objects.filter(first_date=date(2025, 1, 17)).exists()
+    assert ScheduledJob.objects.get(name='generate_recurring_costs').last_processed == 2
+    # nothing is due until the next interval
+    assert run_pending(worker_id="a") == []
+
+
+@pytest.mark.django_db
+def test_job_lease_elects_one_runner():
+    ScheduledJob.objects.create(name='materialize_recurrences')
+
+    assert acquire_lease('materialize_recurrences', "a") is True
+    assert acquire_lease('materialize_recurrences', "b") is False
+    assert run_job('materialize_recurrences', worker_id="b") is None
+
+    release_lease('materialize_recurrences', "a")
+    assert run_job('materialize_recurrences', worker_id="b")['error'] is None
@@ -1,5 +1,5 @@
 import json
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 from unittest.mock import patch
 
@@ -10,9 +10,12 @@ from django.test import Client
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from freezegun import freeze_time
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from chore_tracker.completions import get_completions
 from chore_tracker.models import Group, Event, Cost
+from chore_tracker.utils import materialize_event, expand_occurrences, expand_series, update_recurring_events
 
 User = get_user_model()
 
@@ -109,6 +112,15 @@ def test_login_user_success(client):
     assert response.status_code == status.HTTP_200_OK
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize('username, login_as', [('test_username', 'TEST_Username'), ('Ärger', 'Ärger'),
+                                                ('Ärger', 'ÄRGER')])
+def test_login_ignores_username_case(client, username, login_as):
+    User.objects.create_user(username=username, password='test_password', email='test@example.com')
+    response = client.post(reverse('login'), {'username': login_as, 'password': 'test_password'})
+    assert response.status_code == status.HTTP_200_OK
+
+
 @pytest.mark.django_db
 def test_login_error(client):
     url = reverse('login')
@@ -175,6 +187,20 @@ def test_view_group_success(client):
     assert data['group']['creator'] == "testuser"
 
 
+@pytest.mark.django_db
+def test_view_group_does_not_materialize(client):
+    user = User.objects.create_user(username="testuser", email="test@example.com", password="pass")
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=user)
+    group.members.add(user)
+    Event.objects.create(name="Dishes", first_date="2025-01-01", repeat_every="Daily", group=group)
+
+    client.force_login(user)
+    response = client.get(reverse('view_group'), {'group_id': group.id})
+
+    assert response.status_code == 200
+    assert Event.objects.count() == 1
+
+
 @pytest.mark.django_db
 def test_view_group_not_found(client):
     user = User.objects.create_user(username="testuser", email="test@example.com", password="pass")
@@ -241,7 +267,8 @@ def test_update_event_success(client):
     group = Group.objects.create(name="Test Group", status="active", expiration=timezone.now(), timezone="UTC",
                                  creator=user)
     event = Event.objects.create(name="Old Event", first_date="2025-01-01", group=group)
-    client.force_login(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
 
     payload = {
         "name": "Updated Event",
@@ -263,6 +290,19 @@ def test_update_event_success(client):
     assert event.first_date.isoformat() == "2025-02-01"
     assert event.repeat_every == "monthly"
     assert event.is_complete is True
+    assert get_completions(series_id=event.series_id) == {(event.series_id, date(2025, 2, 1)): ["user"]}
+
+    payload = {"is_complete": False}
+    response = client.put(reverse("update_event", args=[event.id]), data=payload, format="json")
+    assert response.status_code == 200
+    event.refresh_from_db()
+    assert event.is_complete is False
+    assert get_completions(series_id=event.series_id) == {}
+
+    client.force_authenticate(user=None)
+    payload = {"is_complete": True}
+    response = client.put(reverse("update_event", args=[event.id]), data=payload, format="json")
+    assert response.status_code == 401
 
 
 @pytest.mark.django_db
@@ -376,7 +416,9 @@ def test_mark_event_complete(client):
 
     event = Event.objects.create(name="Test Event", first_date="2025-01-01", group=group, is_complete=False)
 
-    client.force_login(creator)
+    # completions are recorded per user, so the request needs DRF authentication
+    client = APIClient()
+    client.force_authenticate(user=creator)
 
     payload = {
         "eventId": event.id
@@ -562,3 +604,333 @@ def test_leave_group_success():
     group.refresh_from_db()
     assert member not in group.members.all()
 
+
+
+@pytest.mark.django_db
+def test_current_user_view_expands_recurring_events():
+    user = User.objects.create_user(username='test_username', password='testpassword', email='test@example.com')
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=user)
+    group.members.add(user)
+    event = Event.objects.create(name="Dishes", first_date=timezone.now().date(), repeat_every="Weekly", group=group)
+    event.members.add(user)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    to = (timezone.now().date() + timedelta(days=28)).isoformat()
+    response = client.get(reverse('get-current-user'), {'to': to})
+
+    events = response.json()['groups'][0]['events']
+    assert response.status_code == 200
+    assert len(events) == 5
+    assert [e['is_virtual'] for e in events] == [False, True, True, True, True]
+    assert all(e['id'] == event.id for e in events)
+    assert Event.objects.count() == 1
+    assert len({e['key'] for e in events}) == 5
+
+    # an occurrence is completed through its date, the id is the series' root for all of them
+    virtual = events[2]
+    client.post(reverse('mark_event_complete'), {'eventId': virtual['id'], 'date': virtual['first_date'],
+                                                 'eventIsComplete': True}, format='json')
+    events = client.get(reverse('get-current-user'), {'to': to}).json()['groups'][0]['events']
+    assert [e['is_complete'] for e in events] == [False, False, True, False, False]
+
+    assert client.get(reverse('get-current-user'), {'to': 'bogus'}).status_code == 400
+    # capped at the read horizon, about 13 weeks
+    events = client.get(reverse('get-current-user'), {'to': '2400-01-01'}).json()['groups'][0]['events']
+    assert len(events) in (13, 14)
+
+
+@pytest.mark.django_db
+def test_mark_virtual_occurrence_complete(client):
+    creator = User.objects.create_user(username="creator", password="pass", email="creator@test.com")
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=creator)
+    event = Event.objects.create(name="Test Event", first_date="2025-01-01", repeat_every="Daily", group=group)
+    client = APIClient()
+    client.force_authenticate(user=creator)
+
+    payload = {"eventId": event.id, "date": "2025-01-05"}
+    response = client.post(reverse('mark_event_complete'), data=json.dumps(payload), content_type="application/json")
+
+    assert response.status_code == 200
+    assert response.json()["eventStatus"] is True
+    event.refresh_from_db()
+    assert event.is_complete is False
+    assert event.exceptions.get(date="2025-01-05").is_complete is True
+
+    payload = {"eventId": event.id, "date": "2025-01-05T00:00"}
+    response = client.post(reverse('mark_event_complete'), data=json.dumps(payload), content_type="application/json")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_delete_single_occurrence(client):
+    user = User.objects.create_user(username="user", password="pass", email="user@test.com")
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=user)
+    event = Event.objects.create(name="Test Event", first_date="2025-01-01", repeat_every="Weekly", group=group)
+    client.force_login(user)
+
+    response = client.delete(reverse('delete_event', args=[event.id]) + '?date=2025-01-08')
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "Event occurrence deleted"
+    assert Event.objects.filter(id=event.id).exists()
+    assert event.exceptions.get(date="2025-01-08").is_cancelled is True
+
+
+def _seed_series(user):
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=user)
+    event = Event.objects.create(name="Dishes", first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    event.members.add(user)
+    materialize_event(event)
+    return group, event
+
+
+@pytest.mark.django_db
+@freeze_time("2025-01-01")
+def test_update_event_this_and_following(client):
+    user = User.objects.create_user(username="user", password="pass", email="user@test.com")
+    group, root = _seed_series(user)
+    client.force_login(user)
+    occurrence = Event.objects.get(series_id=root.series_id, first_date="2025-01-05")
+
+    response = client.put(reverse("update_event", args=[occurrence.id]),
+                          data=json.dumps({"name": "Sweep"}), content_type="application/json")
+
+    assert response.status_code == 200
+    old = Event.objects.filter(series_id=root.series_id)
+    assert sorted(str(e.first_date) for e in old) == ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04"]
+    assert all(str(e.repeat_until) == "2025-01-04" for e in old)
+    new = Event.objects.filter(name="Sweep").order_by("first_date")
+    assert [str(e.first_date) for e in new] == ["2025-01-05", "2025-01-06", "2025-01-07", "2025-01-08"]
+    occurrence.refresh_from_db()
+    assert {e.series_id for e in new} == {occurrence.series_id} != {root.series_id}
+    assert {o['name'] for o in expand_occurrences(group, date(2025, 1, 31))} == {"Sweep"}
+
+
+@pytest.mark.django_db
+@freeze_time("2025-01-01")
+def test_update_only_this_occurrence(client):
+    user = User.objects.create_user(username="user", password="pass", email="user@test.com")
+    group, root = _seed_series(user)
+    client.force_login(user)
+    occurrence = Event.objects.get(series_id=root.series_id, first_date="2025-01-03")
+
+    response = client.put(reverse("update_event", args=[occurrence.id]),
+                          data=json.dumps({"name": "Sweep", "scope": "this"}), content_type="application/json")
+
+    assert response.status_code == 200
+    occurrence.refresh_from_db()
+    assert (occurrence.name, occurrence.repeat_every) == ("Sweep", None)
+    assert root.exceptions.get(date="2025-01-03").is_cancelled is True
+    assert Event.objects.filter(series_id=root.series_id).count() == 7
+    update_recurring_events(group, until=date(2025, 1, 10))
+    assert not Event.objects.filter(series_id=root.series_id, first_date="2025-01-03").exists()
+
+    response = client.put(reverse("update_event", args=[root.id]),
+                          data=json.dumps({"name": "Sweep", "scope": "this"}), content_type="application/json")
+    assert response.status_code == 400
+    response = client.put(reverse("update_event", args=[root.id]),
+                          data=json.dumps({"scope": "all"}), content_type="application/json")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@freeze_time("2025-01-01")
+def test_delete_event_this_and_following(client):
+    user = User.objects.create_user(username="user", password="pass", email="user@test.com")
+    group, root = _seed_series(user)
+    client.force_login(user)
+    occurrence = Event.objects.get(series_id=root.series_id, first_date="2025-01-05")
+
+    response = client.delete(reverse('delete_event', args=[occurrence.id]))
+
+    assert response.status_code == 200
+    assert sorted(str(d) for d in Event.objects.values_list('first_date', flat=True)) == [
+        "2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04"]
+    assert Event.members.through.objects.count() == 4
+    assert expand_occurrences(group, date(2025, 1, 31)) == []
+
+    response = client.delete(reverse('delete_event', args=[root.id]) + '?scope=this')
+    assert response.status_code == 400
+    occurrence = Event.objects.get(series_id=root.series_id, first_date="2025-01-03")
+    response = client.delete(reverse('delete_event', args=[occurrence.id]) + '?scope=this')
+    assert response.status_code == 200
+    assert Event.objects.count() == 3
+
+    response = client.delete(reverse('delete_event', args=[root.id]))
+    assert response.status_code == 200
+    assert not Event.objects.exists()
+
+
+def _seed_dashboard(user, n_groups, n_events, n_members):
+    for g in range(n_groups):
+        group = Group.objects.create(name=f"Group {g}", status="active", timezone="UTC", creator=user)
+        members = [User.objects.create_user(username=f"{user.username}{g}_{m}", email=f"{user.username}{g}_{m}@test.com", password="pass")
+                   for m in range(n_members)]
+        group.members.add(user, *members)
+        for e in range(n_events):
+            event = Event.objects.create(name=f"Event {e}", first_date=timezone.now().date(),
+                                         repeat_every="Weekly" if e % 2 else None, group=group)
+            event.members.add(user, *members)
+
+
+@pytest.mark.django_db
+def test_current_user_view_query_count_is_constant(django_assert_num_queries):
+    small = User.objects.create_user(username='small', password='pass', email='small@example.com')
+    large = User.objects.create_user(username='large', password='pass', email='large@example.com')
+    _seed_dashboard(small, n_groups=1, n_events=2, n_members=1)
+    _seed_dashboard(large, n_groups=4, n_events=10, n_members=5)
+
+    client = APIClient()
+    for user, n_events in ((small, 2), (large, 40)):
+        client.force_authenticate(user=user)
+        # ETag revisions, cache versions of the user's groups, then groups, group members, events,
+        # event members, recurrence exceptions
+        with django_assert_num_queries(7):
+            response = client.get(reverse('get-current-user'))
+        # ETag revisions only, the payload is served from the dashboard cache
+        with django_assert_num_queries(1):
+            assert client.get(reverse('get-current-user')).json() == response.json()
+
+        groups = response.json()['groups']
+        assert sum(1 for group in groups for event in group['events'] if not event['is_virtual']) == n_events
+        assert all(len(event['members']) > 1 for group in groups for event in group['events'])
+
+
+@pytest.mark.django_db
+def test_event_list_paginates_stored_and_virtual_events(client):
+    user = User.objects.create_user(username="user", password="pass", email="user@test.com")
+    other = User.objects.create_user(username="other", password="pass", email="other@test.com")
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=user)
+    group.members.add(user, other)
+    daily = Event.objects.create(name="Dishes", first_date="2025-01-01", repeat_every="Daily", group=group)
+    daily.members.add(user)
+    single = Event.objects.create(name="Party", first_date="2025-01-03", group=group, is_complete=True)
+    single.members.add(other)
+    client.force_login(user)
+
+    seen = []
+    params = {'group_id': group.id, 'from': '2025-01-01', 'to': '2025-01-10', 'limit': 4}
+    while True:
+        data = client.get(reverse('event_list'), params).json()
+        assert len(data['events']) <= 4
+        seen.extend((e['first_date'], e['name']) for e in data['events'])
+        if data['next_cursor'] is None:
+            break
+        params['cursor'] = data['next_cursor']
+
+    assert len(seen) == 11
+    assert seen[:4] == [('2025-01-01', 'Dishes'), ('2025-01-02', 'Dishes'), ('2025-01-03', 'Dishes'),
+                        ('2025-01-03', 'Party')]
+    assert seen[-1] == ('2025-01-10', 'Dishes')
+
+    data = client.get(reverse('event_list'), {'group_id': group.id, 'to': '2025-01-10', 'member': 'other'}).json()
+    assert [e['name'] for e in data['events']] == ['Party']
+
+    data = client.get(reverse('event_list'), {'group_id': group.id, 'to': '2025-01-10', 'is_complete': 'true'}).json()
+    assert [e['name'] for e in data['events']] == ['Party']
+
+
+@pytest.mark.django_db
+@freeze_time("2025-01-01")
+def test_event_list_expansion_is_bounded(client):
+    user = User.objects.create_user(username="user", password="pass", email="user@test.com")
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=user)
+    for name in ("Dishes", "Laundry", "Trash"):
+        Event.objects.create(name=name, first_date=date(2025, 1, 1), repeat_every="Daily", group=group)
+    client.force_login(user)
+
+    expanded = []
+
+    def spy(*args, **kwargs):
+        expanded.extend(expand_series(*args, **kwargs))
+        return expanded
+
+    with patch('chore_tracker.utils.expand_series', side_effect=spy):
+        data = client.get(reverse('event_list'), {'group_id': group.id, 'to': '2400-01-01', 'limit': 5}).json()
+    assert len(data['events']) == 5
+    assert data['next_cursor'] is not None
+    # no more than a page (plus one to detect the next) of virtual occurrences from each series
+    assert len(expanded) == 3 * 6
+
+    seen = 0
+    params = {'group_id': group.id, 'to': '2400-01-01', 'limit': 200}
+    while True:
+        data = client.get(reverse('event_list'), params).json()
+        seen += len(data['events'])
+        if data['next_cursor'] is None:
+            break
+        params['cursor'] = data['next_cursor']
+    # nothing past the read horizon, 90 days out
+    assert seen == 3 * 91
+
+
+@pytest.mark.django_db
+def test_event_list_invalid_parameters(client):
+    user = User.objects.create_user(username="user", password="pass", email="user@test.com")
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=user)
+    client.force_login(user)
+
+    assert client.get(reverse('event_list'), {'group_id': 9999}).status_code == 404
+    assert client.get(reverse('event_list'), {'group_id': group.id, 'cursor': 'nope'}).status_code == 400
+    assert client.get(reverse('event_list'), {'group_id': group.id, 'from': '01/01/2025'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_create_cost_split_uses_constant_queries(client, django_assert_max_num_queries):
+    users = [User.objects.create_user(username=f"user{i}", password="password", email=f"user{i}@test.com")
+             for i in range(20)]
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=users[0])
+    group.members.add(*users)
+    client.force_login(users[0])
+
+    cost_data = {
+        'group_id': group.id,
+        'name': 'Dinner',
+        'category': 'Food',
+        'date': '2025-01-01',
+        'time': '20:00:00',
+        'amount': '200.00',
+        'payer': users[0].id,
+        'borrower': [user.id for user in users]
+    }
+    # session + user for the login, groups, users, memberships, one insert, the balance and summary upserts
+    with django_assert_max_num_queries(14):
+        response = client.post(reverse('create_cost'), data=cost_data, content_type="application/json")
+
+    assert response.status_code == 201
+    assert len(response.json()['transaction_ids']) == 1
+    assert Cost.objects.count() == 20
+    assert all(cost.amount == 10.0 for cost in Cost.objects.all())
+
+
+@pytest.mark.django_db
+def test_create_cost_batch(client):
+    user1 = User.objects.create_user(username="user1", password="password", email="user1@test.com")
+    user2 = User.objects.create_user(username="user2", password="password", email="user2@test.com")
+    user3 = User.objects.create_user(username="user3", password="password", email="user3@test.com")
+    group = Group.objects.create(name="Test Group", status="active", timezone="UTC", creator=user1)
+    group.members.add(user1, user2)
+    client.force_login(user1)
+
+    expense = {'name': 'Groceries', 'category': 'Food', 'date': '2025-01-01', 'time': '10:00:00',
+               'amount': '30.00', 'payer': user1.id, 'borrower': [user1.id, user2.id]}
+    payload = {'group_id': group.id, 'expenses': [expense, {**expense, 'name': 'Snacks', 'amount': '9.99'}]}
+    response = client.post(reverse('create_cost'), data=payload, content_type="application/json")
+
+    assert response.status_code == 201
+    assert len(set(response.json()['transaction_ids'])) == 2
+    assert Cost.objects.filter(name='Snacks').count() == 2
+
+    # a later invalid expense rejects the whole batch
+    payload = {'group_id': group.id, 'expenses': [expense, {**expense, 'borrower': [user3.id]}]}
+    response = client.post(reverse('create_cost'), data=payload, content_type="application/json")
+
+    assert response.status_code == 400
+    assert response.json()['error'] == 'Expense 2: User user3 is not a member of the group'
+    assert Cost.objects.count() == 4
+
+    payload = {'group_id': group.id, 'expenses': [{**expense, 'borrower': [9999]}]}
+    response = client.post(reverse('create_cost'), data=payload, content_type="application/json")
+    assert response.status_code == 400
+    assert response.json()['error'] == 'Expense 1: User 9999 not found'
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import (RegisterUser, LoginView, CreateGroup, IndexView, AddUsertoGroup, ViewGroup,
                     CreateEvent, UpdateEvent, DeleteEvent, ViewEvent, CurrentUserView, ChangeEventMembers,
-                    MarkEventComplete, UserExists, CreateCost, GetUsers, UpdateUsername, LeaveGroup)
+                    MarkEventComplete, UserExists, CreateCost, GetUsers, UpdateUsername, LeaveGroup, EventList,
+                    GroupBalances, GroupSettlePlan, GroupStats, GroupExport, EventCompletions, CostSummaryView)
 
 
 urlpatterns = [
@@ -14,15 +17,36 @@ urlpatterns = [
     path('group/add_users/', AddUsertoGroup.as_view(), name='add_group'),
     path('group/view/', ViewGroup.as_view(), name='view_group'),
     path('group/leave_group/', LeaveGroup.as_view(), name='leave_group'),
+    path('group/balances/', GroupBalances.as_view(), name='group_balances'),
+    path('group/stats/', GroupStats.as_view(), name='group_stats'),
+    path('group/export/', GroupExport.as_view(), name='group_export'),
+    path('group/settle_plan/', GroupSettlePlan.as_view(), name='group_settle_plan'),
     path('event/create/', CreateEvent.as_view(), name='create_event'),
     path('event/update/<int:event_id>/', UpdateEvent.as_view(), name='update_event'),
     path('event/delete/<int:event_id>/', DeleteEvent.as_view(), name='delete_event'),
     path('event/view/<int:event_id>/', ViewEvent.as_view(), name='view-event'),
+    path('event/list/', EventList.as_view(), name='event_list'),
+    path('event/completions/', EventCompletions.as_view(), name='event_completions'),
     path('event/change_members/', ChangeEventMembers.as_view(), name='change_event_members'),
     path('event/complete/', MarkEventComplete.as_view(), name='mark_event_complete'),
     path('get-users/', GetUsers.as_view(), name='get-users'),
     path('group/add_user/', AddUsertoGroup.as_view(), name='add_user'),
     path('user/exists/', UserExists.as_view(), name='user_exists'),
     path('cost/create/', CreateCost.as_view(), name='create_cost'),
+    path('cost/summary/', CostSummaryView.as_view(), name='cost_summary'),
 
 ]
+
+# Async-native read endpoints for ASGI deployments, same paths and names as the DRF views they replace, and the
+# group stream, which under WSGI would hold a worker for as long as the client stays connected
+async_urlpatterns = [
+    path('group/stream/', async_views.GroupStream.as_view(), name='group_stream'),
+    path('get-current-user/', async_views.CurrentUserView.as_view(), name='get-current-user'),
+    path('group/view/', async_views.ViewGroup.as_view(), name='view_group'),
+    path('event/view/<int:event_id>/', async_views.ViewEvent.as_view(), name='view-event'),
+    path('get-users/', async_views.GetUsers.as_view(), name='get-users'),
+    path('user/exists/', async_views.UserExists.as_view(), name='user_exists'),
+]
+
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
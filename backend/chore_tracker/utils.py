@@ -1,50 +1,432 @@
-from chore_tracker.models import Group, Event
-from datetime import datetime
+from chore_tracker.models import Group, Event, EventException
+from chore_tracker.revisions import mark_changed
+from chore_tracker.stats import invalidate_rollup
+import base64
+import uuid
+from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
 
+# How far ahead occurrences are expanded (virtually) for reads
 TIME_THRESHOLD = relativedelta(days=90)
+# How far ahead occurrences are written as real Event rows
+MATERIALIZE_THRESHOLD = relativedelta(days=7)
 
-def update_recurring_events(group):
-    events = Event.objects.filter(group=group)
+REPEAT_DELTAS = {
+    "Daily": relativedelta(days=1),
+    "Weekly": relativedelta(weeks=1),
+    "Monthly": relativedelta(months=1),
+}
+# Upper bound on the length of one step, used to jump close to a window without walking every date
+MAX_STEP_DAYS = {
+    "Daily": 1,
+    "Weekly": 7,
+    "Monthly": 31,
+}
 
+
+def get_repeat_delta(repeat_every):
+    """ Returns the step of a recurrence rule, or None for one-off or malformed values """
+    return REPEAT_DELTAS.get(repeat_every)
+
+
+def occurrence_dates(first_date, repeat_every, start, end):
+    """
+    Lazily yields every date of a series that falls within [start, end].
+    Dates are computed as first_date + n * step so monthly series do not drift (Jan 31 -> Feb 28 -> Mar 31).
+    """
+    delta = get_repeat_delta(repeat_every)
+    if delta is None:
+        if start <= first_date <= end:
+            yield first_date
+        return
+
+    n = max(0, (start - first_date).days // MAX_STEP_DAYS[repeat_every])
+    cur_date = first_date + delta * n
+    while cur_date <= end:
+        if cur_date >= start:
+            yield cur_date
+        n += 1
+        cur_date = first_date + delta * n
+
+
+def series_end(root, end):
+    """ Cuts `end` at the date the series of `root` stops repeating on, if it was ended """
+    if root.repeat_until is not None and root.repeat_until < end:
+        return root.repeat_until
+    return end
+
+
+def occurrence_key(event_id, date):
+    """
+    Identifies one occurrence in read payloads: virtual occurrences carry the id of their series' root, so
+    the id alone is not unique
+    """
+    return f"{event_id}:{date.isoformat()}"
+
+
+def get_series_bounds(group):
+    """
+    Returns {series_id: (root_id, last_date)} for every recurring series of a group.
+    The root is the row the series was created from; last_date is the last occurrence stored as a row.
+    """
+    series = (Event.objects.filter(group=group, repeat_every__in=REPEAT_DELTAS.keys())
+              .values('series_id')
+              .annotate(root_id=Min('id'), last_date=Max('first_date')))
+    return {s['series_id']: (s['root_id'], s['last_date']) for s in series}
+
+
+def find_series(events):
+    """
+    Same as get_series_bounds but over Event rows that are already loaded.
+    Returns a list of (root, last_date) for every recurring series among `events`.
+    """
+    series = {}
     for event in events:
-        if event.repeat_every is None or event.repeat_every=='':
-            continue
-        
-        if event.repeat_every=="Daily":
-            t_delta = relativedelta(days=1)
-        elif event.repeat_every=="Weekly":
-            t_delta = relativedelta(weeks=1)
-        elif event.repeat_every=="Monthly":
-            t_delta = relativedelta(months=1)
-        else: # Malformed value
+        if get_repeat_delta(event.repeat_every) is None:
             continue
+        key = event.series_id
+        root, last_date = series.get(key, (event, event.first_date))
+        if event.id < root.id:
+            root = event
+        if event.first_date > last_date:
+            last_date = event.first_date
+        series[key] = (root, last_date)
+    return list(series.values())
+
+
+def get_exceptions(root_ids):
+    """ Returns {(root_id, date): exception} for the given series roots """
+    return {(exception.event_id, exception.date): exception
+            for exception in EventException.objects.filter(event_id__in=root_ids)}
+
+
+def expand_series(series, exceptions, end, start=None, members=None, accept=None, limit=None):
+    """
+    Expands (root, last_date) series into the occurrences that are not stored as rows, up to `end`.
+    Pure function: `exceptions` come from get_exceptions, and members are read from `members`
+    ({root_id: [{'username'}]}) when given, from the roots' prefetched members otherwise.
+    Each occurrence is a dict that refers back to its root Event through `id`. Only occurrences passing
+    `accept` are kept, and at most the first `limit` of each series.
+    """
+    occurrences = []
+    for root, last_date in series:
+        kept = 0
+        window_start = last_date + timedelta(days=1)
+        if start is not None and start > window_start:
+            window_start = start
+
+        root_members = None
+        for date in occurrence_dates(root.first_date, root.repeat_every, window_start, series_end(root, end)):
+            exception = exceptions.get((root.id, date))
+            if exception is not None and exception.is_cancelled:
+                continue
+            if root_members is None:
+                if members is not None:
+                    root_members = members.get(root.id, [])
+                else:
+                    root_members = [{'username': member.username} for member in root.members.all()]
+            occurrence = {
+                'id': root.id,
+                'key': occurrence_key(root.id, date),
+                'name': root.name,
+                'members': root_members,
+                'first_date': date,
+                'repeat_every': root.repeat_every,
+                'is_complete': bool(exception is not None and exception.is_complete),
+                'is_virtual': True,
+            }
+            if accept is not None and not accept(occurrence):
+                continue
+            occurrences.append(occurrence)
+            kept += 1
+            if limit is not None and kept >= limit:
+                break
+
+    return occurrences
+
+
+def expand_occurrences(group, end, start=None, accept=None, limit=None):
+    """
+    Expands the recurring series of a group into the occurrences that are not stored as rows, up to `end`
+    (see expand_series for `accept` and `limit`). Only the rule (root row) and its exceptions are read;
+    nothing is written.
+    """
+    bounds = get_series_bounds(group)
+    if not bounds:
+        return []
+
+    root_ids = [root_id for root_id, _ in bounds.values()]
+    roots = {root.id: root for root in Event.objects.filter(id__in=root_ids).prefetch_related('members')}
+    series = [(roots[root_id], last_date) for root_id, last_date in bounds.values()]
+    return expand_series(series, get_exceptions(root_ids), end, start=start, accept=accept, limit=limit)
+
+
+def get_series_root(event):
+    """ Returns the root Event of the series an occurrence belongs to """
+    if get_repeat_delta(event.repeat_every) is None:
+        return event
+    return Event.objects.filter(group_id=event.group_id, series_id=event.series_id).order_by('id').first()
+
+
+def is_occurrence(root, date):
+    """ Checks whether `date` is one of the dates generated by the series rooted at `root` """
+    return any(True for _ in occurrence_dates(root.first_date, root.repeat_every, date, series_end(root, date)))
+
+
+def cancel_occurrence(event, date):
+    """ Removes only the occurrence of `event`'s series on `date`, keeping the rest of the series """
+    root = get_series_root(event)
+    if date == root.first_date or not is_occurrence(root, date):
+        raise ValueError(f"{date} is not a later occurrence of {root}")
+
+    EventException.objects.update_or_create(event=root, date=date, defaults={'is_cancelled': True})
+    Event.objects.filter(group_id=root.group_id, series_id=root.series_id, first_date=date).delete()
+
+
+def get_read_horizon():
+    """ Returns the date up to which occurrences are expanded for reads """
+    return datetime.date(datetime.today() + TIME_THRESHOLD)
+
+
+def parse_expand_until(value):
+    """
+    Parses the `to` date of the dashboard, which defaults to and is capped at the read horizon so a client
+    cannot make it (and the cached copy per date) arbitrarily large. Raises ValueError if malformed.
+    """
+    horizon = get_read_horizon()
+    if not value:
+        return horizon
+    return min(datetime.strptime(value, "%Y-%m-%d").date(), horizon)
+
+
+def get_materialize_until():
+    """ Returns the date up to which occurrences should be stored as rows """
+    return datetime.date(datetime.today() + MATERIALIZE_THRESHOLD)
+
+
+def materialize_event(event, since=None, until=None):
+    """
+    Stores the occurrences of `event`'s series that fall after `since` and up to `until`.
+    `until` defaults to the group's watermark, so a new series catches up with the rest of the group.
+    """
+    if until is None:
+        until = get_materialize_until()
+        if event.group.materialized_until is not None and event.group.materialized_until > until:
+            until = event.group.materialized_until
+
+    materialize_events(event.group, [event], since=since, until=until)
+
+
+def materialize_events(group, events, since=None, until=None):
+    """
+    Stores the missing occurrences of several series of one group after `since` and up to `until`.
+    Existing rows, exceptions and members are each read with one query and all new rows are written with
+    two bulk inserts, so the number of round trips does not depend on how many occurrences are created.
+    """
+    events = [event for event in events if get_repeat_delta(event.repeat_every) is not None]
+    if not events:
+        return []
+
+    windows = {}
+    for event in events:
+        start_time = event.first_date + timedelta(days=1)
+        if since is not None and since >= start_time:
+            start_time = since + timedelta(days=1)
+        windows[event.id] = start_time
+
+    series_ids = {event.series_id for event in events}
+    earliest = min(windows.values())
+    existing = set(Event.objects.filter(group=group, series_id__in=series_ids, first_date__gte=earliest,
+                                        first_date__lte=until)
+                   .values_list('series_id', 'first_date'))
+    exceptions = {
+        (series_id, date): (is_cancelled, is_complete)
+        for series_id, date, is_cancelled, is_complete in EventException.objects.filter(
+            event__group=group, event__series_id__in=series_ids, date__gte=earliest, date__lte=until
+        ).values_list('event__series_id', 'date', 'is_cancelled', 'is_complete')
+    }
+    Membership = Event.members.through
+    members = {}
+    for event_id, user_id in (Membership.objects.filter(event_id__in=windows.keys())
+                              .values_list('event_id', 'user_id')):
+        members.setdefault(event_id, []).append(user_id)
+
+    new_events = []
+    sources = []
+    for event in events:
+        for cur_time in occurrence_dates(event.first_date, event.repeat_every, windows[event.id],
+                                         series_end(event, until)):
+            if (event.series_id, cur_time) in existing:
+                continue
+            is_cancelled, is_complete = exceptions.get((event.series_id, cur_time), (False, False))
+            if is_cancelled:
+                continue
+
+            existing.add((event.series_id, cur_time))
+            new_events.append(Event(
+                name=event.name,
+                first_date=cur_time,
+                repeat_every=event.repeat_every,
+                series_id=event.series_id,
+                repeat_until=event.repeat_until,
+                group=group,
+                is_complete=is_complete,
+            ))
+            sources.append(event.id)
+
+    if not new_events:
+        return []
+
+    with transaction.atomic():
+        created = Event.objects.bulk_create(new_events)
+        Membership.objects.bulk_create([
+            Membership(event_id=new_event.id, user_id=user_id)
+            for new_event, source_id in zip(created, sources)
+            for user_id in members.get(source_id, [])
+        ])
+        mark_changed(group_ids=[group.id])
+        invalidate_rollup(group.id, min(new_event.first_date for new_event in new_events))
+    return created
+
+
+def update_recurring_events(group, until=None):
+    """
+    Extends the stored occurrences of every recurring series of a group up to `until`.
+    Only dates after the group's materialized_until watermark are considered, so repeated runs are cheap.
+    """
+    if until is None:
+        until = get_materialize_until()
+    since = group.materialized_until
+    if since is not None and since >= until:
+        return
+
+    root_ids = [root_id for root_id, _ in get_series_bounds(group).values()]
+    materialize_events(group, Event.objects.filter(id__in=root_ids), since=since, until=until)
+
+    group.materialized_until = until
+    group.save(update_fields=['materialized_until'])
+
+
+def delete_occurrences(event, since):
+    """
+    Deletes the stored occurrences of `event`'s series from `since` on, with their members and the series'
+    exceptions from that date. Set-based: a fixed number of statements however long the series is.
+
+    QuerySet.delete() would load every row, as Event and EventException have delete receivers, and disconnecting
+    those for the call would drop the signals of deletes running in other threads meanwhile. The raw deletes
+    are safe because the rows deleted before them are the only ones referencing these: Event is only pointed
+    at by its members table and EventException, and nothing points at EventException
+    (test_delete_occurrences_covers_every_reference keeps this true). A reference added later would make the
+    delete fail on its foreign key constraint rather than leave rows behind.
+    """
+    series = Event.objects.filter(group_id=event.group_id, series_id=event.series_id)
+    occurrences = series.filter(first_date__gte=since)
+    exceptions = EventException.objects.filter(Q(event__in=occurrences) | Q(event__in=series, date__gte=since))
+    with transaction.atomic():
+        Event.members.through.objects.filter(event__in=occurrences).delete()
+        # raw deletes skip the collector, which would load every row to send its delete signals; the one
+        # mark_changed below stands in for the per-row signal receivers
+        exceptions._raw_delete(exceptions.db)
+        deleted = occurrences._raw_delete(occurrences.db)
+        mark_changed(group_ids=[event.group_id])
+        invalidate_rollup(event.group_id, since)
+    return deleted
 
-        end_time = datetime.date(datetime.today() + TIME_THRESHOLD)
-        start_time = event.first_date
-        cur_time = start_time + t_delta
-        while cur_time <= end_time:
-
-            future_events = Event.objects.filter(group=group, first_date=cur_time, name=event.name)
-            if len(future_events) == 0: # Here we will need to make future events
-                new_event = Event.objects.create(
-                    # ID should be created automatically
-                    name=event.name,
-                    first_date=cur_time, # This should be the only difference
-                    repeat_every=event.repeat_every,
-                    group=group,
-                    #members=event.members,
-                    is_complete=False,
-                )
-                new_event.members.set(event.members.all())
-            cur_time += t_delta
 
 def delete_recurrences(event):
-    if event.repeat_every is None or event.repeat_every=='':
+    """ Deletes the stored occurrences and exceptions of `event`'s series after `event` """
+    if get_repeat_delta(event.repeat_every) is None:
+        return 0
+    return delete_occurrences(event, event.first_date + timedelta(days=1))
+
+
+def end_series(event):
+    """
+    Deletes `event` and everything after it in its series ("this and following"); the earlier occurrences
+    stay and the series stops repeating before `event`.
+    """
+    with transaction.atomic():
+        deleted = delete_occurrences(event, event.first_date)
+        if get_repeat_delta(event.repeat_every) is not None:
+            Event.objects.filter(group_id=event.group_id, series_id=event.series_id).update(
+                repeat_until=event.first_date - timedelta(days=1))
+    return deleted
+
+
+def split_series(event):
+    """
+    Prepares a "this and following" edit of a stored occurrence: deletes the later occurrences and ends the
+    earlier ones before `event`, which then starts a series of its own (the caller saves it). For the root of
+    a series the series is kept and only its later occurrences are deleted.
+    """
+    if get_repeat_delta(event.repeat_every) is None:
+        return
+    with transaction.atomic():
+        delete_recurrences(event)
+        earlier = Event.objects.filter(group_id=event.group_id, series_id=event.series_id,
+                                       first_date__lt=event.first_date)
+        if earlier.update(repeat_until=event.first_date - timedelta(days=1)):
+            event.series_id = uuid.uuid4()
+
+
+def detach_occurrence(event):
+    """
+    Prepares an "only this" edit of a stored occurrence: its date is cancelled in the series and the row
+    becomes a one-off event (the caller saves it). The root of a series cannot be detached.
+    """
+    if get_repeat_delta(event.repeat_every) is None:
         return
-    future_events = Event.objects.filter(group=event.group, 
-                                         name=event.name, 
-                                         repeat_every=event.repeat_every,
-                                         first_date__gt=event.first_date)
-    for fe in future_events:
-        fe.delete()
+    root = get_series_root(event)
+    if root.id == event.id:
+        raise ValueError(f"{event} is the root of its series")
+    EventException.objects.update_or_create(event=root, date=event.first_date, defaults={'is_cancelled': True})
+    event.series_id = uuid.uuid4()
+    event.repeat_every = None
+    event.repeat_until = None
+
+
+def assign_series_ids(batch_size=1000):
+    """
+    Gives every series its own series_id where several share one, as all rows stored before the field existed
+    do: the column is added with a single default value. Rows are grouped the way series were identified
+    before, by (group, name, repeat_every), and every one-off event gets an id of its own.
+    Returns the number of rows updated; a no-op once every series has its own id.
+    """
+    shared = (Event.objects.values('series_id')
+              .annotate(rows=Count('id'), groups=Count('group_id', distinct=True),
+                        names=Count('name', distinct=True), rules=Count('repeat_every', distinct=True),
+                        one_offs=Count('id', filter=~Q(repeat_every__in=REPEAT_DELTAS.keys())))
+              .filter(Q(groups__gt=1) | Q(names__gt=1) | Q(rules__gt=1) | Q(rows__gt=1, one_offs__gt=0))
+              .values_list('series_id', flat=True))
+    series_ids = list(shared)
+    if not series_ids:
+        return 0
+
+    events = list(Event.objects.filter(series_id__in=series_ids).only('id', 'group_id', 'name', 'repeat_every'))
+    new_ids = {}
+    for event in events:
+        if get_repeat_delta(event.repeat_every) is None:
+            event.series_id = uuid.uuid4()
+        else:
+            key = (event.group_id, event.name, event.repeat_every)
+            event.series_id = new_ids.setdefault(key, uuid.uuid4())
+    with transaction.atomic():
+        Event.objects.bulk_update(events, ['series_id'], batch_size=batch_size)
+        mark_changed(group_ids={event.group_id for event in events})
+    return len(events)
+
+
+def encode_cursor(first_date, event_id):
+    """ Encodes the (first_date, id) keyset position of the last returned event as an opaque string """
+    return base64.urlsafe_b64encode(f"{first_date.isoformat()}:{event_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """ Inverse of encode_cursor; raises ValueError on malformed cursors """
+    try:
+        first_date, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return datetime.strptime(first_date, "%Y-%m-%d").date(), int(event_id)
+    except (TypeError, UnicodeDecodeError, base64.binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -1,9 +1,13 @@
 import logging
 import uuid
-from _decimal import Decimal, ROUND_HALF_UP
+from _decimal import Decimal, ROUND_HALF_UP, InvalidOperation
 from django.contrib.auth import get_user_model
 from django.contrib.auth import login
-from django.http import JsonResponse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from django.http import StreamingHttpResponse
 from django.utils.dateparse import parse_datetime
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -12,10 +16,24 @@ from rest_framework.views import APIView
 from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken
 from chore_tracker.models import Group, Event, Cost
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 from json import JSONDecodeError
-from chore_tracker.utils import update_recurring_events, delete_recurrences
+from chore_tracker.cache import get_dashboard
+from chore_tracker.completions import toggle_completion, set_completion, get_completions
+from chore_tracker.export import export, EXPORTS, FORMATS
+from chore_tracker.ledger import record_costs, get_balances, plan_settlement, apply_settlement, get_cost_summary
+from chore_tracker.renderers import JsonResponse
+from chore_tracker.revisions import (conditional, group_validators, event_validators,
+                                     current_user_validators)
+from chore_tracker.search import search_users, DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT
+from chore_tracker.serializers import (serialize_current_user, serialize_event, serialize_cost, serialize_event_row,
+                                      event_rows, event_members)
+from chore_tracker.stats import get_group_stats, DEFAULT_DAYS as DEFAULT_STATS_DAYS
+from chore_tracker.stream import publish
+from chore_tracker.utils import (materialize_event, split_series, detach_occurrence, end_series, get_repeat_delta,
+                                 cancel_occurrence, expand_occurrences, encode_cursor, decode_cursor,
+                                 get_read_horizon, parse_expand_until)
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -58,8 +76,9 @@ class LoginView(APIView):
         username = request.data.get('username')
         password = request.data.get('password')
 
-        # case-insensitive username check
-        user = User.objects.filter(username__iexact=username).first()
+        # case-insensitive username check, served by the Lower(username) index; both sides are lowered by the
+        # database so they agree on non-ASCII letters (SQLite's LOWER only folds ASCII)
+        user = User.objects.filter(username__lower=Lower(Value(username or ''))).first()
 
         if user and user.check_password(password):
 
@@ -112,12 +131,12 @@ class CreateGroup(APIView):
 class ViewGroup(APIView):
     """ View a Group """
 
+    @conditional(group_validators)
     def get(self, request):
         group_id = request.query_params.get('group_id')
 
         try:
             group = Group.objects.get(id=group_id)
-            update_recurring_events(group)
             members = group.members.all()
 
             return JsonResponse({
@@ -131,7 +150,7 @@ class ViewGroup(APIView):
                     'members': [member.username for member in members],
                 }
             }, status=200)
-        except Group.DoesNotExist:
+        except (Group.DoesNotExist, ValueError):
             logger.error("Group not found")
             return JsonResponse({'error': 'Group not found'}, status=404)
         except Exception as e:
@@ -139,6 +158,106 @@ class ViewGroup(APIView):
             return JsonResponse({'error': 'Failed to view group: ' + str(e)}, status=500)
 
 
+def get_member_group(group_id, user):
+    """ The group with `group_id` if `user` is one of its members, None otherwise """
+    try:
+        return Group.objects.filter(members=user).get(id=group_id)
+    except (Group.DoesNotExist, ValueError):
+        logger.error("Group not found or the user is not in it")
+        return None
+
+
+class GroupBalances(APIView):
+    """ Who owes whom in a group, read from the balance ledger, for its members only """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        group = get_member_group(request.query_params.get('group_id'), request.user)
+        if group is None:
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+
+        return JsonResponse({'success': True, 'balances': get_balances(group)}, status=200)
+
+
+class GroupStats(APIView):
+    """ Completion statistics and leaderboard of a group between `from` and `to` (default: the last 4 weeks) """
+
+    def get(self, request):
+        group_id = request.query_params.get('group_id')
+
+        try:
+            group = Group.objects.get(id=group_id)
+        except (Group.DoesNotExist, ValueError):
+            logger.error("Group not found")
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+
+        try:
+            end = request.query_params.get('to')
+            end = datetime.strptime(end, "%Y-%m-%d").date() if end else datetime.today().date()
+            start = request.query_params.get('from')
+            start = (datetime.strptime(start, "%Y-%m-%d").date() if start
+                     else end - timedelta(days=DEFAULT_STATS_DAYS - 1))
+        except ValueError as e:
+            logger.error(e)
+            return JsonResponse({'success': False, 'message': 'Invalid query parameters'}, status=400)
+        if start > end:
+            return JsonResponse({'success': False, 'message': 'Invalid query parameters'}, status=400)
+
+        return JsonResponse({'success': True, 'stats': get_group_stats(group, start, end)}, status=200)
+
+
+class GroupExport(APIView):
+    """
+    Stream a group's whole cost (`type=costs`) or event (`type=events`) history as CSV or NDJSON (`output`,
+    since DRF reserves `format`); `gzip=1` compresses it on the fly
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        kind = request.query_params.get('type', 'costs')
+        output = request.query_params.get('output', 'csv')
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        if kind not in EXPORTS or output not in FORMATS:
+            return JsonResponse({'success': False, 'message': 'Invalid query parameters'}, status=400)
+
+        try:
+            group_id = int(request.query_params.get('group_id'))
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+        if not Group.members.through.objects.filter(group_id=group_id, user_id=request.user.id).exists():
+            logger.error("Export of a group the user is not in")
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+
+        filename = f"group-{group_id}-{kind}.{output}"
+        if compress:
+            filename += '.gz'
+        response = StreamingHttpResponse(export(group_id, kind, output, gzip=compress),
+                                         content_type='application/gzip' if compress else FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class GroupSettlePlan(APIView):
+    """ Plan (GET) or apply (POST) the fewest transfers that settle a group's debts, for its members only """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        group = get_member_group(request.query_params.get('group_id'), request.user)
+        if group is None:
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+
+        return JsonResponse({'success': True, 'transfers': plan_settlement(group)}, status=200)
+
+    def post(self, request):
+        group = get_member_group(request.data.get('groupId'), request.user)
+        if group is None:
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+
+        plan, settled = apply_settlement(group)
+        logger.info(f"{group} settled {settled} costs")
+        return JsonResponse({'success': True, 'transfers': plan, 'settled': settled}, status=200)
+
+
 class AddUsertoGroup(APIView):
     """ Add User to a Group """
 
@@ -158,6 +277,7 @@ class AddUsertoGroup(APIView):
                 }, status=409)
 
             group.members.add(user)
+            publish(group.id, 'member.joined', {'username': user.username, 'photo_url': user.photo_url})
             return JsonResponse({
                 'success': True,
                 'message': 'User added to group successfully'
@@ -238,8 +358,9 @@ class CreateEvent(APIView):
                         {"success": False, "message": f"User {username} not found"}, status=400
                     )
 
-            # Add other occurrence of the Event 
-            update_recurring_events(group)
+            # Add the upcoming occurrences of the Event, later ones are kept up to date by the scheduler
+            materialize_event(event)
+            publish(group.id, 'event.created', serialize_event(event))
 
             return JsonResponse({"success": True, "message": ""}, status=200)
 
@@ -250,8 +371,16 @@ class CreateEvent(APIView):
             )
 
 
+# Which occurrences of a recurring event an edit applies to
+EDIT_SCOPES = ('following', 'this')
+
+
 class UpdateEvent(APIView):
-    """ Update an event's details """
+    """
+    Update an event's details. For a recurring event, `scope` is "following" (default: this occurrence and the
+    later ones, which become a series of their own) or "this" (only this occurrence, which leaves the series).
+    `is_complete` goes through the completion log like MarkEventComplete, so completing needs a signed-in user.
+    """
 
     def put(self, request, event_id):
         try:
@@ -270,8 +399,30 @@ class UpdateEvent(APIView):
                 return JsonResponse(
                     {"success": False, "message": "Event not found"}, status=404
                 )
-            
-            delete_recurrences(event)
+
+            scope = data.get("scope", "following")
+            if scope not in EDIT_SCOPES:
+                logger.error(f"Invalid scope {scope}")
+                return JsonResponse(
+                    {"success": False, "message": "Invalid scope"}, status=400
+                )
+            if data.get("is_complete") and not request.user.is_authenticated:
+                logger.error("Anonymous user completing an event")
+                return JsonResponse(
+                    {"success": False, "message": "Sign in to complete an event"}, status=401
+                )
+
+            if scope == "this":
+                try:
+                    detach_occurrence(event)
+                except ValueError as e:
+                    logger.error(e)
+                    return JsonResponse(
+                        {"success": False, "message": "The first occurrence cannot be edited on its own"},
+                        status=400
+                    )
+            else:
+                split_series(event)
 
             # Update fields
             if "name" in data:
@@ -280,12 +431,13 @@ class UpdateEvent(APIView):
                 event.first_date = data["first_date"]
             if "repeat_every" in data:
                 event.repeat_every = data["repeat_every"]
-            if "is_complete" in data:
-                event.is_complete = data["is_complete"]
 
             event.save()
             logger.info("Event updated")
-            update_recurring_events(event.group)
+            event.refresh_from_db()
+            materialize_event(event)
+            if "is_complete" in data and bool(data["is_complete"]) != event.is_complete:
+                set_completion(event, event.first_date, request.user, bool(data["is_complete"]))
             return JsonResponse({"success": True, "message": "Event updated"}, status=200)
 
         except JSONDecodeError:
@@ -296,13 +448,32 @@ class UpdateEvent(APIView):
 
 
 class DeleteEvent(APIView):
-    """ Delete an event """
+    """
+    Delete an event and its later occurrences (`scope=following`, default), only this occurrence (`scope=this`),
+    or only the occurrence on `date`
+    """
 
     def delete(self, request, event_id):
         try:
             event = Event.objects.get(id=event_id)
-            delete_recurrences(event)
-            event.delete()
+
+            scope = request.GET.get('scope', 'following')
+            if scope not in EDIT_SCOPES:
+                logger.error(f"Invalid scope {scope}")
+                return JsonResponse(
+                    {"success": False, "message": "Invalid scope"}, status=400
+                )
+
+            # Only remove a single occurrence of the series
+            occurrence_date = request.GET.get('date')
+            if not occurrence_date and scope == 'this' and get_repeat_delta(event.repeat_every) is not None:
+                occurrence_date = str(event.first_date)
+            if occurrence_date:
+                cancel_occurrence(event, datetime.strptime(occurrence_date, "%Y-%m-%d").date())
+                logger.info("Event occurrence cancelled")
+                return JsonResponse({"success": True, "message": "Event occurrence deleted"}, status=200)
+
+            end_series(event)
             logger.info("Event deleted")
             return JsonResponse({"success": True, "message": "Event deleted"}, status=200)
         except Event.DoesNotExist:
@@ -310,11 +481,17 @@ class DeleteEvent(APIView):
             return JsonResponse(
                 {"success": False, "message": "Event not found"}, status=404
             )
+        except ValueError as e:
+            logger.error(e)
+            return JsonResponse(
+                {"success": False, "message": "Invalid occurrence date"}, status=400
+            )
 
 
 class ViewEvent(APIView):
     """ View a single event's details """
 
+    @conditional(event_validators)
     def get(self, request, event_id):
         try:
             event = Event.objects.get(id=event_id)
@@ -343,6 +520,107 @@ class ViewEvent(APIView):
             )
 
 
+class EventList(APIView):
+    """ List a group's events within a date window, cursor-paginated on (first_date, id) """
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+
+    def get(self, request):
+        group_id = request.query_params.get('group_id')
+        member = request.query_params.get('member')
+        is_complete = request.query_params.get('is_complete')
+        cursor = request.query_params.get('cursor')
+
+        try:
+            group = Group.objects.get(id=group_id)
+        except (Group.DoesNotExist, ValueError):
+            logger.error("Group not found")
+            return JsonResponse({"success": False, "message": "Group not found"}, status=404)
+
+        try:
+            start = request.query_params.get('from')
+            start = datetime.strptime(start, "%Y-%m-%d").date() if start else None
+            end = request.query_params.get('to')
+            end = datetime.strptime(end, "%Y-%m-%d").date() if end else None
+            limit = min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            logger.error(e)
+            return JsonResponse({"success": False, "message": "Invalid query parameters"}, status=400)
+        if limit < 1:
+            return JsonResponse({"success": False, "message": "Invalid query parameters"}, status=400)
+
+        events = Event.objects.filter(group=group)
+        if start:
+            events = events.filter(first_date__gte=start)
+        if end:
+            events = events.filter(first_date__lte=end)
+        if member:
+            events = events.filter(members__username=member)
+        if is_complete is not None:
+            events = events.filter(is_complete=is_complete.lower() == 'true')
+        if after:
+            events = events.filter(Q(first_date__gt=after[0]) | Q(first_date=after[0], id__gt=after[1]))
+        rows = event_rows(events.order_by('first_date', 'id')[:limit + 1])
+        members = event_members(event_id__in=[row.id for row in rows])
+        page = [serialize_event_row(row, members) for row in rows]
+
+        # Occurrences past the stored rows are expanded for the window only, never past the read horizon, and
+        # each series stops once it has filled a page on its own
+        virtual_end = get_read_horizon()
+        if end and end < virtual_end:
+            virtual_end = end
+        virtual_start = start
+        if after and (virtual_start is None or after[0] > virtual_start):
+            virtual_start = after[0]
+
+        def accept(occurrence):
+            if after and (occurrence['first_date'], occurrence['id']) <= after:
+                return False
+            if member and {'username': member} not in occurrence['members']:
+                return False
+            return is_complete is None or occurrence['is_complete'] == (is_complete.lower() == 'true')
+
+        page.extend(expand_occurrences(group, virtual_end, start=virtual_start, accept=accept, limit=limit + 1))
+
+        page.sort(key=lambda e: (e['first_date'], e['id']))
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1]['first_date'], page[-1]['id'])
+
+        return JsonResponse({"success": True, "events": page, "next_cursor": next_cursor}, status=200)
+
+
+class EventCompletions(APIView):
+    """ Who completed which occurrences of a group's events between `from` and `to` """
+
+    @conditional(group_validators)
+    def get(self, request):
+        group_id = request.query_params.get('group_id')
+        series_id = request.query_params.get('series_id')
+
+        try:
+            group = Group.objects.get(id=group_id)
+        except (Group.DoesNotExist, ValueError):
+            logger.error("Group not found")
+            return JsonResponse({"success": False, "message": "Group not found"}, status=404)
+
+        try:
+            start = datetime.strptime(request.query_params.get('from', ''), "%Y-%m-%d").date()
+            end = datetime.strptime(request.query_params.get('to', ''), "%Y-%m-%d").date()
+            filters = {'series_id': uuid.UUID(series_id)} if series_id else {'group_id': group.id}
+        except ValueError as e:
+            logger.error(e)
+            return JsonResponse({"success": False, "message": "Invalid query parameters"}, status=400)
+
+        completions = get_completions(start, end, **filters)
+        return JsonResponse({"success": True, "completions": [
+            {'series_id': key[0], 'date': key[1], 'users': users}
+            for key, users in sorted(completions.items(), key=lambda item: (item[0][1], str(item[0][0])))
+        ]}, status=200)
+
+
 class ChangeEventMembers(APIView):
     """ Change who is assigned to an event """
 
@@ -404,49 +682,30 @@ class CurrentUserView(APIView):
     """ Fetches User Info for Auth """
     permission_classes = [IsAuthenticated]
 
+    @conditional(current_user_validators)
     def get(self, request):
         if request.user.is_authenticated:
             user = request.user
-            groups = Group.objects.filter(members__in=[user]).prefetch_related('events')
-
-            group_data = []
-            for group in groups:
-                events = group.events.all().prefetch_related('members')  # type: ignore
-
-                event_data = []
-                for event in events:
-                    event_data.append({
-                        'id': event.id,
-                        'name': event.name,
-                        'members': list(event.members.all().values('username')),
-                        'first_date': event.first_date,
-                        'repeat_every': event.repeat_every,
-                        'is_complete': event.is_complete,
-                    })
-
-                group_data.append({
-                    'id': group.id,
-                    'name': group.name,
-                    'members': list(group.members.all().values('username', 'photo_url')),
-                    'events': event_data
-                })
 
-            return JsonResponse({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'groups': group_data
-            })
+            # Recurring events are expanded up to this date without being stored
+            try:
+                expand_until = parse_expand_until(request.query_params.get('to'))
+            except ValueError:
+                return JsonResponse({"success": False, "message": "Invalid date"}, status=400)
+
+            return JsonResponse(get_dashboard(user, expand_until, serialize_current_user))
 
 
 class GetUsers(APIView):
-    # get all users that match a particular string 
+    # get the best matching users for a particular string (autocomplete)
+    @conditional()
     def get(self, request):
         try:
             query = request.GET.get('search', '')
-            users = User.objects.filter(username__icontains=query).values('id', 'username')
+            limit = int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT))
+            users = search_users(query, limit)
             logger.info(f"users found: {users}")
-            return JsonResponse({"success": True, 'users': list(users)}, status=200, )
+            return JsonResponse({"success": True, 'users': users}, status=200, )
 
         except Exception as e:
             logger.error(e)
@@ -454,6 +713,14 @@ class GetUsers(APIView):
 
 
 class MarkEventComplete(APIView):
+    """
+    Complete or reopen an occurrence: the one on `date`, stored or virtual, or the event's own date.
+    Completions are per user: `eventIsComplete: true` records the requesting user's, `false` clears everyone's,
+    and without it the user's own completion is toggled. The response has `eventStatus`, whether anyone has
+    completed the occurrence, and `completedBy`, the usernames of those who did.
+    """
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
         try:
             data = json.loads(request.body)
@@ -461,24 +728,36 @@ class MarkEventComplete(APIView):
             # Check that the event exists
             try:
                 event = Event.objects.get(id=data.get("eventId"))
-                # which occurrence?
-
             except Event.DoesNotExist:
                 logger.error("Event not found")
                 return JsonResponse(
                     {"success": False, "message": "No such Event"}, status=400
                 )
 
-            # Toggle event completion status
-            if event.is_complete:
-                event.is_complete = False
-            else:
-                event.is_complete = True
-            event.save()
+            occurrence_date = data.get("date")
+            try:
+                if occurrence_date:
+                    occurrence_date = datetime.strptime(occurrence_date, "%Y-%m-%d").date()
+                else:
+                    occurrence_date = event.first_date
+                wanted = data.get("eventIsComplete")
+                if isinstance(wanted, bool):
+                    is_complete = set_completion(event, occurrence_date, request.user, wanted)
+                else:
+                    is_complete = toggle_completion(event, occurrence_date, request.user)
+            except ValueError as e:
+                logger.error(e)
+                return JsonResponse(
+                    {"success": False, "message": "Invalid occurrence date"}, status=400
+                )
 
-            logger.info(f"{event} is updated")
-            return JsonResponse({"success": True, "message": "event status updated", "eventStatus": event.is_complete},
-                                status=200)
+            publish(event.group_id, 'event.completed',
+                    {'id': event.id, 'date': occurrence_date, 'is_complete': is_complete})
+            logger.info(f"{event} on {occurrence_date} is updated")
+            completed_by = get_completions(occurrence_date, occurrence_date, group_id=event.group_id,
+                                           series_id=event.series_id).get((event.series_id, occurrence_date), [])
+            return JsonResponse({"success": True, "message": "event status updated", "eventStatus": is_complete,
+                                 "completedBy": completed_by}, status=200)
 
         except JSONDecodeError:
             logger.error("error decoding json")
@@ -509,66 +788,134 @@ class UserExists(APIView):
 
 
 class CreateCost(APIView):
-    """ Create a Cost entry """
+    """ Create Cost entries, either one expense or a list of them under `expenses` (e.g. imported receipts) """
+    REQUIRED_FIELDS = (
+        ('group_id', 'No group id provided'),
+        ('amount', 'No amount provided'),
+        ('borrower', 'No borrowers provided'),
+        ('payer', 'No payer provided'),
+    )
 
     def post(self, request):
-        group_id = request.data.get('group_id')
-        name = request.data.get('name')
-        category = request.data.get('category')
-        date = request.data.get('date')
-        time = request.data.get('time')
-        amount = request.data.get('amount')
-        payer = request.data.get('payer')
-        borrowers = request.data.get('borrower', [])
+        expenses = request.data.get('expenses')
+        is_batch = expenses is not None
+        if not is_batch:
+            expenses = [request.data]
+        elif not isinstance(expenses, list) or not expenses or not all(isinstance(e, dict) for e in expenses):
+            return JsonResponse({'error': 'No expenses provided'}, status=400)
+        else:
+            # expenses of a batch default to the request's group
+            expenses = [{'group_id': request.data.get('group_id'), **expense} for expense in expenses]
+
+        def error(message, index, status=400):
+            if is_batch:
+                message = f'Expense {index + 1}: {message}'
+            return JsonResponse({'error': message}, status=status)
 
         # Validate required fields
-        if not group_id:
-            return JsonResponse({'error': 'No group id provided'}, status=400)
-        if not amount:
-            return JsonResponse({'error': 'No amount provided'}, status=400)
-        if not borrowers:
-            return JsonResponse({'error': 'No borrowers provided'}, status=400)
-        if not payer:
-            return JsonResponse({'error': 'No payer provided'}, status=400)
+        for i, expense in enumerate(expenses):
+            for field, message in self.REQUIRED_FIELDS:
+                if not expense.get(field):
+                    return error(message, i)
 
         try:
-            group = Group.objects.get(id=group_id)
-            payer_user = User.objects.get(id=payer)
-            group_members = set(group.members.all())
-
-            # Check if payer is a member of the group
-            if payer_user not in group_members:
-                return JsonResponse({'error': 'Payer is not a member of the group'}, status=400)
-
-            # Generate a UUID for the transaction
-            transaction_id = uuid.uuid4()
-
-            for borrower in borrowers:
-                borrower_user = User.objects.get(id=borrower)
-                if borrower_user not in group_members:
-                    return JsonResponse({'error': f'User {borrower_user.username} is not a member of the group'},
-                                        status=400)
-
-                Cost.objects.create(
-                    name=name,
-                    category=category,
-                    date=date,
-                    time=time,
-                    amount=(Decimal(amount) / Decimal(len(borrowers))).quantize(Decimal('0.01'),
-                                                                                rounding=ROUND_HALF_UP),
-                    group=group,
-                    payer=payer_user,
-                    borrower=borrower_user,
-                    transaction_id=transaction_id
-                )
+            group_ids = {int(expense.get('group_id')) for expense in expenses}
+            user_ids = set()
+            for expense in expenses:
+                user_ids.add(int(expense.get('payer')))
+                user_ids.update(int(borrower) for borrower in expense.get('borrower'))
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'Invalid group, payer or borrower id'}, status=400)
 
-            return JsonResponse({'message': 'Cost created successfully'}, status=201)
-        except ValidationError as e:
+        try:
+            # Everything is loaded up front: groups, their memberships and all referenced users
+            groups = Group.objects.in_bulk(group_ids)
+            users = User.objects.in_bulk(user_ids)
+            group_members = {}
+            for group_id, user_id in Group.members.through.objects.filter(group_id__in=group_ids).values_list(
+                    'group_id', 'user_id'):
+                group_members.setdefault(group_id, set()).add(user_id)
+
+            costs = []
+            transaction_ids = []
+            for i, expense in enumerate(expenses):
+                group = groups.get(int(expense.get('group_id')))
+                if group is None:
+                    return error('Group not found', i, status=404)
+                members = group_members.get(group.id, set())
+
+                payer_user = users.get(int(expense.get('payer')))
+                # Check if payer is a member of the group
+                if payer_user is None or payer_user.id not in members:
+                    return error('Payer is not a member of the group', i)
+
+                borrowers = expense.get('borrower')
+                amount = (Decimal(expense.get('amount')) / Decimal(len(borrowers))).quantize(Decimal('0.01'),
+                                                                                             rounding=ROUND_HALF_UP)
+                # Generate a UUID for the transaction
+                transaction_id = uuid.uuid4()
+                transaction_ids.append(str(transaction_id))
+
+                for borrower in borrowers:
+                    borrower_user = users.get(int(borrower))
+                    if borrower_user is None:
+                        return error(f'User {borrower} not found', i)
+                    if borrower_user.id not in members:
+                        return error(f'User {borrower_user.username} is not a member of the group', i)
+
+                    costs.append(Cost(
+                        name=expense.get('name'),
+                        category=expense.get('category'),
+                        date=expense.get('date'),
+                        time=expense.get('time'),
+                        amount=amount,
+                        group=group,
+                        payer=payer_user,
+                        borrower=borrower_user,
+                        transaction_id=transaction_id
+                    ))
+
+            # All or nothing: a bad expense never leaves part of a batch behind
+            with transaction.atomic():
+                Cost.objects.bulk_create(costs)
+                record_costs(costs)
+                for group_id in {cost.group_id for cost in costs}:
+                    publish(group_id, 'cost.added',
+                            {'costs': [serialize_cost(cost) for cost in costs if cost.group_id == group_id]})
+
+            return JsonResponse({'message': 'Cost created successfully', 'transaction_ids': transaction_ids},
+                                status=201)
+        except (ValidationError, DjangoValidationError, InvalidOperation) as e:
             return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': 'Failed to create cost: ' + str(e)}, status=500)
 
 
+class CostSummaryView(APIView):
+    """
+    A group's spend per category, payer and month, for the months from `from` to `to` (YYYY-MM), for its
+    members only
+    """
+    permission_classes = [IsAuthenticated]
+
+    @conditional(group_validators)
+    def get(self, request):
+        group = get_member_group(request.query_params.get('group_id'), request.user)
+        if group is None:
+            return JsonResponse({'success': False, 'message': 'Group not found'}, status=404)
+
+        try:
+            start = request.query_params.get('from')
+            start = datetime.strptime(start, "%Y-%m").date() if start else None
+            end = request.query_params.get('to')
+            end = datetime.strptime(end, "%Y-%m").date() if end else None
+        except ValueError as e:
+            logger.error(e)
+            return JsonResponse({'success': False, 'message': 'Invalid query parameters'}, status=400)
+
+        return JsonResponse({'success': True, 'summary': get_cost_summary(group, start, end)}, status=200)
+
+
 class UpdateUsername(APIView):
     permission_classes = [IsAuthenticated]
 
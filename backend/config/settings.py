@@ -55,6 +55,8 @@ REST_FRAMEWORK = {
 
 
 MIDDLEWARE = [
+    # first, so the queries of every other middleware are counted too
+    "chore_tracker.middleware.QueryMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -110,6 +112,28 @@ DATABASES = {
 #     }
 # }
 
+# Caches
+# Local memory by default (per process). Set REDIS_URL to share the cache between workers, which needs the
+# `redis` package (pip install redis).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'chore-tracker',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Cache alias used for the get-current-user dashboard, see chore_tracker/cache.py
+DASHBOARD_CACHE = 'default'
+
 AUTH_USER_MODEL = 'chore_tracker.User'
 
 # Password validation
@@ -181,6 +205,25 @@ CORS_ALLOW_HEADERS = [
     "x-csrftoken",
 ]
 
+# Seconds between runs of the in-process scheduler worker, 0 disables it.
+# Either this worker or `python manage.py run_scheduler` in a separate process must run: recurring events are
+# only stored MATERIALIZE_THRESHOLD (7 days) ahead, and stats, exports and the events list's is_complete
+# filter read the stored occurrences only (see the README).
+RECURRENCE_WORKER_INTERVAL = int(os.getenv('RECURRENCE_WORKER_INTERVAL', '0'))
+
+# Serve the read endpoints with the async views of chore_tracker/async_views.py and enable the group stream.
+# Only for ASGI (config/asgi.py): under WSGI every async view runs in its own event loop, and a stream is
+# buffered until it ends, which it never does.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', '0') == '1'
+
+# JSON encoder of API responses, 'orjson' (falls back to the stdlib when not installed) or 'stdlib',
+# see chore_tracker/renderers.py
+JSON_RENDERER = 'orjson'
+
+# Fan-out of the group/stream/ deltas, see chore_tracker/stream.py. LocalBroker only reaches streams served
+# by the same process.
+STREAM_BROKER = 'chore_tracker.stream.LocalBroker'
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
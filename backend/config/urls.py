@@ -18,9 +18,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from chore_tracker.middleware import metrics_view
+
 # from chore_tracker.views import create_event
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path('api/', include('chore_tracker.urls'))
+    path('api/', include('chore_tracker.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
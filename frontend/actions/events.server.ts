@@ -6,21 +6,34 @@ import {
 	CreateEventRequest,
 	MarkEventCompleteRequest,
 } from "@/schemas/transaction.schema";
+import { ReadonlyRequestCookies } from "next/dist/server/web/spec-extension/adapters/request-cookies";
+import { cookies } from "next/headers";
 
 // export function createEventAction() {}
 
 export async function setEventStatusAction(
 	eventId: number,
 	eventIsComplete: boolean,
+	date: string,
 ) {
+	// the date picks the occurrence, virtual occurrences of a recurring event share its id
 	const postData: MarkEventCompleteRequest = {
 		eventId: eventId,
 		eventIsComplete: eventIsComplete,
+		date: date,
 	};
 	try {
+		// completions are recorded per user, so the session has to be forwarded from the server action
+		const cookieStore: ReadonlyRequestCookies = await cookies();
+		const token: string | null =
+			cookieStore.get("access_token")?.value ?? null;
+
 		const res = await fetch("http://127.0.0.1:8000/api/event/complete/", {
 			method: "POST",
-			headers: { "Content-Type": "application/json" },
+			headers: {
+				Authorization: `Bearer ${token}`,
+				"Content-Type": "application/json",
+			},
 			body: JSON.stringify(postData),
 			credentials: "include",
 		});
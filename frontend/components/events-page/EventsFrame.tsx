@@ -116,8 +116,8 @@ function EventsFrame({
 			<h2 className="text-3xl font-bold">Events</h2>
 			<ul>
 				{sortedEvents.length > 0 ? (
-					sortedEvents.map((event, index) => (
-						<EventItem key={index} event={event} />
+					sortedEvents.map((event) => (
+						<EventItem key={event.key} event={event} />
 					))
 				) : (
 					<div className="text-gray-600">No events found</div>
@@ -134,6 +134,7 @@ function EventItem({ event }: { event: EventDisplayData }) {
 		const res: MarkEventCompleteResponse = await setEventStatusAction(
 			event.id,
 			!event.is_complete,
+			event.first_date,
 		);
 		if (res.success) {
 			console.log(res);
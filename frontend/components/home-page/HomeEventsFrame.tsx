@@ -227,10 +227,10 @@ function EventsDisplay({
 	const [eventData, setEventData] = useState<EventDisplayData[]>(
 		groupData.events,
 	);
-	const updateEventStatus = (eventId: number, isComplete: boolean) => {
+	const updateEventStatus = (eventKey: string, isComplete: boolean) => {
 		setEventData((prev) =>
 			prev.map((event) =>
-				event.id === eventId
+				event.key === eventKey
 					? { ...event, is_complete: isComplete }
 					: event,
 			),
@@ -258,12 +258,12 @@ function EventsDisplay({
 				if (memberNames.includes(username))
 					return (
 						<AssignedEventItem
-							key={event.id}
+							key={event.key}
 							event={event}
 							onStatusChange={updateEventStatus}
 						/>
 					);
-				else return <EventItem key={event.id} event={event} />;
+				else return <EventItem key={event.key} event={event} />;
 			})
 		);
 
@@ -369,7 +369,7 @@ function AssignedEventItem({
 	onStatusChange,
 }: {
 	event: EventDisplayData;
-	onStatusChange: (eventId: number, isComplete: boolean) => void;
+	onStatusChange: (eventKey: string, isComplete: boolean) => void;
 }) {
 	const [eventState, setEventState] = useState<boolean>(event.is_complete);
 
@@ -382,11 +382,12 @@ function AssignedEventItem({
 		const res: MarkEventCompleteResponse = await setEventStatusAction(
 			event.id,
 			newStatus,
+			event.first_date,
 		);
 		if (res.success) {
 			const updatedStatus = res.eventStatus ?? newStatus;
 			setEventState(updatedStatus);
-			onStatusChange(event.id, updatedStatus); // notify parent
+			onStatusChange(event.key, updatedStatus); // notify parent
 		}
 	};
 
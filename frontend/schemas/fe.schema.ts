@@ -20,10 +20,13 @@ export interface GroupStateData {
 // expected format for general event display data passed to frontend pages
 export interface EventDisplayData {
 	id: number;
+	// unique per occurrence, virtual occurrences of a recurring event share the id of its first one
+	key: string;
 	name: string;
 	first_date: string;
 	repeat_every: string | null;
 	is_complete: boolean;
+	is_virtual?: boolean;
 	members: { username: string }[];
 }
 
@@ -185,6 +185,8 @@ export interface MarkEventCompleteRequest {
 
 	eventId: number;
 	eventIsComplete: boolean;
+	// YYYY-MM-DD of the occurrence
+	date: string;
 }
 
 export interface MarkEventCompleteResponse {
@@ -192,7 +194,10 @@ export interface MarkEventCompleteResponse {
 
 	success: boolean;
 	message: string;
+	// whether anyone has completed the occurrence
 	eventStatus?: boolean;
+	// usernames of the members who completed it
+	completedBy?: string[];
 }
 
 // --------------------------------------------------------------------------------------